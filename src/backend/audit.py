@@ -0,0 +1,274 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import database
+import metrics
+from blockchain_client import BlockchainClient
+from images import ImageStore
+
+logger = logging.getLogger('audit')
+
+# Auditoria de integridade: confere cada detecção com o bloco registrado na
+# blockchain (blockchain_hash) e o arquivo da imagem com o seu sha256. Roda em
+# fatias, no líder, com um cursor persistente: uma passada completa sobre um
+# histórico grande é distribuída ao longo de várias execuções.
+AUDIT_NAME = "integrity"
+INTEGRITY_AUDIT_INTERVAL = int(os.getenv("INTEGRITY_AUDIT_INTERVAL", 600))  # segundos, 0 desativa
+AUDIT_ROWS_PER_RUN = int(os.getenv("AUDIT_ROWS_PER_RUN", 2000))
+AUDIT_PAGE_SIZE = 100  # detecções por consulta ao banco e por chamada à blockchain
+AUDIT_PAGE_PAUSE = float(os.getenv("AUDIT_PAGE_PAUSE", 0.2))  # segundos entre páginas
+# Detecções mais novas que isso podem ainda estar na fila de registro
+AUDIT_REGISTRATION_GRACE_SECONDS = 3600
+HASH_CHUNK_BYTES = 1024 * 1024
+
+# Campos registrados na blockchain que não mudam depois da criação. status,
+# waste_type e detection_area são alterados depois do registro (nem toda mudança
+# gera um bloco novo) e não são comparados.
+AUDITED_FIELDS = ("detection_id", "camera_id", "timestamp", "coordinates")
+
+# Divergências registradas em audit_findings
+FINDING_KINDS = (
+    "not_registered",            # sem blockchain_hash após a carência
+    "block_missing",             # blockchain_hash não existe na cadeia
+    "block_mismatch",            # o bloco não contém a detecção
+    "record_mismatch",           # campos do banco diferentes dos registrados
+    "image_reference_mismatch",  # a imagem registrada não é a da detecção
+    "image_missing",             # arquivo da imagem não encontrado
+    "image_mismatch",            # conteúdo do arquivo não corresponde ao sha256
+)
+
+_HASH_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+AUDIT_CHECKED = metrics.registry.counter(
+    "integrity_audit_checked_total", "Detecções verificadas pela auditoria de integridade"
+)
+AUDIT_FINDINGS = metrics.registry.counter(
+    "integrity_audit_findings_total", "Divergências encontradas pela auditoria de integridade", ("kind",)
+)
+
+
+def canonical_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    # Forma canônica dos campos auditados; as coordenadas viram float porque a
+    # blockchain devolve -8.0 como -8, e o timestamp vai para o horário local sem
+    # fuso, como é gravado no banco (blocos antigos guardam o fuso enviado pelo cliente)
+    canonical = {field: record.get(field) for field in AUDITED_FIELDS}
+    if isinstance(canonical["timestamp"], str):
+        try:
+            canonical["timestamp"] = database.local_datetime(canonical["timestamp"]).isoformat()
+        except ValueError:
+            pass
+    coordinates = canonical["coordinates"]
+    if isinstance(coordinates, dict):
+        canonical["coordinates"] = {
+            key: float(value) if isinstance(value, (int, float)) else value
+            for key, value in coordinates.items()
+        }
+    return canonical
+
+
+def canonical_hash(record: Dict[str, Any]) -> str:
+    encoded = json.dumps(canonical_record(record), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def block_entry(block: Dict[str, Any], detection_id: str) -> Optional[Dict[str, Any]]:
+    # Blocos individuais têm a detecção em data; os de lote, em data["detections"]
+    data = block.get("data") or {}
+    if not isinstance(data, dict):
+        return None
+    if data.get("detection_id") == detection_id:
+        return data
+    for entry in data.get("detections") or []:
+        if isinstance(entry, dict) and entry.get("detection_id") == detection_id:
+            return entry
+    return None
+
+
+def file_sha256(path: Path) -> Optional[str]:
+    # Lido em blocos para não carregar a imagem inteira na memória
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(HASH_CHUNK_BYTES)
+                if not chunk:
+                    break
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def _finding(detection_id: str, kind: str, block_hash: Optional[str] = None,
+             expected: Any = None, actual: Any = None) -> Dict[str, Any]:
+    encode = lambda value: value if value is None or isinstance(value, str) else json.dumps(value, sort_keys=True)
+    return {
+        "detection_id": detection_id,
+        "kind": kind,
+        "block_hash": block_hash,
+        "expected": encode(expected),
+        "actual": encode(actual),
+    }
+
+
+async def _image_digest(store: ImageStore, archive_dir: Path, image: Dict[str, Any],
+                        digests: Dict[str, Optional[str]]) -> Optional[str]:
+    # O sha256 é calculado em uma thread do repositório de imagens; imagens
+    # compartilhadas por várias detecções são lidas uma vez por execução
+    if image["hash"] not in digests:
+        base_dir = archive_dir if image["tier"] == "archived" else store.base_dir
+        digests[image["hash"]] = await store.run(file_sha256, base_dir / image["location"])
+    return digests[image["hash"]]
+
+
+async def check_detections(
+    rows: List[Dict[str, Any]],
+    client: BlockchainClient,
+    store: ImageStore,
+    archive_dir: Path,
+    digests: Dict[str, Optional[str]]
+) -> Optional[List[Dict[str, Any]]]:
+    # Divergências de uma página de detecções (linhas de database.get_audit_page).
+    # None se a blockchain não respondeu: nada pode ser concluído sobre a página.
+    block_hashes = sorted({row["blockchain_hash"] for row in rows if row["blockchain_hash"]})
+    blocks = await client.get_blocks(block_hashes) if block_hashes else {}
+    if blocks is None:
+        return None
+    images = await database.get_images(sorted({row["image_hash"] for row in rows if row["image_hash"]}))
+    grace_cutoff = (datetime.now() - timedelta(seconds=AUDIT_REGISTRATION_GRACE_SECONDS)).isoformat()
+
+    findings = []
+    for row in rows:
+        detection_id = row["id"]
+        block_hash = row["blockchain_hash"]
+        record = {
+            "detection_id": detection_id,
+            "camera_id": row["camera_id"],
+            "timestamp": row["timestamp"],
+            "coordinates": row["coordinates"],
+        }
+
+        if not block_hash:
+            if row["created_at"] < grace_cutoff:
+                findings.append(_finding(detection_id, "not_registered"))
+        elif block_hash not in blocks:
+            findings.append(_finding(detection_id, "block_missing", block_hash))
+        else:
+            entry = block_entry(blocks[block_hash], detection_id)
+            if entry is None:
+                findings.append(_finding(detection_id, "block_mismatch", block_hash))
+            else:
+                if canonical_hash(entry) != canonical_hash(record):
+                    expected, actual = canonical_record(entry), canonical_record(record)
+                    fields = [field for field in AUDITED_FIELDS if expected[field] != actual[field]]
+                    findings.append(_finding(
+                        detection_id, "record_mismatch", block_hash,
+                        {field: expected[field] for field in fields},
+                        {field: actual[field] for field in fields}
+                    ))
+
+                # A recompressão troca a imagem (e o hash) depois do registro
+                reference = _HASH_PATTERN.search(entry.get("image_reference") or "")
+                image = images.get(row["image_hash"])
+                if (reference and row["image_hash"] and reference.group(0) != row["image_hash"]
+                        and (image is None or image["tier"] != "recompressed")):
+                    findings.append(_finding(
+                        detection_id, "image_reference_mismatch", block_hash,
+                        reference.group(0), row["image_hash"]
+                    ))
+
+        if row["image_hash"]:
+            image = images.get(row["image_hash"])
+            digest = None
+            if image is not None and image["tier"] != "missing":
+                digest = await _image_digest(store, archive_dir, image, digests)
+            if digest is None:
+                findings.append(_finding(detection_id, "image_missing", expected=row["image_hash"]))
+            elif digest != row["image_hash"]:
+                findings.append(_finding(detection_id, "image_mismatch", expected=row["image_hash"], actual=digest))
+
+    return findings
+
+
+def _new_pass(last_completed: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "table_name": "detections",
+        "last_rowid": 0,
+        "pass_started_at": None,
+        "pass_checked": 0,
+        "last_pass_completed_at": last_completed,
+    }
+
+
+async def audit_detections(
+    client: BlockchainClient,
+    store: ImageStore,
+    archive_dir: Path,
+    max_rows: int = AUDIT_ROWS_PER_RUN,
+    page_size: int = AUDIT_PAGE_SIZE,
+    page_pause: float = AUDIT_PAGE_PAUSE
+) -> Dict[str, Any]:
+    # Verifica até max_rows detecções a partir do cursor salvo. Cada página é uma
+    # consulta curta e uma única chamada à blockchain, com uma pausa entre páginas
+    # para não competir com a ingestão.
+    started = time.perf_counter()
+    state = await database.get_audit_state(AUDIT_NAME) or _new_pass()
+    if state["pass_started_at"] is None:
+        state["pass_started_at"] = datetime.now().isoformat()
+    tables = await database.get_audit_tables()
+    digests: Dict[str, Optional[str]] = {}
+    report = {"checked": 0, "findings": 0, "pass_completed": False, "error": None}
+
+    while report["checked"] < max_rows:
+        table = state["table_name"]
+        rows = []
+        if table in tables:
+            limit = min(page_size, max_rows - report["checked"])
+            rows = await database.get_audit_page(table, state["last_rowid"], limit)
+
+        if not rows:
+            position = tables.index(table) if table in tables else len(tables)
+            if position + 1 < len(tables):
+                state.update(table_name=tables[position + 1], last_rowid=0)
+                continue
+            logger.info(
+                f"Auditoria de integridade concluída: {state['pass_checked']} detecções "
+                f"desde {state['pass_started_at']}"
+            )
+            state = _new_pass(datetime.now().isoformat())
+            await database.save_audit_page(AUDIT_NAME, state, [], [])
+            report["pass_completed"] = True
+            break
+
+        findings = await check_detections(rows, client, store, archive_dir, digests)
+        if findings is None:
+            # O cursor não avança: a página é verificada de novo na próxima execução
+            report["error"] = "Blockchain indisponível"
+            logger.warning("Auditoria de integridade interrompida: blockchain indisponível")
+            break
+
+        state["last_rowid"] = rows[-1]["rowid"]
+        state["pass_checked"] += len(rows)
+        await database.save_audit_page(AUDIT_NAME, state, [row["id"] for row in rows], findings)
+
+        AUDIT_CHECKED.inc(len(rows))
+        for finding in findings:
+            AUDIT_FINDINGS.inc(kind=finding["kind"])
+        report["checked"] += len(rows)
+        report["findings"] += len(findings)
+        if page_pause:
+            await asyncio.sleep(page_pause)
+
+    report["state"] = state
+    report["duration_s"] = time.perf_counter() - started
+    if report["findings"]:
+        logger.warning(f"Auditoria de integridade: {report['findings']} divergências em {report['checked']} detecções")
+    return report
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+
+# Benchmark de ingestão e leitura do backend.
+#
+# Semeia um banco SQLite separado com N detecções sintéticas e executa, dentro
+# do próprio processo (transporte ASGI do httpx), uma carga concorrente de
+# POST /api/waste-detection com imagens misturada a leituras do dashboard.
+# A blockchain e o WAHA são substituídos por servidores HTTP locais.
+# Os resultados (vazão, latências, contenção no SQLite) são gravados em JSON.
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import shutil
+import sqlite3
+import asyncio
+import logging
+import argparse
+import platform
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+
+logger = logging.getLogger('backend_benchmark')
+
+READ_ENDPOINTS = [
+    ("/api/waste-detections", {"limit": 50}),
+    ("/api/waste-detections", {"limit": 100, "status": "Aberto"}),
+    ("/api/cameras", {}),
+    ("/api/cameras/camera_01/detections", {}),
+]
+
+CAMERAS = ["camera_01", "camera_02", "camera_03"]
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    # Responde como o nó da blockchain (POST /mine) e como o WAHA (POST /api/send*)
+    latency = 0.0
+    counter = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            _StubHandler.counter += 1
+            index = _StubHandler.counter
+        if self.path == "/mine":
+            payload = {"message": "ok", "index": index, "hash": uuid.uuid4().hex + uuid.uuid4().hex}
+        else:
+            payload = {"id": index}
+        self._send(200, payload)
+
+    def do_GET(self):
+        if self.path.startswith("/chain"):
+            self._send(200, [])
+        else:
+            self._send(200, {"valid": True})
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(latency):
+    handler = type("StubHandler", (_StubHandler,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def make_image(size_kb):
+    # Um JPEG real (quando o OpenCV está disponível) para que o processamento de imagens seja exercitado
+    try:
+        import cv2
+        import numpy as np
+        side = max(64, int((size_kb * 1024 / 3) ** 0.5 * 2))
+        image = np.random.default_rng(0).integers(0, 256, (side, side, 3), dtype=np.uint8)
+        image = cv2.GaussianBlur(image, (0, 0), 2)
+        ok, encoded = cv2.imencode(".jpg", image)
+        if ok:
+            return encoded.tobytes()
+    except ImportError:
+        pass
+    return os.urandom(size_kb * 1024)
+
+
+def seed_detections(database, target_rows):
+    # Insere detecções sintéticas diretamente no SQLite até atingir target_rows
+    with sqlite3.connect(database.DB_PATH) as db:
+        current = db.execute("SELECT COUNT(*) FROM detections").fetchone()[0]
+        missing = target_rows - current
+        if missing <= 0:
+            return current
+
+        rng = random.Random(current)
+        start = datetime.now() - timedelta(days=365)
+        statuses = ["Aberto", "Em Atendimento", "Concluído"]
+        batch = []
+        for i in range(missing):
+            timestamp = (start + timedelta(seconds=rng.randint(0, 365 * 86400))).isoformat()
+            batch.append((
+                str(uuid.uuid4()),
+                rng.choice(CAMERAS),
+                timestamp,
+                json.dumps({"latitude": -8.05 + rng.uniform(-0.05, 0.05),
+                            "longitude": -34.9 + rng.uniform(-0.05, 0.05)}),
+                rng.uniform(1000, 20000),
+                "Desconhecido",
+                None,
+                rng.choice(statuses),
+                None,
+                timestamp,
+                None,
+            ))
+            if len(batch) >= 5000:
+                db.executemany(database.INSERT_DETECTION, batch)
+                batch = []
+        if batch:
+            db.executemany(database.INSERT_DETECTION, batch)
+        db.commit()
+        return target_rows
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(q / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies, errors, elapsed):
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": len(latencies) / elapsed if elapsed else None,
+        "p50_ms": (percentile(latencies, 50) or 0) * 1000,
+        "p95_ms": (percentile(latencies, 95) or 0) * 1000,
+        "p99_ms": (percentile(latencies, 99) or 0) * 1000,
+    }
+
+
+def db_snapshot(metrics):
+    # Tempo acumulado e erros por operação no SQLite, a partir do registro de métricas
+    snapshot = {}
+    for (operation,), (count, total) in metrics.DB_QUERY_SECONDS.totals().items():
+        snapshot[operation] = {"count": count, "total_s": total, "errors": metrics.DB_ERRORS.value(operation=operation)}
+    return snapshot
+
+
+def db_delta(before, after):
+    delta = {}
+    for operation, values in after.items():
+        previous = before.get(operation, {"count": 0, "total_s": 0.0, "errors": 0})
+        count = values["count"] - previous["count"]
+        if count <= 0:
+            continue
+        total = values["total_s"] - previous["total_s"]
+        delta[operation] = {
+            "count": count,
+            "mean_ms": total / count * 1000,
+            "errors": values["errors"] - previous["errors"],
+        }
+    return delta
+
+
+async def run_load(client, args, image):
+    ingest_latencies, read_latencies = [], []
+    counters = {"ingest_errors": 0, "read_errors": 0, "locked": 0}
+    deadline = time.monotonic() + args.duration
+    rng = random.Random(args.seed)
+
+    async def ingest():
+        data = {
+            "camera_id": rng.choice(CAMERAS),
+            "timestamp": datetime.now().isoformat(),
+            "latitude": str(-8.05 + rng.uniform(-0.05, 0.05)),
+            "longitude": str(-34.9 + rng.uniform(-0.05, 0.05)),
+            "detection_area": str(rng.uniform(1000, 20000)),
+        }
+        files = {"image": ("frame.jpg", image, "image/jpeg")}
+        started = time.perf_counter()
+        response = await client.post("/api/waste-detection", data=data, files=files)
+        ingest_latencies.append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            counters["ingest_errors"] += 1
+            if "locked" in response.text:
+                counters["locked"] += 1
+
+    async def read():
+        path, params = rng.choice(READ_ENDPOINTS)
+        started = time.perf_counter()
+        response = await client.get(path, params=params)
+        read_latencies.append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            counters["read_errors"] += 1
+            if "locked" in response.text:
+                counters["locked"] += 1
+
+    async def worker():
+        while time.monotonic() < deadline:
+            try:
+                if rng.random() < args.read_ratio:
+                    await read()
+                else:
+                    await ingest()
+            except Exception as e:
+                # Erros não tratados pela API (ex.: "database is locked" propagado)
+                if "locked" in str(e):
+                    counters["locked"] += 1
+                counters["ingest_errors"] += 1
+
+    started = time.monotonic()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.monotonic() - started
+
+    return {
+        "elapsed_s": elapsed,
+        "ingest": summarize(ingest_latencies, counters["ingest_errors"], elapsed),
+        "read": summarize(read_latencies, counters["read_errors"], elapsed),
+        "sqlite_locked_errors": counters["locked"],
+    }
+
+
+async def run_benchmark(args, work_dir):
+    # Importar o backend apenas depois de configurar os stubs e o banco temporário
+    blockchain_server, blockchain_url = start_stub_server(args.stub_latency)
+    waha_server, waha_url = start_stub_server(args.stub_latency)
+
+    import database
+    import metrics
+    import main
+
+    database.DB_PATH = work_dir / "waste_detection.db"
+    main.DETECTIONS_DIR = work_dir / "detections"
+    main.DETECTIONS_DIR.mkdir(parents=True, exist_ok=True)
+    main.image_store = main.ImageStore(work_dir / "images", "/static/images")
+    main.blockchain_client.api_url = blockchain_url
+    main.notification_service.waha_url = waha_url
+
+    # init_db, o coordenador (fila de jobs do líder) e as tarefas periódicas
+    await main.startup_event()
+    image = make_image(args.image_kb)
+    results = []
+
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60) as client:
+            for rows in sorted(args.seed_rows):
+                seed_detections(database, rows)
+                logger.info(f"Executando carga com {rows} detecções na tabela")
+                before = db_snapshot(metrics)
+                result = await run_load(client, args, image)
+                result["seed_rows"] = rows
+                result["db_operations"] = db_delta(before, db_snapshot(metrics))
+                results.append(result)
+    finally:
+        await main.shutdown_event()
+        blockchain_server.shutdown()
+        waha_server.shutdown()
+
+    return results
+
+
+def compare_reports(report, baseline):
+    previous = {r["seed_rows"]: r for r in baseline.get("results", [])}
+    lines = []
+    for result in report["results"]:
+        old = previous.get(result["seed_rows"])
+        if not old:
+            continue
+        for kind in ("ingest", "read"):
+            new_rps, old_rps = result[kind]["throughput_rps"], old[kind]["throughput_rps"]
+            new_p99, old_p99 = result[kind]["p99_ms"], old[kind]["p99_ms"]
+            rps_change = (new_rps / old_rps - 1) * 100 if old_rps else 0
+            p99_change = (1 - new_p99 / old_p99) * 100 if old_p99 else 0
+            lines.append(f"{result['seed_rows']:>8} linhas {kind:>6}: vazão {rps_change:+.1f}%  p99 {p99_change:+.1f}%")
+    return lines
+
+
+def print_report(report):
+    for r in report["results"]:
+        for kind in ("ingest", "read"):
+            s = r[kind]
+            print(
+                f"{r['seed_rows']:>8} linhas {kind:>6}: {s['requests']:>6} req "
+                f"{s['throughput_rps'] or 0:8.1f} req/s p50 {s['p50_ms']:.1f} ms "
+                f"p95 {s['p95_ms']:.1f} ms p99 {s['p99_ms']:.1f} ms erros {s['errors']}"
+            )
+        print(f"{'':>8}        SQLite bloqueado: {r['sqlite_locked_errors']}")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Benchmark de ingestão e leitura do backend')
+
+    parser.add_argument('--seed-rows', nargs='+', type=int, default=[1000, 10000, 100000],
+                        help='Tamanhos da tabela de detecções a medir')
+    parser.add_argument('--duration', type=float, default=10.0,
+                        help='Duração (s) da carga em cada tamanho de tabela')
+    parser.add_argument('--concurrency', type=int, default=16,
+                        help='Clientes simultâneos')
+    parser.add_argument('--read-ratio', type=float, default=0.7,
+                        help='Fração das requisições que são leituras do dashboard')
+    parser.add_argument('--image-kb', type=int, default=60,
+                        help='Tamanho aproximado das imagens enviadas (KB)')
+    parser.add_argument('--stub-latency', type=float, default=0.0,
+                        help='Latência (s) simulada nos stubs da blockchain e do WAHA')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='Semente da geração de carga')
+    parser.add_argument('--work-dir', type=str, default=None,
+                        help='Pasta para o banco e imagens do benchmark (padrão: temporária)')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Arquivo JSON de saída com os resultados')
+    parser.add_argument('--compare', type=str, default=None,
+                        help='Arquivo JSON de uma execução anterior para comparação')
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    work_dir = Path(args.work_dir) if args.work_dir else Path(tempfile.mkdtemp(prefix="backend_bench_"))
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    # O log de cada requisição distorceria as medições
+    for name in ("backend", "blockchain_client", "notifications", "httpx"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    try:
+        results = asyncio.run(run_benchmark(args, work_dir))
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sqlite": sqlite3.sqlite_version,
+            "cpu_count": os.cpu_count(),
+        },
+        "parameters": {
+            "duration": args.duration,
+            "concurrency": args.concurrency,
+            "read_ratio": args.read_ratio,
+            "image_kb": args.image_kb,
+            "stub_latency": args.stub_latency,
+        },
+        "results": results,
+    }
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Resultados salvos em {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print("\nComparação com", args.compare)
+        for line in compare_reports(report, baseline):
+            print(line)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    sys.path.insert(0, str(Path(__file__).parent))
+    main()
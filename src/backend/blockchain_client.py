@@ -3,21 +3,22 @@ import logging
 import json
 from typing import Dict, Any, List, Optional
 import os
+from metrics import timed, BLOCKCHAIN_CALL_SECONDS, BLOCKCHAIN_ERRORS
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger('blockchain_client')
 
 BLOCKCHAIN_API_URL = os.getenv("BLOCKCHAIN_API_URL", "http://localhost:8080")
 
+# Campos de um bloco na resposta de /chain
+BLOCK_FIELDS = ("index", "timestamp", "data", "previous_hash", "hash", "nonce")
+
 class BlockchainClient:
     
     def __init__(self, api_url: str = BLOCKCHAIN_API_URL):
         self.api_url = api_url
         logger.info(f"Cliente da blockchain inicializado: {self.api_url}")
         
+    @timed(BLOCKCHAIN_CALL_SECONDS, operation="get_chain")
     async def get_chain(self) -> List[Dict[str, Any]]:
         try:
             async with httpx.AsyncClient() as client:
@@ -28,12 +29,33 @@ class BlockchainClient:
                     logger.info(f"Blockchain recuperada: {len(chain_data)} blocos")
                     return chain_data
                 else:
+                    BLOCKCHAIN_ERRORS.inc(operation="get_chain")
                     logger.error(f"Erro ao obter a blockchain: {response.status_code} - {response.text}")
                     return []
         except Exception as e:
+            BLOCKCHAIN_ERRORS.inc(operation="get_chain")
             logger.error(f"Erro ao obter a blockchain: {str(e)}")
             return []
             
+    @timed(BLOCKCHAIN_CALL_SECONDS, operation="get_chain_raw")
+    async def get_chain_raw(self) -> Optional[bytes]:
+        # Corpo JSON da cadeia sem decodificar, para ser repassado diretamente ao cliente
+        try:
+            async with httpx.AsyncClient() as client:
+                response = await client.get(f"{self.api_url}/chain", timeout=10)
+                
+                if response.status_code == 200:
+                    return response.content
+                else:
+                    BLOCKCHAIN_ERRORS.inc(operation="get_chain_raw")
+                    logger.error(f"Erro ao obter a blockchain: {response.status_code} - {response.text}")
+                    return None
+        except Exception as e:
+            BLOCKCHAIN_ERRORS.inc(operation="get_chain_raw")
+            logger.error(f"Erro ao obter a blockchain: {str(e)}")
+            return None
+            
+    @timed(BLOCKCHAIN_CALL_SECONDS, operation="get_block")
     async def get_block(self, block_hash: str) -> Optional[Dict[str, Any]]:
         try:
             async with httpx.AsyncClient() as client:
@@ -47,12 +69,39 @@ class BlockchainClient:
                     logger.warning(f"Bloco não encontrado: {block_hash}")
                     return None
                 else:
+                    BLOCKCHAIN_ERRORS.inc(operation="get_block")
                     logger.error(f"Erro ao obter o bloco: {response.status_code} - {response.text}")
                     return None
         except Exception as e:
+            BLOCKCHAIN_ERRORS.inc(operation="get_block")
             logger.error(f"Erro ao obter o bloco: {str(e)}")
             return None
             
+    @timed(BLOCKCHAIN_CALL_SECONDS, operation="get_blocks")
+    async def get_blocks(self, block_hashes: List[str]) -> Optional[Dict[str, Dict[str, Any]]]:
+        # Vários blocos em uma única chamada: hash -> bloco (hashes inexistentes
+        # ficam de fora). None em caso de erro, para não ser confundido com
+        # blocos ausentes.
+        try:
+            async with httpx.AsyncClient() as client:
+                response = await client.post(
+                    f"{self.api_url}/blocks/batch",
+                    json={"hashes": list(block_hashes)},
+                    timeout=10
+                )
+                
+                if response.status_code == 200:
+                    return {block["hash"]: block for block in response.json()}
+                else:
+                    BLOCKCHAIN_ERRORS.inc(operation="get_blocks")
+                    logger.error(f"Erro ao obter os blocos: {response.status_code} - {response.text}")
+                    return None
+        except Exception as e:
+            BLOCKCHAIN_ERRORS.inc(operation="get_blocks")
+            logger.error(f"Erro ao obter os blocos: {str(e)}")
+            return None
+            
+    @timed(BLOCKCHAIN_CALL_SECONDS, operation="add_block")
     async def add_block(self, data: Dict[str, Any]) -> Optional[str]:
         try:
             async with httpx.AsyncClient() as client:
@@ -65,15 +114,18 @@ class BlockchainClient:
                 if response.status_code == 200 or response.status_code == 201:
                     result = response.json()
                     block_hash = result.get("hash")
-                    logger.info(f"Novo bloco adicionado à blockchain: {block_hash}")
+                    logger.info(f"Novo bloco adicionado à blockchain: {block_hash} (mineração: {result.get('mining_ms')} ms)")
                     return block_hash
                 else:
+                    BLOCKCHAIN_ERRORS.inc(operation="add_block")
                     logger.error(f"Erro ao adicionar bloco: {response.status_code} - {response.text}")
                     return None
         except Exception as e:
+            BLOCKCHAIN_ERRORS.inc(operation="add_block")
             logger.error(f"Erro ao adicionar bloco: {str(e)}")
             return None
             
+    @timed(BLOCKCHAIN_CALL_SECONDS, operation="verify_chain")
     async def verify_chain(self) -> bool:
         try:
             async with httpx.AsyncClient() as client:
@@ -85,12 +137,15 @@ class BlockchainClient:
                     logger.info(f"Validação da blockchain: {is_valid}")
                     return is_valid
                 else:
+                    BLOCKCHAIN_ERRORS.inc(operation="verify_chain")
                     logger.error(f"Erro ao validar a blockchain: {response.status_code} - {response.text}")
                     return False
         except Exception as e:
+            BLOCKCHAIN_ERRORS.inc(operation="verify_chain")
             logger.error(f"Erro ao validar a blockchain: {str(e)}")
             return False
             
+    @timed(BLOCKCHAIN_CALL_SECONDS, operation="search_by_detection_id")
     async def search_by_detection_id(self, detection_id: str) -> Optional[Dict[str, Any]]:
         try:
             async with httpx.AsyncClient() as client:
@@ -110,24 +165,30 @@ class BlockchainClient:
                         logger.warning(f"Nenhum bloco encontrado para detecção {detection_id}")
                         return None
                 else:
+                    BLOCKCHAIN_ERRORS.inc(operation="search_by_detection_id")
                     logger.error(f"Erro na busca por detecção: {response.status_code} - {response.text}")
                     return None
         except Exception as e:
+            BLOCKCHAIN_ERRORS.inc(operation="search_by_detection_id")
             logger.error(f"Erro na busca por detecção: {str(e)}")
             return None
             
+    @staticmethod
+    def detection_block_data(detection_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "detection_id": detection_data.get("id"),
+            "camera_id": detection_data.get("camera_id"),
+            "timestamp": detection_data.get("timestamp"),
+            "coordinates": detection_data.get("coordinates"),
+            "waste_type": detection_data.get("waste_type", "Desconhecido"),
+            "detection_area": detection_data.get("detection_area"),
+            "status": detection_data.get("status", "Aberto"),
+            "image_reference": detection_data.get("image_url")
+        }
+        
     async def register_detection(self, detection_data: Dict[str, Any]) -> Optional[str]:
         try:
-            blockchain_data = {
-                "detection_id": detection_data.get("id"),
-                "camera_id": detection_data.get("camera_id"),
-                "timestamp": detection_data.get("timestamp"),
-                "coordinates": detection_data.get("coordinates"),
-                "waste_type": detection_data.get("waste_type", "Desconhecido"),
-                "detection_area": detection_data.get("detection_area"),
-                "status": detection_data.get("status", "Aberto"),
-                "image_reference": detection_data.get("image_url")
-            }
+            blockchain_data = self.detection_block_data(detection_data)
             
             block_hash = await self.add_block(blockchain_data)
             
@@ -142,9 +203,34 @@ class BlockchainClient:
             logger.error(f"Erro ao registrar detecção na blockchain: {str(e)}")
             return None
 
+    async def register_detections(self, detections: List[Dict[str, Any]]) -> Optional[str]:
+        # Um único bloco (uma única mineração) para um lote de detecções
+        try:
+            blockchain_data = {
+                "detections": [self.detection_block_data(detection) for detection in detections]
+            }
+            
+            block_hash = await self.add_block(blockchain_data)
+            
+            if block_hash:
+                logger.info(f"{len(detections)} detecções registradas na blockchain: {block_hash}")
+                return block_hash
+            else:
+                logger.error(f"Falha ao registrar lote de {len(detections)} detecções na blockchain")
+                return None
+                
+        except Exception as e:
+            logger.error(f"Erro ao registrar lote de detecções na blockchain: {str(e)}")
+            return None
+
 if __name__ == "__main__":
     import asyncio
     
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    
     async def test_blockchain():
         client = BlockchainClient()
         
@@ -0,0 +1,289 @@
+import os
+import gzip
+import zlib
+import logging
+import argparse
+import mimetypes
+from pathlib import Path
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import FileResponse
+from starlette.staticfiles import StaticFiles, NotModifiedResponse
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional; sem ele apenas gzip é negociado
+    brotli = None
+
+logger = logging.getLogger('compression')
+
+# Respostas menores que isso não compensam o custo de compressão
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 5))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+
+# Tipos comprimidos em tempo de requisição; imagens JPEG/PNG já são comprimidas
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "text/csv",
+    "text/plain",
+    "text/html",
+    "text/css",
+    "text/javascript",
+    "image/svg+xml",
+}
+
+# Extensões para as quais precompress_directory gera os arquivos .gz/.br
+PRECOMPRESS_EXTENSIONS = {".js", ".css", ".html", ".json", ".svg", ".txt", ".csv", ".map"}
+
+# Codificações em ordem de preferência, com a extensão do arquivo pré-comprimido
+SIDECAR_EXTENSIONS = {"br": ".br", "gzip": ".gz"}
+
+
+def supported_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    # "gzip, deflate, br;q=0.9" -> "br" (ou "gzip" sem brotli instalado)
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    wildcard = accepted.get("*", 0.0)
+    candidates = [
+        (accepted.get(encoding, wildcard), encoding) for encoding in supported_encodings()
+    ]
+    quality, encoding = max(candidates, key=lambda candidate: candidate[0])
+    return encoding if quality > 0 else None
+
+
+def _media_type(headers) -> str:
+    return headers.get("content-type", "").split(";")[0].strip().lower()
+
+
+class _Compressor:
+    # Interface comum a gzip e brotli; flush() entrega o que já foi comprimido
+    # sem encerrar o fluxo (necessário nas respostas em streaming)
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+class CompressionMiddleware:
+    # Comprime as respostas de texto (JSON, CSV, NDJSON...) acima de minimum_size
+    # com a codificação negociada pelo Accept-Encoding. Respostas parciais (206)
+    # e já codificadas (arquivos .gz/.br servidos por PrecompressedStaticFiles)
+    # passam intactas.
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(send, encoding, self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+
+    def __init__(self, send, encoding: str, minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            headers = MutableHeaders(raw=message["headers"])
+            eligible = (
+                _media_type(headers) in COMPRESSIBLE_TYPES
+                and "content-encoding" not in headers
+                and "content-range" not in headers
+                and message["status"] not in (204, 206, 304)
+            )
+            if not eligible:
+                self.passthrough = True
+                await self._send(message)
+                return
+            headers.add_vary_header("Accept-Encoding")
+            # O início é retido até conhecermos o tamanho do primeiro bloco do corpo
+            self.start_message = message
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+            headers = MutableHeaders(raw=start["headers"])
+            if not more_body and len(body) < self.minimum_size:
+                self.passthrough = True
+                await self._send(start)
+                await self._send(message)
+                return
+
+            self.compressor = _Compressor(self.encoding)
+            headers["Content-Encoding"] = self.encoding
+            if "etag" in headers:
+                # A representação comprimida é outra: a ETag deixa de ser forte
+                etag = headers["etag"]
+                headers["ETag"] = etag if etag.startswith("W/") else f"W/{etag}"
+            if more_body:
+                # Streaming: o tamanho final não é conhecido
+                del headers["content-length"]
+                await self._send(start)
+            else:
+                body = self.compressor.compress(body) + self.compressor.finish()
+                headers["Content-Length"] = str(len(body))
+                await self._send(start)
+                await self._send({"type": "http.response.body", "body": body})
+                return
+
+        chunk = self.compressor.compress(body)
+        if not more_body:
+            chunk += self.compressor.finish()
+        await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    # StaticFiles que, havendo <arquivo>.br ou <arquivo>.gz ao lado do original
+    # (gerados por precompress_directory), serve a versão pré-comprimida aceita
+    # pelo cliente em vez de comprimir a cada requisição
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        request_headers = Headers(scope=scope)
+        media_type = mimetypes.guess_type(str(full_path))[0] or "text/plain"
+        if media_type not in COMPRESSIBLE_TYPES:
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        accept_encoding = request_headers.get("accept-encoding", "")
+        for encoding, extension in SIDECAR_EXTENSIONS.items():
+            if not _accepts(accept_encoding, encoding):
+                continue
+            sidecar = f"{full_path}{extension}"
+            try:
+                sidecar_stat = os.stat(sidecar)
+            except OSError:
+                continue
+            if sidecar_stat.st_mtime < stat_result.st_mtime:
+                # Arquivo pré-comprimido desatualizado em relação ao original
+                continue
+            response = FileResponse(
+                sidecar,
+                status_code=status_code,
+                stat_result=sidecar_stat,
+                media_type=media_type,
+                headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"},
+            )
+            break
+        else:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+            response.headers["Vary"] = "Accept-Encoding"
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def _accepts(accept_encoding: str, encoding: str) -> bool:
+    # Os arquivos pré-comprimidos independem do brotli estar instalado
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip().lower() in (encoding, "*"):
+            return params.strip() not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def precompress_directory(directory: Path, minimum_size: int = COMPRESSION_MIN_SIZE) -> int:
+    # Gera <arquivo>.gz (e <arquivo>.br com brotli instalado) com compressão
+    # máxima para os arquivos de texto do diretório. Arquivos já atualizados são
+    # mantidos. Retorna quantos arquivos pré-comprimidos foram escritos.
+    written = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = Path(root) / name
+            if path.suffix not in PRECOMPRESS_EXTENSIONS:
+                continue
+            stat_result = path.stat()
+            if stat_result.st_size < minimum_size:
+                continue
+
+            data = None
+            for encoding, extension in SIDECAR_EXTENSIONS.items():
+                if encoding == "br" and brotli is None:
+                    continue
+                sidecar = path.with_name(path.name + extension)
+                if sidecar.exists() and sidecar.stat().st_mtime >= stat_result.st_mtime:
+                    continue
+                if data is None:
+                    data = path.read_bytes()
+                if encoding == "br":
+                    compressed = brotli.compress(data, quality=11)
+                else:
+                    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+                if len(compressed) >= len(data):
+                    continue
+                temporary = sidecar.with_name(sidecar.name + ".tmp")
+                temporary.write_bytes(compressed)
+                os.replace(temporary, sidecar)
+                written += 1
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera as versões pré-comprimidas (.gz/.br) dos arquivos estáticos')
+    parser.add_argument('directory', nargs='?',
+                        default=str(Path(__file__).parent.parent / "data" / "static"),
+                        help='Diretório dos arquivos estáticos (padrão: data/static)')
+    parser.add_argument('--min-size', type=int, default=COMPRESSION_MIN_SIZE,
+                        help=f'Tamanho mínimo em bytes (padrão: {COMPRESSION_MIN_SIZE})')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    written = precompress_directory(Path(args.directory), args.min_size)
+    logger.info(f"{written} arquivos pré-comprimidos gerados em {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
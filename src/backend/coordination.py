@@ -0,0 +1,183 @@
+import os
+import time
+import uuid
+import socket
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import database
+import metrics
+
+logger = logging.getLogger('coordination')
+
+# Coordenação entre os workers do uvicorn (run.py --workers), feita pelo próprio
+# SQLite: uma concessão (lease) renovada periodicamente elege um único líder, que
+# executa a fila de jobs e as tarefas periódicas; os demais só atendem requisições.
+LEASE_NAME = "leader"
+LEASE_TTL_SECONDS = float(os.getenv("LEASE_TTL_SECONDS", 15))
+LEASE_RENEW_SECONDS = LEASE_TTL_SECONDS / 3
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 1))
+JOB_BATCH_SIZE = 20
+JOB_TIMEOUT_SECONDS = 300  # job em execução há mais tempo é considerado abandonado
+JOB_RETRY_BASE_SECONDS = 5  # espera antes da n-ésima nova tentativa: base * 2^(n-1)
+INVALIDATION_POLL_INTERVAL = float(os.getenv("INVALIDATION_POLL_INTERVAL", 1))
+INVALIDATION_RETENTION_SECONDS = 3600
+
+IS_LEADER = metrics.registry.gauge(
+    "coordination_is_leader", "1 se este worker detém a liderança"
+)
+JOBS_PROCESSED = metrics.registry.counter(
+    "coordination_jobs_total", "Jobs executados pelo líder por resultado", ("kind", "result")
+)
+
+
+class Coordinator:
+
+    def __init__(self, worker_id: Optional[str] = None):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self._handlers: Dict[str, Callable[..., Awaitable[Any]]] = {}
+        self._subscribers: Dict[str, List[Callable[[Optional[str]], Any]]] = {}
+        self._last_invalidation = 0
+        self._next_prune = 0.0
+        self._wake = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    def handler(self, kind: str, func: Callable[..., Awaitable[Any]]):
+        # func(payload) executa um job do tipo kind; exceções geram nova tentativa
+        self._handlers[kind] = func
+
+    def subscribe(self, topic: str, callback: Callable[[Optional[str]], Any]):
+        self._subscribers.setdefault(topic, []).append(callback)
+
+    async def enqueue(self, kind: str, payload: Any, max_attempts: int = 5):
+        await database.enqueue_jobs([job(kind, payload, max_attempts)])
+        self.notify()
+
+    def notify(self):
+        # Jobs novos: o líder, se for este worker, não espera o próximo ciclo
+        self._wake.set()
+
+    async def publish(self, topic: str, key: Optional[str] = None):
+        # Aplicado imediatamente neste worker e, pela tabela invalidations, nos demais
+        self._dispatch(topic, key)
+        await database.publish_invalidation(topic, key, self.worker_id)
+
+    async def start(self):
+        self._last_invalidation = await database.get_last_invalidation_id()
+        await self._renew()
+        self._tasks = [
+            asyncio.create_task(self._lease_loop()),
+            asyncio.create_task(self._job_loop()),
+            asyncio.create_task(self._invalidation_loop()),
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.is_leader:
+            # Libera a liderança para outro worker assumir sem esperar a expiração
+            await database.release_lease(LEASE_NAME, self.worker_id)
+            self._set_leader(False)
+
+    async def run_if_leader(self, func: Callable[[], Awaitable[Any]]):
+        # Tarefas periódicas (compactação, arquivamento) rodam em um único worker
+        if self.is_leader:
+            return await func()
+        return None
+
+    def _set_leader(self, leader: bool):
+        if leader != self.is_leader:
+            logger.info(f"Worker {self.worker_id} {'assumiu' if leader else 'deixou'} a liderança")
+        self.is_leader = leader
+        IS_LEADER.set(1 if leader else 0)
+
+    async def _renew(self):
+        try:
+            self._set_leader(await database.acquire_lease(LEASE_NAME, self.worker_id, LEASE_TTL_SECONDS))
+        except Exception as e:
+            # Sem conseguir renovar, não é seguro continuar agindo como líder
+            logger.error(f"Erro ao renovar a liderança: {str(e)}")
+            self._set_leader(False)
+
+    async def _lease_loop(self):
+        while True:
+            await asyncio.sleep(LEASE_RENEW_SECONDS)
+            await self._renew()
+
+    async def _job_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if not self.is_leader:
+                continue
+            try:
+                while self.is_leader and await self.run_pending_jobs():
+                    pass
+            except Exception as e:
+                logger.error(f"Erro ao processar a fila de jobs: {str(e)}")
+
+    async def run_pending_jobs(self) -> int:
+        jobs = await database.claim_jobs(JOB_BATCH_SIZE, JOB_TIMEOUT_SECONDS)
+        for claimed in jobs:
+            await self._run_job(claimed)
+        return len(jobs)
+
+    async def _run_job(self, claimed: Dict[str, Any]):
+        kind = claimed["kind"]
+        func = self._handlers.get(kind)
+        if func is None:
+            await database.finish_job(claimed["id"], f"Tipo de job desconhecido: {kind}")
+            JOBS_PROCESSED.inc(kind=kind, result="failed")
+            return
+        if claimed["attempts"] > claimed["max_attempts"]:
+            # Reservado de novo após o líder anterior morrer durante a execução
+            await database.finish_job(claimed["id"], "Tentativas esgotadas")
+            JOBS_PROCESSED.inc(kind=kind, result="failed")
+            return
+
+        try:
+            await func(claimed["payload"])
+        except Exception as e:
+            retry_at = None
+            if claimed["attempts"] < claimed["max_attempts"]:
+                retry_at = time.time() + JOB_RETRY_BASE_SECONDS * 2 ** (claimed["attempts"] - 1)
+            logger.error(f"Erro no job {kind} ({claimed['id']}, tentativa {claimed['attempts']}): {str(e)}")
+            await database.finish_job(claimed["id"], str(e), retry_at)
+            JOBS_PROCESSED.inc(kind=kind, result="retry" if retry_at else "failed")
+            return
+
+        await database.finish_job(claimed["id"])
+        JOBS_PROCESSED.inc(kind=kind, result="done")
+
+    async def _invalidation_loop(self):
+        while True:
+            await asyncio.sleep(INVALIDATION_POLL_INTERVAL)
+            try:
+                for invalidation_id, topic, key, origin in await database.get_invalidations(self._last_invalidation):
+                    self._last_invalidation = invalidation_id
+                    if origin != self.worker_id:
+                        self._dispatch(topic, key)
+                if self.is_leader and time.monotonic() >= self._next_prune:
+                    await database.prune_invalidations(INVALIDATION_RETENTION_SECONDS)
+                    self._next_prune = time.monotonic() + INVALIDATION_RETENTION_SECONDS / 10
+            except Exception as e:
+                logger.error(f"Erro ao ler as invalidações: {str(e)}")
+
+    def _dispatch(self, topic: str, key: Optional[str]):
+        for callback in self._subscribers.get(topic, []):
+            try:
+                callback(key)
+            except Exception as e:
+                logger.error(f"Erro ao aplicar a invalidação {topic} ({key}): {str(e)}")
+
+
+def job(kind: str, payload: Any, max_attempts: int = 5) -> Dict[str, Any]:
+    # Formato aceito por database.enqueue_jobs e database.add_detection(jobs=...)
+    return {"kind": kind, "payload": payload, "max_attempts": max_attempts}
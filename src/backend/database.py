@@ -1,14 +1,19 @@
 import aiosqlite
 import json
+import math
 import os
-from datetime import datetime
+import re
+import time
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
+
+from metrics import timed, DB_QUERY_SECONDS, DB_ERRORS
 
 DB_DIR = Path(__file__).parent.parent / "data"
-DB_PATH = DB_DIR / "waste_detection.db"
+DB_PATH = Path(os.getenv("DATABASE_PATH", DB_DIR / "waste_detection.db"))
 
-os.makedirs(DB_DIR, exist_ok=True)
+os.makedirs(DB_PATH.parent, exist_ok=True)
 
 CREATE_DETECTIONS_TABLE = """
 CREATE TABLE IF NOT EXISTS detections (
@@ -39,24 +44,55 @@ CREATE TABLE IF NOT EXISTS cameras (
 INSERT_DETECTION = """
 INSERT INTO detections (
     id, camera_id, timestamp, coordinates, detection_area, 
-    waste_type, image_url, status, blockchain_hash, created_at
-) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+    waste_type, image_url, status, blockchain_hash, created_at, image_hash
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
 """
 
 GET_DETECTION_BY_ID = """
 SELECT * FROM detections WHERE id = ?;
 """
 
+# {assignments}: apenas os campos informados na atualização (ver _update_detection_row)
 UPDATE_DETECTION = """
-UPDATE detections SET status = ?, waste_type = ?, blockchain_hash = ? WHERE id = ?;
+UPDATE detections SET {assignments} WHERE id = ?;
+"""
+
+# Campos alteráveis por update_detection; os que incrementam version são os
+# editados pelas equipes (blockchain_hash é preenchido pelo próprio backend)
+UPDATABLE_FIELDS = ("status", "waste_type", "blockchain_hash")
+VERSIONED_FIELDS = ("status", "waste_type")
+
+# {source}: "detections" (ativas) ou "detections_all" (inclui o histórico arquivado).
+# {columns} e {where} são montados por list_detections a partir de DETECTION_FIELDS.
+LIST_DETECTIONS = """
+SELECT {columns} FROM {source}
+{where}
+ORDER BY timestamp DESC
+LIMIT ?;
 """
 
-GET_ALL_DETECTIONS = """
-SELECT * FROM detections ORDER BY timestamp DESC;
+# Campos disponíveis nas listagens (e na projeção ?fields=), na ordem da resposta
+DETECTION_FIELDS = (
+    "id", "camera_id", "timestamp", "coordinates", "detection_area", "waste_type",
+    "image_url", "status", "blockchain_hash", "created_at", "thumbnail_url", "medium_url",
+    "image_hash", "resolved_at", "occurrences", "last_seen", "version",
+)
+
+# Bloco da exportação: paginação pelo rowid, sem manter um cursor aberto entre blocos
+EXPORT_DETECTIONS = """
+SELECT rowid, {columns} FROM {table}
+WHERE rowid > ?{where}
+ORDER BY rowid
+LIMIT ?;
 """
 
-GET_DETECTIONS_BY_CAMERA = """
-SELECT * FROM detections WHERE camera_id = ? ORDER BY timestamp DESC;
+# coordinates é extraído pelo SQLite, evitando json.loads linha a linha
+_FIELD_COLUMNS = {
+    "coordinates": "json_extract(coordinates, '$.latitude'), json_extract(coordinates, '$.longitude')",
+}
+
+GET_ARCHIVED_DETECTION_BY_ID = """
+SELECT * FROM detections_all WHERE id = ?;
 """
 
 INSERT_CAMERA = """
@@ -72,16 +108,747 @@ UPDATE_CAMERA_STATUS = """
 UPDATE cameras SET status = ? WHERE id = ?;
 """
 
+# Sinais de vida acumulados em memória (heartbeats.HeartbeatBuffer): os timestamps
+# só avançam, já que cada worker grava o próprio buffer; uma câmera marcada como
+# Offline volta a Online ao dar sinal (Manutenção é preservada)
+GET_OFFLINE_CAMERAS = """
+SELECT id FROM cameras WHERE status = 'Offline' AND id IN ({placeholders});
+"""
+
+UPDATE_CAMERA_HEARTBEAT = """
+UPDATE cameras SET
+    last_seen = CASE WHEN last_seen IS NULL OR last_seen < :last_seen THEN :last_seen ELSE last_seen END,
+    last_detection = CASE
+        WHEN :last_detection IS NOT NULL AND (last_detection IS NULL OR last_detection < :last_detection)
+        THEN :last_detection ELSE last_detection END,
+    status = CASE WHEN status = 'Offline' THEN 'Online' ELSE status END
+WHERE id = :id;
+"""
+
+MARK_CAMERAS_OFFLINE = """
+UPDATE cameras SET status = 'Offline'
+WHERE status = 'Online' AND last_seen IS NOT NULL AND last_seen < ?
+RETURNING id;
+"""
+
+# Só detecções ainda abertas recebem novas ocorrências
+RECORD_OCCURRENCE = """
+UPDATE detections SET
+    occurrences = occurrences + 1,
+    last_seen = MAX(COALESCE(last_seen, timestamp), ?),
+    detection_area = ?
+WHERE id = ? AND status = 'Aberto';
+"""
+
+GET_OCCURRENCES = """
+SELECT occurrences FROM detections WHERE id = ?;
+"""
+
+UPDATE_DETECTION_IMAGES = """
+UPDATE detections SET thumbnail_url = ?, medium_url = ? WHERE id = ?;
+"""
+
+# Imagens originais endereçadas por conteúdo. location é relativo ao diretório
+# do nível (tier): "original" e "recompressed" ficam em static/images,
+# "archived" fica no diretório de arquivamento, fora da área servida.
+CREATE_IMAGES_TABLE = """
+CREATE TABLE IF NOT EXISTS images (
+    hash TEXT PRIMARY KEY,
+    location TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    ref_count INTEGER NOT NULL DEFAULT 0,
+    tier TEXT NOT NULL DEFAULT 'original',
+    created_at TEXT NOT NULL
+);
+"""
+
+CREATE_DETECTIONS_IMAGE_HASH_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_detections_image_hash ON detections (image_hash);
+"""
+
+CREATE_DETECTIONS_TIMESTAMP_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_detections_timestamp ON detections (timestamp);
+"""
+
+CREATE_DETECTIONS_CAMERA_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_detections_camera ON detections (camera_id, timestamp);
+"""
+
+UPSERT_IMAGE_REFERENCE = """
+INSERT INTO images (hash, location, size_bytes, ref_count, tier, created_at)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(hash) DO UPDATE SET
+    ref_count = ref_count + excluded.ref_count,
+    location = excluded.location,
+    size_bytes = excluded.size_bytes,
+    tier = excluded.tier;
+"""
+
+RECOUNT_IMAGE_REFERENCES = """
+UPDATE images SET ref_count = (
+    SELECT COUNT(*) FROM detections_all WHERE detections_all.image_hash = images.hash
+);
+"""
+
+GET_UNREFERENCED_IMAGES = """
+SELECT hash, location, size_bytes, tier FROM images WHERE ref_count = 0;
+"""
+
+GET_ALL_IMAGE_HASHES = """
+SELECT hash FROM images;
+"""
+
+DELETE_IMAGE = """
+DELETE FROM images WHERE hash = ?;
+"""
+
+# Imagens cujas detecções estão todas concluídas há mais de N dias (resolved_at;
+# detecções concluídas antes da coluna existir usam o timestamp)
+GET_IMAGES_FOR_RETENTION = """
+SELECT hash, location, size_bytes FROM images
+WHERE tier = 'original' AND ref_count > 0
+AND NOT EXISTS (
+    SELECT 1 FROM detections_all
+    WHERE detections_all.image_hash = images.hash
+    AND (detections_all.status != 'Concluído' OR COALESCE(detections_all.resolved_at, detections_all.timestamp) >= ?)
+)
+LIMIT ?;
+"""
+
+# Executadas na tabela ativa e em cada partição de arquivo ({table})
+UPDATE_DETECTIONS_IMAGE = """
+UPDATE {table} SET image_url = ?, image_hash = ? WHERE image_hash = ?;
+"""
+
+ARCHIVE_IMAGE = """
+UPDATE images SET tier = 'archived', location = ? WHERE hash = ?;
+"""
+
+# Arquivadas: o dashboard passa a exibir a versão média, ou a miniatura; sem
+# derivadas (gravadas sem OpenCV) a URL original é mantida
+UPDATE_DETECTIONS_ARCHIVED_IMAGE = """
+UPDATE {table} SET image_url = COALESCE(medium_url, thumbnail_url, image_url) WHERE image_hash = ?;
+"""
+
+GET_LEGACY_DETECTION_IMAGES = """
+SELECT id, image_url FROM detections
+WHERE image_hash IS NULL AND image_url LIKE '/static/detections/%'
+LIMIT ?;
+"""
+
+UPDATE_DETECTION_IMAGE = """
+UPDATE detections SET image_url = ?, image_hash = ? WHERE id = ?;
+"""
+
+UPDATE_IMAGE_TIER = """
+UPDATE images SET tier = ? WHERE hash = ?;
+"""
+
+# Agregados mantidos incrementalmente a cada inserção e mudança de status, para
+# que as consultas de estatísticas não dependam do tamanho do histórico.
+# bucket: "YYYY-MM-DDTHH" (hour), "YYYY-MM-DD" (day) ou "" (total)
+CREATE_DETECTION_ROLLUPS_TABLE = """
+CREATE TABLE IF NOT EXISTS detection_rollups (
+    granularity TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    camera_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    waste_type TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, bucket, camera_id, status, waste_type)
+);
+"""
+
+# Contagem diária por célula da grade (GRID_CELL_DEGREES) para mapas de calor
+CREATE_GRID_ROLLUPS_TABLE = """
+CREATE TABLE IF NOT EXISTS detection_grid_rollups (
+    day TEXT NOT NULL,
+    lat_cell INTEGER NOT NULL,
+    lon_cell INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, lat_cell, lon_cell, status)
+);
+"""
+
+# Índice de agrupamento do mapa: contagem acumulada (todo o histórico) por célula
+# em cada nível de zoom, com a soma das coordenadas para posicionar o cluster no centroide
+CREATE_CLUSTERS_TABLE = """
+CREATE TABLE IF NOT EXISTS detection_clusters (
+    zoom INTEGER NOT NULL,
+    lat_cell INTEGER NOT NULL,
+    lon_cell INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    sum_latitude REAL NOT NULL DEFAULT 0,
+    sum_longitude REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (zoom, lat_cell, lon_cell, status)
+);
+"""
+
+# Detecções concluídas por dia de conclusão, com a soma dos tempos de resolução
+CREATE_RESOLUTION_ROLLUPS_TABLE = """
+CREATE TABLE IF NOT EXISTS resolution_rollups (
+    day TEXT NOT NULL,
+    camera_id TEXT NOT NULL,
+    resolved INTEGER NOT NULL DEFAULT 0,
+    total_seconds REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, camera_id)
+);
+"""
+
+UPSERT_DETECTION_ROLLUP = """
+INSERT INTO detection_rollups (granularity, bucket, camera_id, status, waste_type, count)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(granularity, bucket, camera_id, status, waste_type)
+DO UPDATE SET count = count + excluded.count;
+"""
+
+UPSERT_GRID_ROLLUP = """
+INSERT INTO detection_grid_rollups (day, lat_cell, lon_cell, status, count)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(day, lat_cell, lon_cell, status)
+DO UPDATE SET count = count + excluded.count;
+"""
+
+UPSERT_CLUSTER = """
+INSERT INTO detection_clusters (zoom, lat_cell, lon_cell, status, count, sum_latitude, sum_longitude)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(zoom, lat_cell, lon_cell, status)
+DO UPDATE SET count = count + excluded.count,
+              sum_latitude = sum_latitude + excluded.sum_latitude,
+              sum_longitude = sum_longitude + excluded.sum_longitude;
+"""
+
+UPSERT_RESOLUTION_ROLLUP = """
+INSERT INTO resolution_rollups (day, camera_id, resolved, total_seconds)
+VALUES (?, ?, ?, ?)
+ON CONFLICT(day, camera_id)
+DO UPDATE SET resolved = resolved + excluded.resolved, total_seconds = total_seconds + excluded.total_seconds;
+"""
+
+# Horários com fuso (anteriores à normalização na ingestão): terminam em +HH:MM, -HH:MM ou Z
+GET_DETECTIONS_WITH_OFFSET = """
+SELECT id, timestamp, last_seen FROM {table}
+WHERE timestamp LIKE '%+__:__' OR timestamp LIKE '%-__:__' OR timestamp LIKE '%Z'
+OR last_seen LIKE '%+__:__' OR last_seen LIKE '%-__:__' OR last_seen LIKE '%Z';
+"""
+
+UPDATE_DETECTION_TIMESTAMPS = """
+UPDATE {table} SET timestamp = ?, last_seen = ? WHERE id = ?;
+"""
+
+GET_CAMERAS_WITH_OFFSET = """
+SELECT id, last_detection FROM cameras
+WHERE last_detection LIKE '%+__:__' OR last_detection LIKE '%-__:__' OR last_detection LIKE '%Z';
+"""
+
 UPDATE_CAMERA_LAST_DETECTION = """
 UPDATE cameras SET last_detection = ? WHERE id = ?;
 """
 
+COUNT_DETECTION_ROLLUPS = """
+SELECT (SELECT COUNT(*) FROM detection_rollups), (SELECT COUNT(*) FROM detection_clusters);
+"""
+
+GET_DETECTIONS_FOR_ROLLUP = """
+SELECT camera_id, timestamp, coordinates, status, waste_type, resolved_at FROM detections_all;
+"""
+
+GET_GRID_ROLLUPS = """
+SELECT lat_cell, lon_cell, SUM(count) AS count FROM detection_grid_rollups
+WHERE day >= ? AND day <= ? AND (? IS NULL OR status = ?)
+GROUP BY lat_cell, lon_cell
+HAVING SUM(count) > 0;
+"""
+
+GET_CLUSTERS = """
+SELECT lat_cell, lon_cell, SUM(count), SUM(sum_latitude), SUM(sum_longitude) FROM detection_clusters
+WHERE zoom = ? AND lat_cell BETWEEN ? AND ? AND lon_cell BETWEEN ? AND ? AND (? IS NULL OR status = ?)
+GROUP BY lat_cell, lon_cell
+HAVING SUM(count) > 0;
+"""
+
+GET_RESOLUTION_ROLLUPS = """
+SELECT {bucket} AS bucket, {camera} AS camera_id,
+       SUM(resolved) AS resolved, SUM(total_seconds) AS total_seconds
+FROM resolution_rollups
+WHERE day >= ? AND day <= ? AND (? IS NULL OR camera_id = ?)
+GROUP BY 1, 2
+HAVING SUM(resolved) > 0
+ORDER BY 1, 2;
+"""
+
+# Particionamento: detecções concluídas há mais de DETECTION_ARCHIVE_DAYS dias são
+# movidas para tabelas mensais detections_archive_AAAA_MM. A visão detections_all
+# une a tabela ativa e as partições para consultas ao histórico.
+CREATE_PARTITIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS detection_partitions (
+    name TEXT PRIMARY KEY,
+    month TEXT NOT NULL,
+    row_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL
+);
+"""
+
+GET_PARTITIONS = """
+SELECT name FROM detection_partitions ORDER BY month;
+"""
+
+UPSERT_PARTITION = """
+INSERT INTO detection_partitions (name, month, row_count, updated_at)
+VALUES (?, ?, ?, ?)
+ON CONFLICT(name) DO UPDATE SET row_count = row_count + excluded.row_count, updated_at = excluded.updated_at;
+"""
+
+DECREMENT_PARTITION = """
+UPDATE detection_partitions SET row_count = row_count - 1 WHERE name = ?;
+"""
+
+CREATE_PARTITION_TABLE = """
+CREATE TABLE IF NOT EXISTS {name} AS SELECT * FROM detections WHERE 0;
+"""
+
+CREATE_PARTITION_INDEXES = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS {name}_id ON {name} (id);",
+    "CREATE INDEX IF NOT EXISTS {name}_camera ON {name} (camera_id, timestamp);",
+    "CREATE INDEX IF NOT EXISTS {name}_timestamp ON {name} (timestamp);",
+    "CREATE INDEX IF NOT EXISTS {name}_image_hash ON {name} (image_hash);",
+]
+
+# A idade conta a partir da conclusão (resolved_at); detecções concluídas antes
+# da coluna existir usam o timestamp. A partição continua sendo a do mês da detecção.
+GET_ARCHIVABLE_DETECTIONS = """
+SELECT id, substr(timestamp, 1, 7) AS month FROM detections
+WHERE status = 'Concluído' AND COALESCE(resolved_at, timestamp) < ?
+ORDER BY timestamp
+LIMIT ?;
+"""
+
+# Coordenação entre workers (ver coordination.py). leases: o worker que detém o
+# nome até expires_at (epoch) é o líder. jobs: fila persistente das tarefas
+# executadas apenas pelo líder; concluídas são removidas e as em execução voltam
+# a ficar disponíveis se o líder morrer antes de concluí-las (available_at).
+# invalidations: sinais para os caches em memória de cada worker.
+CREATE_LEASES_TABLE = """
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+CREATE_JOBS_TABLE = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    available_at REAL NOT NULL,
+    last_error TEXT,
+    created_at TEXT NOT NULL
+);
+"""
+
+CREATE_JOBS_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_jobs_available ON jobs (status, available_at);
+"""
+
+CREATE_INVALIDATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS invalidations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    topic TEXT NOT NULL,
+    key TEXT,
+    origin TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+# Renova a concessão do detentor atual ou a toma se estiver expirada
+ACQUIRE_LEASE = """
+INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?)
+ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at
+WHERE leases.holder = excluded.holder OR leases.expires_at < ?;
+"""
+
+RELEASE_LEASE = """
+DELETE FROM leases WHERE name = ? AND holder = ?;
+"""
+
+INSERT_JOB = """
+INSERT INTO jobs (kind, payload, max_attempts, available_at, created_at) VALUES (?, ?, ?, ?, ?);
+"""
+
+# Reserva os próximos jobs disponíveis até ? (prazo para concluir)
+CLAIM_JOBS = """
+UPDATE jobs SET status = 'running', attempts = attempts + 1, available_at = ?
+WHERE id IN (
+    SELECT id FROM jobs
+    WHERE status IN ('pending', 'running') AND available_at <= ?
+    ORDER BY id
+    LIMIT ?
+)
+RETURNING id, kind, payload, attempts, max_attempts;
+"""
+
+COMPLETE_JOB = """
+DELETE FROM jobs WHERE id = ?;
+"""
+
+RETRY_JOB = """
+UPDATE jobs SET status = 'pending', available_at = ?, last_error = ? WHERE id = ?;
+"""
+
+FAIL_JOB = """
+UPDATE jobs SET status = 'failed', last_error = ? WHERE id = ?;
+"""
+
+COUNT_JOBS = """
+SELECT status, COUNT(*) FROM jobs GROUP BY status;
+"""
+
+INSERT_INVALIDATION = """
+INSERT INTO invalidations (topic, key, origin, created_at) VALUES (?, ?, ?, ?);
+"""
+
+GET_INVALIDATIONS = """
+SELECT id, topic, key, origin FROM invalidations WHERE id > ? ORDER BY id LIMIT 1000;
+"""
+
+GET_LAST_INVALIDATION_ID = """
+SELECT COALESCE(MAX(id), 0) FROM invalidations;
+"""
+
+PRUNE_INVALIDATIONS = """
+DELETE FROM invalidations WHERE created_at < ?;
+"""
+
+# Auditoria de integridade (ver audit.py). audit_state guarda o cursor da passada
+# em andamento (tabela e rowid da última detecção verificada); audit_findings,
+# as divergências atuais de cada detecção, substituídas a cada nova verificação.
+CREATE_AUDIT_STATE_TABLE = """
+CREATE TABLE IF NOT EXISTS audit_state (
+    name TEXT PRIMARY KEY,
+    table_name TEXT NOT NULL,
+    last_rowid INTEGER NOT NULL,
+    pass_started_at TEXT,
+    pass_checked INTEGER NOT NULL DEFAULT 0,
+    last_pass_completed_at TEXT,
+    updated_at TEXT NOT NULL
+);
+"""
+
+CREATE_AUDIT_FINDINGS_TABLE = """
+CREATE TABLE IF NOT EXISTS audit_findings (
+    detection_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    block_hash TEXT,
+    expected TEXT,
+    actual TEXT,
+    found_at TEXT NOT NULL,
+    PRIMARY KEY (detection_id, kind)
+);
+"""
+
+GET_AUDIT_STATE = """
+SELECT table_name, last_rowid, pass_started_at, pass_checked, last_pass_completed_at
+FROM audit_state WHERE name = ?;
+"""
+
+UPSERT_AUDIT_STATE = """
+INSERT INTO audit_state (name, table_name, last_rowid, pass_started_at, pass_checked, last_pass_completed_at, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(name) DO UPDATE SET
+    table_name = excluded.table_name,
+    last_rowid = excluded.last_rowid,
+    pass_started_at = excluded.pass_started_at,
+    pass_checked = excluded.pass_checked,
+    last_pass_completed_at = excluded.last_pass_completed_at,
+    updated_at = excluded.updated_at;
+"""
+
+# {table}: a tabela ativa ou uma partição de arquivo
+GET_AUDIT_PAGE = """
+SELECT rowid, id, camera_id, timestamp, coordinates, image_url, image_hash, blockchain_hash, created_at
+FROM {table}
+WHERE rowid > ?
+ORDER BY rowid
+LIMIT ?;
+"""
+
+# {placeholders}: um "?" por hash
+GET_IMAGES_BY_HASH = """
+SELECT hash, location, tier FROM images WHERE hash IN ({placeholders});
+"""
+
+DELETE_AUDIT_FINDINGS = """
+DELETE FROM audit_findings WHERE detection_id = ?;
+"""
+
+INSERT_AUDIT_FINDING = """
+INSERT OR REPLACE INTO audit_findings (detection_id, kind, block_hash, expected, actual, found_at)
+VALUES (?, ?, ?, ?, ?, ?);
+"""
+
+GET_AUDIT_FINDINGS = """
+SELECT detection_id, kind, block_hash, expected, actual, found_at FROM audit_findings
+{where}
+ORDER BY found_at DESC
+LIMIT ?;
+"""
+
+COUNT_AUDIT_FINDINGS = """
+SELECT kind, COUNT(*) FROM audit_findings GROUP BY kind;
+"""
+
+DETECTION_ARCHIVE_DAYS = int(os.getenv("DETECTION_ARCHIVE_DAYS", 90))
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", 5000))
+INIT_LOCK_TIMEOUT = 120  # segundos que um worker espera outro terminar init_db
+# Versão do esquema, gravada em PRAGMA user_version ao fim de init_db. Deve ser
+# incrementada a cada mudança nas etapas de init_db (tabelas, colunas, índices,
+# agregados, câmeras de exemplo): com a versão atual, a inicialização só lê o
+# cabeçalho do banco
+SCHEMA_VERSION = 3
+
+ROLLUP_GRANULARITIES = {"hour": 13, "day": 10, "total": 0}  # tamanho do prefixo do timestamp
+ROLLUP_GROUP_FIELDS = ("bucket", "camera_id", "status", "waste_type")
+GRID_CELL_DEGREES = 0.001  # ~110 m
+
+# Níveis de zoom do mapa (Leaflet) com índice de agrupamento. A célula de cada
+# nível tem ~64 px na tela: 360 / 2^(zoom + 2) graus. Zooms fora da faixa usam o
+# nível mais próximo.
+CLUSTER_MIN_ZOOM = 6
+CLUSTER_MAX_ZOOM = 17
+
+# Colunas adicionadas depois da criação inicial das tabelas: (tabela, coluna, definição)
+MIGRATION_COLUMNS = [
+    ("detections", "thumbnail_url", "TEXT"),
+    ("detections", "medium_url", "TEXT"),
+    ("detections", "image_hash", "TEXT"),
+    ("detections", "resolved_at", "TEXT"),
+    ("detections", "occurrences", "INTEGER NOT NULL DEFAULT 1"),
+    ("detections", "last_seen", "TEXT"),
+    ("detections", "version", "INTEGER NOT NULL DEFAULT 1"),
+    ("cameras", "last_seen", "TEXT"),
+]
+
+# Definição completa (com NOT NULL DEFAULT) das colunas migradas da tabela ativa,
+# usada também ao adicioná-las às partições: PRAGMA table_info só informa o tipo
+DETECTION_COLUMN_DEFINITIONS = {
+    column: definition for table, column, definition in MIGRATION_COLUMNS if table == "detections"
+}
+
+async def migrate_columns(db, columns):
+    # Adiciona as colunas que ainda não existem em bancos criados por versões anteriores
+    existing = {}
+    for table, column, definition in columns:
+        if table not in existing:
+            cursor = await db.execute(f"PRAGMA table_info({table});")
+            existing[table] = {row[1] for row in await cursor.fetchall()}
+        if column not in existing[table]:
+            await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition};")
+            existing[table].add(column)
+
+async def table_columns(db, table: str) -> List[Tuple[str, str]]:
+    cursor = await db.execute(f"PRAGMA table_info({table});")
+    return [(row[1], row[2]) for row in await cursor.fetchall()]
+
+async def get_partitions(db) -> List[str]:
+    cursor = await db.execute(GET_PARTITIONS)
+    return [row[0] for row in await cursor.fetchall()]
+
+async def detection_tables(db) -> List[str]:
+    return ["detections"] + await get_partitions(db)
+
+def partition_name(month: str) -> str:
+    # month vem de substr(timestamp, 1, 7); qualquer coisa fora de AAAA-MM vai para uma partição única
+    if re.fullmatch(r"\d{4}-\d{2}", month or ""):
+        return f"detections_archive_{month.replace('-', '_')}"
+    return "detections_archive_other"
+
+async def ensure_partition(db, month: str) -> str:
+    name = partition_name(month)
+    await db.execute(CREATE_PARTITION_TABLE.format(name=name))
+    for statement in CREATE_PARTITION_INDEXES:
+        await db.execute(statement.format(name=name))
+    return name
+
+async def rebuild_detections_view(db):
+    # As partições recebem as colunas adicionadas à tabela ativa depois da sua criação,
+    # para que a visão possa listar as mesmas colunas em todas as tabelas
+    columns = await table_columns(db, "detections")
+    partitions = await get_partitions(db)
+    for partition in partitions:
+        existing = {name for name, _ in await table_columns(db, partition)}
+        for name, definition in columns:
+            definition = DETECTION_COLUMN_DEFINITIONS.get(name, definition)
+            if name not in existing:
+                await db.execute(f"ALTER TABLE {partition} ADD COLUMN {name} {definition};")
+            elif "DEFAULT" in definition:
+                # Partições migradas antes, sem o valor padrão: as linhas ficaram com
+                # NULL, que restore_detection não pode copiar para a tabela ativa
+                default = definition.split("DEFAULT", 1)[1].strip()
+                await db.execute(f"UPDATE {partition} SET {name} = {default} WHERE {name} IS NULL;")
+
+    column_list = ", ".join(name for name, _ in columns)
+    selects = [f"SELECT {column_list} FROM {table}" for table in ["detections"] + partitions]
+    await db.execute("DROP VIEW IF EXISTS detections_all;")
+    await db.execute(f"CREATE VIEW detections_all AS {' UNION ALL '.join(selects)};")
+
+async def restore_detection(db, detection_id: str) -> bool:
+    # Move uma detecção arquivada de volta para a tabela ativa (ex.: ao ser reaberta)
+    columns = ", ".join(name for name, _ in await table_columns(db, "detections"))
+    for partition in await get_partitions(db):
+        cursor = await db.execute(
+            f"INSERT INTO detections ({columns}) SELECT {columns} FROM {partition} WHERE id = ?;",
+            (detection_id,)
+        )
+        if cursor.rowcount:
+            await db.execute(f"DELETE FROM {partition} WHERE id = ?;", (detection_id,))
+            await db.execute(DECREMENT_PARTITION, (partition,))
+            return True
+    return False
+
+def _grid_cell(value: float) -> int:
+    return int(math.floor(value / GRID_CELL_DEGREES))
+
+def cluster_zoom(zoom: int) -> int:
+    return min(max(zoom, CLUSTER_MIN_ZOOM), CLUSTER_MAX_ZOOM)
+
+def cluster_cell_degrees(zoom: int) -> float:
+    return 360.0 / 2 ** (cluster_zoom(zoom) + 2)
+
+async def apply_rollups(db, detection: Dict[str, Any], sign: int):
+    # Soma (sign=1) ou subtrai (sign=-1) a detecção dos agregados de contagem, da grade
+    # e do índice de agrupamento do mapa
+    timestamp = detection["timestamp"]
+    key = (detection["camera_id"], detection["status"], detection["waste_type"])
+    for granularity, length in ROLLUP_GRANULARITIES.items():
+        await db.execute(UPSERT_DETECTION_ROLLUP, (granularity, timestamp[:length], *key, sign))
+
+    coordinates = detection.get("coordinates") or {}
+    latitude, longitude = coordinates.get("latitude"), coordinates.get("longitude")
+    if latitude is not None and longitude is not None:
+        await db.execute(
+            UPSERT_GRID_ROLLUP,
+            (timestamp[:10], _grid_cell(latitude), _grid_cell(longitude), detection["status"], sign)
+        )
+        await db.executemany(UPSERT_CLUSTER, [
+            (zoom,
+             int(math.floor(latitude / cluster_cell_degrees(zoom))),
+             int(math.floor(longitude / cluster_cell_degrees(zoom))),
+             detection["status"], sign, sign * latitude, sign * longitude)
+            for zoom in range(CLUSTER_MIN_ZOOM, CLUSTER_MAX_ZOOM + 1)
+        ])
+
+def local_datetime(value) -> datetime:
+    # Horários são gravados no horário local sem fuso (como datetime.now()) e
+    # comparados como texto; valores com fuso (ex.: +00:00, enviados pelo cliente)
+    # são convertidos. Aceita datetime ou texto ISO
+    parsed = datetime.fromisoformat(value) if isinstance(value, str) else value
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+async def normalize_timestamps(db) -> int:
+    # Detecções gravadas antes da normalização na ingestão; retorna quantas mudaram.
+    # A partição de arquivo continua a do mês original
+    changed = 0
+    for table in await detection_tables(db):
+        cursor = await db.execute(GET_DETECTIONS_WITH_OFFSET.format(table=table))
+        for detection_id, timestamp, last_seen in await cursor.fetchall():
+            await db.execute(
+                UPDATE_DETECTION_TIMESTAMPS.format(table=table),
+                (local_datetime(timestamp).isoformat(),
+                 local_datetime(last_seen).isoformat() if last_seen else None,
+                 detection_id)
+            )
+            changed += 1
+    cursor = await db.execute(GET_CAMERAS_WITH_OFFSET)
+    for camera_id, last_detection in await cursor.fetchall():
+        await db.execute(UPDATE_CAMERA_LAST_DETECTION, (local_datetime(last_detection).isoformat(), camera_id))
+    return changed
+
+async def apply_resolution_rollup(db, detection: Dict[str, Any], sign: int):
+    resolved_at = detection.get("resolved_at")
+    if not resolved_at:
+        return
+    resolved = local_datetime(resolved_at)
+    seconds = (resolved - local_datetime(detection["timestamp"])).total_seconds()
+    await db.execute(
+        UPSERT_RESOLUTION_ROLLUP,
+        (resolved.date().isoformat(), detection["camera_id"], sign, sign * max(seconds, 0.0))
+    )
+
+async def rebuild_rollups(db):
+    # Recalcula todos os agregados a partir da tabela de detecções
+    await db.execute("DELETE FROM detection_rollups;")
+    await db.execute("DELETE FROM detection_grid_rollups;")
+    await db.execute("DELETE FROM detection_clusters;")
+    await db.execute("DELETE FROM resolution_rollups;")
+    cursor = await db.execute(GET_DETECTIONS_FOR_ROLLUP)
+    while True:
+        rows = await cursor.fetchmany(1000)
+        if not rows:
+            break
+        for camera_id, timestamp, coordinates, status, waste_type, resolved_at in rows:
+            detection = {
+                "camera_id": camera_id,
+                "timestamp": timestamp,
+                "coordinates": json.loads(coordinates),
+                "status": status,
+                "waste_type": waste_type,
+                "resolved_at": resolved_at,
+            }
+            await apply_rollups(db, detection, 1)
+            await apply_resolution_rollup(db, detection, 1)
+
+async def schema_version(db) -> int:
+    cursor = await db.execute("PRAGMA user_version;")
+    return (await cursor.fetchone())[0]
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="init_db")
 async def init_db():
     """Inicializar o banco de dados."""
-    async with aiosqlite.connect(DB_PATH) as db:
+    # Com vários workers, todos executam init_db ao iniciar: criação, migrações e
+    # recálculo dos agregados ficam em uma única transação, um worker por vez
+    async with aiosqlite.connect(DB_PATH, timeout=INIT_LOCK_TIMEOUT) as db:
+        if await schema_version(db) == SCHEMA_VERSION:
+            return
+        await db.execute("BEGIN IMMEDIATE;")
+        # Outro worker pode ter concluído a inicialização enquanto este aguardava
+        if await schema_version(db) == SCHEMA_VERSION:
+            await db.rollback()
+            return
         await db.execute(CREATE_DETECTIONS_TABLE)
         await db.execute(CREATE_CAMERAS_TABLE)
-        await db.commit()
+        await db.execute(CREATE_IMAGES_TABLE)
+        await migrate_columns(db, MIGRATION_COLUMNS)
+        await db.execute(CREATE_DETECTIONS_IMAGE_HASH_INDEX)
+        await db.execute(CREATE_DETECTIONS_TIMESTAMP_INDEX)
+        await db.execute(CREATE_DETECTIONS_CAMERA_INDEX)
+        await db.execute(CREATE_PARTITIONS_TABLE)
+        await rebuild_detections_view(db)
+        await db.execute(CREATE_DETECTION_ROLLUPS_TABLE)
+        await db.execute(CREATE_GRID_ROLLUPS_TABLE)
+        await db.execute(CREATE_RESOLUTION_ROLLUPS_TABLE)
+        await db.execute(CREATE_CLUSTERS_TABLE)
+        await db.execute(CREATE_LEASES_TABLE)
+        await db.execute(CREATE_JOBS_TABLE)
+        await db.execute(CREATE_JOBS_INDEX)
+        await db.execute(CREATE_INVALIDATIONS_TABLE)
+        await db.execute(CREATE_AUDIT_STATE_TABLE)
+        await db.execute(CREATE_AUDIT_FINDINGS_TABLE)
+
+        normalized = await normalize_timestamps(db)
+
+        # Bancos anteriores aos agregados ou ao índice do mapa, ou com horários
+        # normalizados (os buckets mudam): calcular a partir das detecções
+        cursor = await db.execute(COUNT_DETECTION_ROLLUPS)
+        if normalized or 0 in await cursor.fetchone():
+            await rebuild_rollups(db)
 
         # Inserir algumas câmeras de exemplo se a tabela estiver vazia
         cursor = await db.execute("SELECT COUNT(*) FROM cameras;")
@@ -115,9 +882,16 @@ async def init_db():
             ]
             for camera in sample_cameras:
                 await db.execute(INSERT_CAMERA, camera)
-            await db.commit()
+        await db.execute(f"PRAGMA user_version = {SCHEMA_VERSION};")
+        await db.commit()
         
-async def add_detection(detection_data: Dict[str, Any], image_url: Optional[str] = None) -> str:
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="add_detection")
+async def add_detection(
+    detection_data: Dict[str, Any],
+    image_url: Optional[str] = None,
+    image: Optional[Dict[str, Any]] = None,
+    jobs: Optional[List[Dict[str, Any]]] = None
+) -> str:
     detection_id = detection_data.get("id")
     camera_id = detection_data.get("camera_id")
     timestamp = detection_data.get("timestamp")
@@ -126,6 +900,7 @@ async def add_detection(detection_data: Dict[str, Any], image_url: Optional[str]
     waste_type = detection_data.get("waste_type", "Desconhecido")
     status = detection_data.get("status", "Aberto")
     blockchain_hash = detection_data.get("blockchain_hash")
+    image_hash = image.get("hash") if image else None
     created_at = datetime.now().isoformat()
     
     async with aiosqlite.connect(DB_PATH) as db:
@@ -133,23 +908,42 @@ async def add_detection(detection_data: Dict[str, Any], image_url: Optional[str]
             INSERT_DETECTION,
             (
                 detection_id, camera_id, timestamp, coordinates, detection_area,
-                waste_type, image_url, status, blockchain_hash, created_at
+                waste_type, image_url, status, blockchain_hash, created_at, image_hash
             )
         )
-        await db.commit()
-        
-        # Atualizar o último timestamp de detecção da câmera
-        await db.execute(UPDATE_CAMERA_LAST_DETECTION, (timestamp, camera_id))
+        # A referência à imagem e os agregados são atualizados na mesma transação da detecção
+        if image:
+            await db.execute(
+                UPSERT_IMAGE_REFERENCE,
+                (image_hash, image["location"], image["size_bytes"], 1, "original", created_at)
+            )
+        await apply_rollups(db, {
+            "camera_id": camera_id,
+            "timestamp": timestamp,
+            "coordinates": detection_data.get("coordinates"),
+            "status": status,
+            "waste_type": waste_type,
+        }, 1)
+        # Tarefas decorrentes da detecção (blockchain, notificação) entram na fila
+        # junto com ela: não há detecção sem tarefas nem tarefas sem detecção
+        if jobs:
+            await _insert_jobs(db, jobs)
         await db.commit()
     
     return detection_id
 
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="get_detection")
 async def get_detection(detection_id: str) -> Dict[str, Any]:
     async with aiosqlite.connect(DB_PATH) as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute(GET_DETECTION_BY_ID, (detection_id,))
         row = await cursor.fetchone()
         
+        if not row:
+            # Não está entre as ativas: procurar no histórico arquivado
+            cursor = await db.execute(GET_ARCHIVED_DETECTION_BY_ID, (detection_id,))
+            row = await cursor.fetchone()
+            
         if not row:
             return None
             
@@ -158,48 +952,254 @@ async def get_detection(detection_id: str) -> Dict[str, Any]:
         
         return detection
 
-async def update_detection(detection_id: str, update_data: Dict[str, Any]) -> bool:
-    status = update_data.get("status")
-    waste_type = update_data.get("waste_type")
-    blockchain_hash = update_data.get("blockchain_hash")
-    
+async def _update_detection_row(
+    db,
+    detection_id: str,
+    changes: Dict[str, Any],
+    expected_version: Optional[int] = None
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    # Lê o estado anterior e grava só os campos informados, dentro da transação
+    # corrente (BEGIN IMMEDIATE), mantendo os agregados consistentes.
+    # Retorna ("updated" | "unchanged" | "conflict" | "not_found", detecção resultante).
+    cursor = await db.execute(GET_DETECTION_BY_ID, (detection_id,))
+    row = await cursor.fetchone()
+    if not row and await restore_detection(db, detection_id):
+        cursor = await db.execute(GET_DETECTION_BY_ID, (detection_id,))
+        row = await cursor.fetchone()
+    if not row:
+        return "not_found", None
+
+    previous = dict(row)
+    previous["coordinates"] = json.loads(previous["coordinates"])
+    if expected_version is not None and previous["version"] != expected_version:
+        return "conflict", previous
+
+    # Valores nulos mantêm o valor atual, como antes
+    changes = {
+        field: value for field, value in changes.items()
+        if field in UPDATABLE_FIELDS and value is not None and value != previous[field]
+    }
+    current = {**previous, **changes}
+
+    # Tempo de resolução: da detecção até a passagem para "Concluído"
+    if current["status"] == "Concluído" and previous["status"] != "Concluído":
+        current["resolved_at"] = datetime.now().isoformat()
+    elif current["status"] != "Concluído":
+        current["resolved_at"] = None
+
+    assignments = [f"{field} = ?" for field in changes]
+    params = list(changes.values())
+    if current["resolved_at"] != previous["resolved_at"]:
+        assignments.append("resolved_at = ?")
+        params.append(current["resolved_at"])
+    if not assignments:
+        return "unchanged", previous
+    if any(field in VERSIONED_FIELDS for field in changes):
+        assignments.append("version = version + 1")
+        current["version"] += 1
+
+    await db.execute(UPDATE_DETECTION.format(assignments=", ".join(assignments)), (*params, detection_id))
+
+    if (current["status"], current["waste_type"]) != (previous["status"], previous["waste_type"]):
+        await apply_rollups(db, previous, -1)
+        await apply_rollups(db, current, 1)
+    if current["resolved_at"] != previous["resolved_at"]:
+        await apply_resolution_rollup(db, previous, -1)
+        await apply_resolution_rollup(db, current, 1)
+
+    return "updated", current
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="update_detection")
+async def update_detection(
+    detection_id: str,
+    update_data: Dict[str, Any],
+    expected_version: Optional[int] = None
+) -> Tuple[str, Optional[Dict[str, Any]]]:
     async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
-            UPDATE_DETECTION,
-            (status, waste_type, blockchain_hash, detection_id)
-        )
+        db.row_factory = aiosqlite.Row
+        await db.execute("BEGIN IMMEDIATE;")
+        outcome, detection = await _update_detection_row(db, detection_id, update_data, expected_version)
         await db.commit()
         
-        return True
+        return outcome, detection
 
-async def get_all_detections() -> List[Dict[str, Any]]:
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="update_detections")
+async def update_detections(updates: List[Dict[str, Any]]) -> List[Tuple[str, Optional[Dict[str, Any]]]]:
+    # Atualização em lote: uma única transação para todos os itens. Cada item tem
+    # "id", os campos a alterar e, opcionalmente, "version" (a versão esperada)
     async with aiosqlite.connect(DB_PATH) as db:
         db.row_factory = aiosqlite.Row
-        cursor = await db.execute(GET_ALL_DETECTIONS)
-        rows = await cursor.fetchall()
+        await db.execute("BEGIN IMMEDIATE;")
+        results = []
+        for update in updates:
+            changes = {field: value for field, value in update.items() if field in UPDATABLE_FIELDS}
+            results.append(
+                await _update_detection_row(db, update["id"], changes, update.get("version"))
+            )
+        await db.commit()
         
-        detections = []
-        for row in rows:
-            detection = dict(row)
-            detection["coordinates"] = json.loads(detection["coordinates"])
-            detections.append(detection)
-            
-        return detections
+        return results
 
-async def get_camera_detections(camera_id: str) -> List[Dict[str, Any]]:
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="record_occurrence")
+async def record_occurrence(detection_id: str, timestamp: str, detection_area: float) -> int:
+    # Retorna o novo número de ocorrências, ou 0 se a detecção não estiver mais aberta
     async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute(GET_DETECTIONS_BY_CAMERA, (camera_id,))
-        rows = await cursor.fetchall()
+        cursor = await db.execute(RECORD_OCCURRENCE, (timestamp, detection_area, detection_id))
+        if cursor.rowcount == 0:
+            return 0
+        cursor = await db.execute(GET_OCCURRENCES, (detection_id,))
+        occurrences = (await cursor.fetchone())[0]
+        await db.commit()
         
-        detections = []
-        for row in rows:
-            detection = dict(row)
-            detection["coordinates"] = json.loads(detection["coordinates"])
-            detections.append(detection)
-            
-        return detections
+        return occurrences
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="update_detection_images")
+async def update_detection_images(detection_id: str, image_urls: Dict[str, str]) -> bool:
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(
+            UPDATE_DETECTION_IMAGES,
+            (image_urls.get("thumbnail_url"), image_urls.get("medium_url"), detection_id)
+        )
+        await db.commit()
+
+        return cursor.rowcount > 0
+
+def detections_source(include_history: bool, start: Optional[str]) -> str:
+    # O histórico só é consultado quando pedido ou quando o período começa antes
+    # do horizonte de arquivamento
+    if include_history:
+        return "detections_all"
+    if start and start < (datetime.now() - timedelta(days=DETECTION_ARCHIVE_DAYS)).isoformat():
+        return "detections_all"
+    return "detections"
 
+def _detection_columns(fields: Optional[List[str]]):
+    # Campos pedidos (na ordem de DETECTION_FIELDS quando não informados) e as colunas do SELECT
+    fields = [field for field in (fields or DETECTION_FIELDS) if field in DETECTION_FIELDS]
+    return fields, ", ".join(_FIELD_COLUMNS.get(field, field) for field in fields)
+
+def _detection_filters(camera_id, status, start, end):
+    conditions, params = [], []
+    for condition, value in (
+        ("camera_id = ?", camera_id),
+        ("status = ?", status),
+        ("timestamp >= ?", start),
+        ("timestamp <= ?", end),
+    ):
+        if value is not None:
+            conditions.append(condition)
+            params.append(value)
+    return conditions, params
+
+def _detection_row_builder(fields: List[str]):
+    # Converte as tuplas do SELECT nos dicionários da resposta
+    if "coordinates" not in fields:
+        return lambda row: dict(zip(fields, row))
+
+    # coordinates ocupa duas colunas (latitude, longitude) na tupla
+    split = fields.index("coordinates")
+    before, after = fields[:split], fields[split + 1:]
+    return lambda row: {
+        **dict(zip(before, row[:split])),
+        "coordinates": {"latitude": row[split], "longitude": row[split + 1]},
+        **dict(zip(after, row[split + 2:])),
+    }
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="list_detections")
+async def list_detections(
+    camera_id: Optional[str] = None,
+    status: Optional[str] = None,
+    include_history: bool = False,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    # Filtros, ordenação e limite ficam no SQL; as linhas chegam como tuplas e
+    # viram diretamente os dicionários da resposta, apenas com os campos pedidos
+    fields, columns = _detection_columns(fields)
+    conditions, params = _detection_filters(camera_id, status, start, end)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    params.append(limit if limit is not None else -1)
+
+    query = LIST_DETECTIONS.format(
+        columns=columns, source=detections_source(include_history, start), where=where
+    )
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(query, params)
+        rows = await cursor.fetchall()
+
+    build = _detection_row_builder(fields)
+    return [build(row) for row in rows]
+
+def _partition_in_period(name: str, start: Optional[str], end: Optional[str]) -> bool:
+    # detections_archive_AAAA_MM só contém detecções daquele mês; a partição
+    # "other" (timestamps fora do padrão) é sempre lida
+    match = re.fullmatch(r"detections_archive_(\d{4})_(\d{2})", name)
+    if not match:
+        return True
+    month = f"{match.group(1)}-{match.group(2)}"
+    return (not start or month >= start[:7]) and (not end or month <= end[:7])
+
+async def iter_detections(
+    camera_id: Optional[str] = None,
+    status: Optional[str] = None,
+    include_history: bool = False,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    chunk_size: int = EXPORT_CHUNK_ROWS
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    # Percorre as detecções em blocos de chunk_size para exportação. Cada bloco é
+    # uma consulta própria, paginada pelo rowid de cada tabela (ativa e partições):
+    # a memória não cresce com o resultado e nenhum bloqueio de leitura fica
+    # aberto entre blocos, então a ingestão segue durante exportações longas.
+    # Diferente das listagens, a ordem é a de inserção em cada tabela.
+    fields, columns = _detection_columns(fields)
+    conditions, filter_params = _detection_filters(camera_id, status, start, end)
+    build = _detection_row_builder(fields)
+
+    async with aiosqlite.connect(DB_PATH) as db:
+        tables = ["detections"]
+        if detections_source(include_history, start) == "detections_all":
+            tables += [
+                partition for partition in await get_partitions(db)
+                if _partition_in_period(partition, start, end)
+            ]
+
+        for table in tables:
+            query = EXPORT_DETECTIONS.format(
+                columns=columns, table=table, where="".join(f" AND {c}" for c in conditions)
+            )
+            last_rowid = 0
+            while True:
+                with DB_QUERY_SECONDS.time(operation="iter_detections"):
+                    cursor = await db.execute(query, (last_rowid, *filter_params, chunk_size))
+                    rows = await cursor.fetchall()
+                    await cursor.close()
+                if not rows:
+                    break
+                last_rowid = rows[-1][0]
+                yield [build(row[1:]) for row in rows]
+                if len(rows) < chunk_size:
+                    break
+
+async def get_all_detections(
+    include_history: bool = False,
+    start: Optional[str] = None,
+    end: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    return await list_detections(include_history=include_history, start=start, end=end)
+
+async def get_camera_detections(
+    camera_id: str,
+    include_history: bool = False,
+    start: Optional[str] = None,
+    end: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    return await list_detections(camera_id, include_history=include_history, start=start, end=end)
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="get_all_cameras")
 async def get_all_cameras() -> List[Dict[str, Any]]:
     async with aiosqlite.connect(DB_PATH) as db:
         db.row_factory = aiosqlite.Row
@@ -214,9 +1214,448 @@ async def get_all_cameras() -> List[Dict[str, Any]]:
             
         return cameras
 
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="update_camera_status")
 async def update_camera_status(camera_id: str, status: str) -> bool:
     async with aiosqlite.connect(DB_PATH) as db:
         await db.execute(UPDATE_CAMERA_STATUS, (status, camera_id))
         await db.commit()
         
-        return True 
\ No newline at end of file
+        return True
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="apply_camera_heartbeats")
+async def apply_camera_heartbeats(heartbeats: Dict[str, Dict[str, Optional[str]]]) -> List[str]:
+    # heartbeats: camera_id -> {"last_seen", "last_detection"}. Uma transação para
+    # todas as câmeras; devolve as que estavam Offline e voltaram a Online
+    camera_ids = list(heartbeats)
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.execute("BEGIN IMMEDIATE;")
+        cursor = await db.execute(
+            GET_OFFLINE_CAMERAS.format(placeholders=", ".join("?" * len(camera_ids))), camera_ids
+        )
+        online = [row[0] for row in await cursor.fetchall()]
+        await db.executemany(UPDATE_CAMERA_HEARTBEAT, [
+            {"id": camera_id, "last_seen": entry["last_seen"], "last_detection": entry["last_detection"]}
+            for camera_id, entry in heartbeats.items()
+        ])
+        await db.commit()
+
+    return sorted(online)
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="mark_cameras_offline")
+async def mark_cameras_offline(cutoff: str) -> List[str]:
+    # Câmeras Online cujo último sinal é anterior a cutoff passam a Offline
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(MARK_CAMERAS_OFFLINE, (cutoff,))
+        rows = await cursor.fetchall()
+        await db.commit()
+
+    return sorted(row[0] for row in rows)
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="recount_image_references")
+async def recount_image_references() -> None:
+    # Recalcula os contadores a partir de detections.image_hash (corrige divergências)
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.execute(RECOUNT_IMAGE_REFERENCES)
+        await db.commit()
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="get_unreferenced_images")
+async def get_unreferenced_images() -> List[Dict[str, Any]]:
+    async with aiosqlite.connect(DB_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(GET_UNREFERENCED_IMAGES)
+        return [dict(row) for row in await cursor.fetchall()]
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="get_image_hashes")
+async def get_image_hashes() -> set:
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(GET_ALL_IMAGE_HASHES)
+        return {row[0] for row in await cursor.fetchall()}
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="delete_image")
+async def delete_image(image_hash: str) -> None:
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.execute(DELETE_IMAGE, (image_hash,))
+        await db.commit()
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="get_images_for_retention")
+async def get_images_for_retention(cutoff: str, limit: int = 100) -> List[Dict[str, Any]]:
+    async with aiosqlite.connect(DB_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(GET_IMAGES_FOR_RETENTION, (cutoff, limit))
+        return [dict(row) for row in await cursor.fetchall()]
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="replace_image")
+async def replace_image(old_hash: str, image: Dict[str, Any], image_url: str, tier: str) -> None:
+    # Substitui a imagem de todas as detecções que a referenciam, transferindo as referências
+    async with aiosqlite.connect(DB_PATH) as db:
+        references = 0
+        for table in await detection_tables(db):
+            cursor = await db.execute(UPDATE_DETECTIONS_IMAGE.format(table=table), (image_url, image["hash"], old_hash))
+            references += cursor.rowcount
+        await db.execute(
+            UPSERT_IMAGE_REFERENCE,
+            (image["hash"], image["location"], image["size_bytes"], references, tier,
+             datetime.now().isoformat())
+        )
+        await db.execute(DELETE_IMAGE, (old_hash,))
+        await db.commit()
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="archive_image")
+async def archive_image(image_hash: str, location: str) -> None:
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.execute(ARCHIVE_IMAGE, (location, image_hash))
+        for table in await detection_tables(db):
+            await db.execute(UPDATE_DETECTIONS_ARCHIVED_IMAGE.format(table=table), (image_hash,))
+        await db.commit()
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="get_legacy_detection_images")
+async def get_legacy_detection_images(limit: int = 500) -> List[Dict[str, Any]]:
+    async with aiosqlite.connect(DB_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(GET_LEGACY_DETECTION_IMAGES, (limit,))
+        return [dict(row) for row in await cursor.fetchall()]
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="adopt_detection_image")
+async def adopt_detection_image(detection_id: str, image: Optional[Dict[str, Any]], image_url: str) -> None:
+    # Associa uma detecção antiga (imagem em static/detections) à imagem no repositório
+    # por conteúdo. Sem imagem (arquivo inexistente), o hash vazio evita novas tentativas.
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.execute(UPDATE_DETECTION_IMAGE, (image_url, image["hash"] if image else "", detection_id))
+        if image:
+            await db.execute(
+                UPSERT_IMAGE_REFERENCE,
+                (image["hash"], image["location"], image["size_bytes"], 1, "original",
+                 datetime.now().isoformat())
+            )
+        await db.commit()
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="set_image_tier")
+async def set_image_tier(image_hash: str, tier: str) -> None:
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.execute(UPDATE_IMAGE_TIER, (tier, image_hash))
+        await db.commit()
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="get_detection_counts")
+async def get_detection_counts(
+    granularity: str = "day",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    group_by: Optional[List[str]] = None,
+    camera_id: Optional[str] = None,
+    status: Optional[str] = None,
+    waste_type: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    # As colunas de agrupamento vêm de ROLLUP_GROUP_FIELDS (validadas pelo chamador)
+    group_by = [field for field in (group_by or ["bucket"]) if field in ROLLUP_GROUP_FIELDS]
+    columns = ", ".join(group_by + ["SUM(count) AS count"])
+    query = f"SELECT {columns} FROM detection_rollups WHERE granularity = ?"
+    params: List[Any] = [granularity]
+    if start:
+        query += " AND bucket >= ?"
+        params.append(start[:ROLLUP_GRANULARITIES[granularity]])
+    if end:
+        query += " AND bucket <= ?"
+        params.append(end[:ROLLUP_GRANULARITIES[granularity]])
+    for field, value in (("camera_id", camera_id), ("status", status), ("waste_type", waste_type)):
+        if value is not None:
+            query += f" AND {field} = ?"
+            params.append(value)
+    if group_by:
+        query += f" GROUP BY {', '.join(group_by)}"
+    query += " HAVING SUM(count) > 0"
+    if group_by:
+        query += f" ORDER BY {', '.join(group_by)}"
+
+    async with aiosqlite.connect(DB_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(query, params)
+        return [dict(row) for row in await cursor.fetchall()]
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="get_detection_heatmap")
+async def get_detection_heatmap(
+    start: str,
+    end: str,
+    cell_degrees: float = GRID_CELL_DEGREES,
+    status: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(GET_GRID_ROLLUPS, (start[:10], end[:10], status, status))
+        rows = await cursor.fetchall()
+
+    # Agrupar as células base em células de cell_degrees graus
+    factor = max(1, int(round(cell_degrees / GRID_CELL_DEGREES)))
+    cells: Dict[tuple, int] = {}
+    for lat_cell, lon_cell, count in rows:
+        key = (lat_cell // factor, lon_cell // factor)
+        cells[key] = cells.get(key, 0) + count
+
+    size = factor * GRID_CELL_DEGREES
+    return [
+        {
+            "latitude": round((lat + 0.5) * size, 6),
+            "longitude": round((lon + 0.5) * size, 6),
+            "count": count,
+        }
+        for (lat, lon), count in sorted(cells.items())
+    ]
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="get_detection_clusters")
+async def get_detection_clusters(
+    min_longitude: float,
+    min_latitude: float,
+    max_longitude: float,
+    max_latitude: float,
+    zoom: int,
+    status: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    # Custo proporcional ao número de células visíveis, não ao de detecções
+    zoom = cluster_zoom(zoom)
+    size = cluster_cell_degrees(zoom)
+    params = (
+        zoom,
+        int(math.floor(min_latitude / size)), int(math.floor(max_latitude / size)),
+        int(math.floor(min_longitude / size)), int(math.floor(max_longitude / size)),
+        status, status,
+    )
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(GET_CLUSTERS, params)
+        rows = await cursor.fetchall()
+
+    return [
+        {
+            "latitude": round(sum_latitude / count, 6),
+            "longitude": round(sum_longitude / count, 6),
+            "count": count,
+        }
+        for _, _, count, sum_latitude, sum_longitude in rows
+    ]
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="get_resolution_stats")
+async def get_resolution_stats(
+    start: str,
+    end: str,
+    granularity: str = "day",
+    camera_id: Optional[str] = None,
+    by_camera: bool = False
+) -> List[Dict[str, Any]]:
+    bucket = "day" if granularity == "day" else "''"
+    query = GET_RESOLUTION_ROLLUPS.format(bucket=bucket, camera="camera_id" if by_camera else "NULL")
+    async with aiosqlite.connect(DB_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(query, (start[:10], end[:10], camera_id, camera_id))
+        rows = await cursor.fetchall()
+
+    return [
+        {
+            "bucket": row["bucket"],
+            "camera_id": row["camera_id"],
+            "resolved": row["resolved"],
+            "mean_seconds": row["total_seconds"] / row["resolved"],
+        }
+        for row in rows
+    ]
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="archive_detections")
+async def archive_detections(days: int = DETECTION_ARCHIVE_DAYS, batch_size: int = 500) -> Dict[str, int]:
+    # Move as detecções concluídas há mais de `days` dias para as partições mensais.
+    # Cada lote é uma transação: a detecção está sempre em exatamente uma tabela.
+    cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+    moved: Dict[str, int] = {}
+
+    async with aiosqlite.connect(DB_PATH) as db:
+        columns = ", ".join(name for name, _ in await table_columns(db, "detections"))
+        while True:
+            await db.execute("BEGIN IMMEDIATE;")
+            cursor = await db.execute(GET_ARCHIVABLE_DETECTIONS, (cutoff, batch_size))
+            rows = await cursor.fetchall()
+            if not rows:
+                await db.rollback()
+                break
+
+            by_month: Dict[str, List[str]] = {}
+            for detection_id, month in rows:
+                by_month.setdefault(month, []).append(detection_id)
+
+            known = set(await get_partitions(db))
+            new_partition = False
+            for month, ids in by_month.items():
+                name = await ensure_partition(db, month)
+                if name not in known:
+                    known.add(name)
+                    new_partition = True
+                placeholders = ", ".join("?" for _ in ids)
+                await db.execute(
+                    f"INSERT INTO {name} ({columns}) SELECT {columns} FROM detections WHERE id IN ({placeholders});",
+                    ids
+                )
+                await db.execute(f"DELETE FROM detections WHERE id IN ({placeholders});", ids)
+                await db.execute(UPSERT_PARTITION, (name, month, len(ids), datetime.now().isoformat()))
+                moved[name] = moved.get(name, 0) + len(ids)
+
+            if new_partition:
+                await rebuild_detections_view(db)
+            await db.commit()
+
+    return moved
+
+async def _insert_jobs(db, jobs: List[Dict[str, Any]]):
+    now = time.time()
+    created_at = datetime.now().isoformat()
+    await db.executemany(INSERT_JOB, [
+        (job["kind"], json.dumps(job["payload"], default=str), job.get("max_attempts", 5), now, created_at)
+        for job in jobs
+    ])
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="enqueue_jobs")
+async def enqueue_jobs(jobs: List[Dict[str, Any]]):
+    # Cada job: {"kind", "payload" (serializável em JSON), "max_attempts" (opcional)}
+    async with aiosqlite.connect(DB_PATH) as db:
+        await _insert_jobs(db, jobs)
+        await db.commit()
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="claim_jobs")
+async def claim_jobs(limit: int, timeout_seconds: float) -> List[Dict[str, Any]]:
+    now = time.time()
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(CLAIM_JOBS, (now + timeout_seconds, now, limit))
+        rows = await cursor.fetchall()
+        await db.commit()
+
+    return [
+        {"id": job_id, "kind": kind, "payload": json.loads(payload), "attempts": attempts, "max_attempts": max_attempts}
+        for job_id, kind, payload, attempts, max_attempts in sorted(rows)
+    ]
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="finish_job")
+async def finish_job(job_id: int, error: Optional[str] = None, retry_at: Optional[float] = None):
+    # Sem erro: concluído (removido). Com erro: nova tentativa em retry_at ou falha definitiva
+    async with aiosqlite.connect(DB_PATH) as db:
+        if error is None:
+            await db.execute(COMPLETE_JOB, (job_id,))
+        elif retry_at is not None:
+            await db.execute(RETRY_JOB, (retry_at, error, job_id))
+        else:
+            await db.execute(FAIL_JOB, (error, job_id))
+        await db.commit()
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="count_jobs")
+async def count_jobs() -> Dict[str, int]:
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(COUNT_JOBS)
+        return dict(await cursor.fetchall())
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="acquire_lease")
+async def acquire_lease(name: str, holder: str, ttl_seconds: float) -> bool:
+    now = time.time()
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(ACQUIRE_LEASE, (name, holder, now + ttl_seconds, now))
+        await db.commit()
+        
+        return cursor.rowcount > 0
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="release_lease")
+async def release_lease(name: str, holder: str):
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.execute(RELEASE_LEASE, (name, holder))
+        await db.commit()
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="publish_invalidation")
+async def publish_invalidation(topic: str, key: Optional[str], origin: str):
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.execute(INSERT_INVALIDATION, (topic, key, origin, time.time()))
+        await db.commit()
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="get_last_invalidation_id")
+async def get_last_invalidation_id() -> int:
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(GET_LAST_INVALIDATION_ID)
+        return (await cursor.fetchone())[0]
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="get_invalidations")
+async def get_invalidations(after_id: int) -> List[Tuple[int, str, Optional[str], str]]:
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(GET_INVALIDATIONS, (after_id,))
+        return await cursor.fetchall()
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="prune_invalidations")
+async def prune_invalidations(max_age_seconds: float) -> int:
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(PRUNE_INVALIDATIONS, (time.time() - max_age_seconds,))
+        await db.commit()
+        
+        return cursor.rowcount
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="get_audit_state")
+async def get_audit_state(name: str) -> Optional[Dict[str, Any]]:
+    async with aiosqlite.connect(DB_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(GET_AUDIT_STATE, (name,))
+        row = await cursor.fetchone()
+        return dict(row) if row else None
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="get_audit_tables")
+async def get_audit_tables() -> List[str]:
+    # Ordem em que a auditoria percorre as detecções: a tabela ativa e depois as
+    # partições. Uma detecção arquivada durante a passada volta a aparecer na
+    # partição, com um rowid novo.
+    async with aiosqlite.connect(DB_PATH) as db:
+        return await detection_tables(db)
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="get_audit_page")
+async def get_audit_page(table: str, after_rowid: int, limit: int) -> List[Dict[str, Any]]:
+    async with aiosqlite.connect(DB_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(GET_AUDIT_PAGE.format(table=table), (after_rowid, limit))
+        rows = [dict(row) for row in await cursor.fetchall()]
+
+    for row in rows:
+        row["coordinates"] = json.loads(row["coordinates"])
+    return rows
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="get_images")
+async def get_images(hashes: List[str]) -> Dict[str, Dict[str, Any]]:
+    if not hashes:
+        return {}
+    query = GET_IMAGES_BY_HASH.format(placeholders=", ".join("?" for _ in hashes))
+    async with aiosqlite.connect(DB_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(query, list(hashes))
+        return {row["hash"]: dict(row) for row in await cursor.fetchall()}
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="save_audit_page")
+async def save_audit_page(
+    name: str,
+    state: Dict[str, Any],
+    checked_ids: List[str],
+    findings: List[Dict[str, Any]]
+):
+    # As divergências das detecções verificadas e o avanço do cursor são gravados
+    # juntos: uma passada interrompida recomeça exatamente após a última página
+    found_at = datetime.now().isoformat()
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.execute("BEGIN IMMEDIATE;")
+        await db.executemany(DELETE_AUDIT_FINDINGS, [(detection_id,) for detection_id in checked_ids])
+        await db.executemany(INSERT_AUDIT_FINDING, [
+            (finding["detection_id"], finding["kind"], finding.get("block_hash"),
+             finding.get("expected"), finding.get("actual"), found_at)
+            for finding in findings
+        ])
+        await db.execute(UPSERT_AUDIT_STATE, (
+            name, state["table_name"], state["last_rowid"], state["pass_started_at"],
+            state["pass_checked"], state["last_pass_completed_at"], found_at
+        ))
+        await db.commit()
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="get_audit_findings")
+async def get_audit_findings(kind: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+    where, params = ("WHERE kind = ?", [kind]) if kind else ("", [])
+    async with aiosqlite.connect(DB_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(GET_AUDIT_FINDINGS.format(where=where), (*params, limit))
+        return [dict(row) for row in await cursor.fetchall()]
+
+@timed(DB_QUERY_SECONDS, DB_ERRORS, operation="count_audit_findings")
+async def count_audit_findings() -> Dict[str, int]:
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(COUNT_AUDIT_FINDINGS)
+        return dict(await cursor.fetchall())
@@ -0,0 +1,124 @@
+import os
+import math
+import asyncio
+import logging
+import importlib.util
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Deque
+
+# Sem OpenCV a comparação usa apenas localização e área; importados no primeiro uso
+HAS_OPENCV = all(importlib.util.find_spec(name) is not None for name in ("cv2", "numpy"))
+
+import metrics
+
+logger = logging.getLogger('dedup')
+
+# Parâmetros da supressão de detecções repetidas
+DEDUP_WINDOW_SECONDS = int(os.getenv("DEDUP_WINDOW_SECONDS", 1800))
+DEDUP_MAX_HASH_DISTANCE = int(os.getenv("DEDUP_MAX_HASH_DISTANCE", 10))  # bits diferentes (de 64)
+DEDUP_AREA_TOLERANCE = float(os.getenv("DEDUP_AREA_TOLERANCE", 0.3))  # variação relativa da área
+DEDUP_MAX_DISTANCE_METERS = float(os.getenv("DEDUP_MAX_DISTANCE_METERS", 25))
+DEDUP_WINDOW_SIZE = 32  # detecções abertas mantidas por câmera
+
+DEDUP_MERGED = metrics.registry.counter(
+    "detections_deduplicated_total", "Detecções incorporadas a uma detecção aberta existente", ("camera_id",)
+)
+
+
+def image_dhash(data: bytes) -> Optional[int]:
+    # Hash perceptual por diferença (dHash) de 64 bits, calculado sobre a imagem
+    # decodificada em 1/8 da resolução
+    if not HAS_OPENCV or not data:
+        return None
+    import cv2
+    import numpy as np
+
+    gray = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if gray is None:
+        return None
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def distance_meters(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    # Aproximação equiretangular, suficiente para distâncias de poucos metros
+    x = math.radians(lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return math.hypot(x, y) * 6371000
+
+
+class DetectionDeduplicator:
+    # Janela em memória, por câmera, das detecções abertas recentes. Uma nova
+    # detecção é considerada repetição quando está no mesmo local, com área
+    # semelhante e imagem perceptualmente próxima de uma delas.
+
+    def __init__(self,
+                 window_seconds: int = DEDUP_WINDOW_SECONDS,
+                 max_hash_distance: int = DEDUP_MAX_HASH_DISTANCE,
+                 area_tolerance: float = DEDUP_AREA_TOLERANCE,
+                 max_distance_meters: float = DEDUP_MAX_DISTANCE_METERS):
+        self.window = timedelta(seconds=window_seconds)
+        self.max_hash_distance = max_hash_distance
+        self.area_tolerance = area_tolerance
+        self.max_distance_meters = max_distance_meters
+        self._recent: Dict[str, Deque[dict]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def lock(self, camera_id: str) -> asyncio.Lock:
+        # Serializa a ingestão por câmera para que duas repetições simultâneas não passem ambas
+        lock = self._locks.get(camera_id)
+        if lock is None:
+            lock = self._locks[camera_id] = asyncio.Lock()
+        return lock
+
+    def _matches(self, entry: dict, latitude: float, longitude: float, area: float, dhash: Optional[int]) -> bool:
+        if distance_meters(entry["latitude"], entry["longitude"], latitude, longitude) > self.max_distance_meters:
+            return False
+        largest = max(entry["area"], area)
+        if largest and abs(entry["area"] - area) / largest > self.area_tolerance:
+            return False
+        if dhash is not None and entry["dhash"] is not None:
+            return bin(dhash ^ entry["dhash"]).count("1") <= self.max_hash_distance
+        # Sem imagem em um dos lados, localização e área bastam
+        return True
+
+    def find(self, camera_id: str, timestamp: datetime, latitude: float, longitude: float,
+             area: float, dhash: Optional[int]) -> Optional[dict]:
+        recent = self._recent.get(camera_id)
+        if not recent:
+            return None
+
+        for entry in reversed(recent):
+            if abs(timestamp - entry["last_seen"]) > self.window:
+                continue
+            if self._matches(entry, latitude, longitude, area, dhash):
+                return entry
+        return None
+
+    def remember(self, camera_id: str, detection_id: str, timestamp: datetime, latitude: float,
+                 longitude: float, area: float, dhash: Optional[int]):
+        recent = self._recent.setdefault(camera_id, deque(maxlen=DEDUP_WINDOW_SIZE))
+        recent.append({
+            "id": detection_id,
+            "last_seen": timestamp,
+            "latitude": latitude,
+            "longitude": longitude,
+            "area": area,
+            "dhash": dhash,
+        })
+
+    def touch(self, entry: dict, timestamp: datetime, area: float, dhash: Optional[int]):
+        # A janela passa a contar da ocorrência mais recente e acompanha a imagem atual
+        entry["last_seen"] = max(entry["last_seen"], timestamp)
+        entry["area"] = area
+        if dhash is not None:
+            entry["dhash"] = dhash
+
+    def forget(self, detection_id: str):
+        # Detecções que deixam de estar abertas não recebem mais ocorrências
+        for recent in self._recent.values():
+            for entry in list(recent):
+                if entry["id"] == detection_id:
+                    recent.remove(entry)
@@ -0,0 +1,125 @@
+import io
+import csv
+import importlib.util
+from typing import Any, AsyncIterator, Dict, List
+
+from responses import dumps
+
+# pyarrow é opcional (sem ele apenas NDJSON e CSV são oferecidos) e só é
+# importado na primeira exportação em Parquet
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+# Formato -> (tipo de conteúdo, extensão do arquivo)
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# Tipos das colunas no Parquet; os demais campos são texto
+_ARROW_TYPES = {
+    "latitude": "float64",
+    "longitude": "float64",
+    "detection_area": "float64",
+    "occurrences": "int64",
+    "version": "int64",
+}
+
+
+def available_formats() -> List[str]:
+    return [name for name in EXPORT_FORMATS if name != "parquet" or HAS_PYARROW]
+
+
+def _columns(fields: List[str]) -> List[str]:
+    # Nas saídas tabulares (CSV e Parquet) coordinates vira latitude e longitude
+    columns = []
+    for field in fields:
+        columns.extend(("latitude", "longitude") if field == "coordinates" else (field,))
+    return columns
+
+
+def _flatten(row: Dict[str, Any]) -> Dict[str, Any]:
+    coordinates = row.get("coordinates")
+    if coordinates is None:
+        return row
+    flat = dict(row)
+    del flat["coordinates"]
+    flat["latitude"] = coordinates["latitude"]
+    flat["longitude"] = coordinates["longitude"]
+    return flat
+
+
+async def ndjson_stream(chunks: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+    async for rows in chunks:
+        yield b"".join(dumps(row) + b"\n" for row in rows)
+
+
+async def csv_stream(chunks: AsyncIterator[List[Dict[str, Any]]], fields: List[str]) -> AsyncIterator[bytes]:
+    columns = _columns(fields)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    async for rows in chunks:
+        writer.writerows(_flatten(row) for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _StreamSink:
+    # Destino de escrita para o ParquetWriter que entrega os bytes à medida que
+    # cada grupo de linhas é gravado. tell() conta o total escrito, usado pelo
+    # pyarrow nos deslocamentos do rodapé.
+
+    def __init__(self):
+        self.closed = False
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+async def parquet_stream(chunks: AsyncIterator[List[Dict[str, Any]]], fields: List[str]) -> AsyncIterator[bytes]:
+    # Um grupo de linhas (row group) por bloco lido do banco
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columns = _columns(fields)
+    schema = pa.schema([(column, _ARROW_TYPES.get(column, "string")) for column in columns])
+    sink = _StreamSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        async for rows in chunks:
+            flat = [_flatten(row) for row in rows]
+            writer.write_table(pa.Table.from_pylist(flat, schema=schema))
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+def export_stream(format: str, chunks: AsyncIterator[List[Dict[str, Any]]], fields: List[str]) -> AsyncIterator[bytes]:
+    if format == "csv":
+        return csv_stream(chunks, fields)
+    if format == "parquet":
+        return parquet_stream(chunks, fields)
+    return ndjson_stream(chunks)
@@ -0,0 +1,112 @@
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import database
+import metrics
+
+logger = logging.getLogger('heartbeats')
+
+# Sinais de vida das câmeras (heartbeats e detecções) ficam em memória e são
+# gravados em cameras a cada HEARTBEAT_FLUSH_INTERVAL segundos, em uma única
+# transação por worker, em vez de um commit por evento.
+HEARTBEAT_FLUSH_INTERVAL = float(os.getenv("HEARTBEAT_FLUSH_INTERVAL", 5))
+# Câmeras Online sem sinal há mais que isso são marcadas como Offline pelo líder
+CAMERA_OFFLINE_AFTER = int(os.getenv("CAMERA_OFFLINE_AFTER", 120))  # segundos, 0 desativa
+CAMERA_SWEEP_INTERVAL = int(os.getenv("CAMERA_SWEEP_INTERVAL", 30))
+
+HEARTBEATS_RECEIVED = metrics.registry.counter(
+    "camera_heartbeats_total", "Sinais de vida recebidos das câmeras"
+)
+HEARTBEAT_FLUSHES = metrics.registry.counter(
+    "camera_heartbeat_flushes_total", "Gravações em lote dos sinais de vida por resultado", ("result",)
+)
+CAMERA_STATUS_CHANGES = metrics.registry.counter(
+    "camera_status_changes_total", "Mudanças automáticas de status das câmeras", ("status",)
+)
+
+
+def _latest(current: Optional[str], value: Optional[str]) -> Optional[str]:
+    # Timestamps ISO 8601 no mesmo formato são comparáveis como texto
+    if current is None or (value is not None and value > current):
+        return value
+    return current
+
+
+class HeartbeatBuffer:
+
+    def __init__(self, flush_interval: float = HEARTBEAT_FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, Dict[str, Optional[str]]] = {}  # camera_id -> last_seen, last_detection
+        self._on_online: Optional[Callable[[List[str]], Awaitable[Any]]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def beat(self, camera_id: str, seen: Optional[datetime] = None, detection: Optional[str] = None):
+        # Apenas em memória: vários sinais da mesma câmera entre duas gravações viram uma atualização
+        seen = (seen or datetime.now()).isoformat()
+        entry = self._pending.get(camera_id)
+        if entry is None:
+            self._pending[camera_id] = {"last_seen": seen, "last_detection": detection}
+        else:
+            entry["last_seen"] = _latest(entry["last_seen"], seen)
+            entry["last_detection"] = _latest(entry["last_detection"], detection)
+        HEARTBEATS_RECEIVED.inc()
+
+    async def flush(self) -> List[str]:
+        # Grava os sinais acumulados; devolve as câmeras que voltaram a ficar Online
+        if not self._pending:
+            return []
+        pending, self._pending = self._pending, {}
+        try:
+            online = await database.apply_camera_heartbeats(pending)
+        except Exception:
+            # Devolvidos ao buffer para a próxima tentativa, sem perder sinais mais novos
+            for camera_id, entry in pending.items():
+                current = self._pending.setdefault(camera_id, entry)
+                if current is not entry:
+                    current["last_seen"] = _latest(current["last_seen"], entry["last_seen"])
+                    current["last_detection"] = _latest(current["last_detection"], entry["last_detection"])
+            HEARTBEAT_FLUSHES.inc(result="error")
+            raise
+        HEARTBEAT_FLUSHES.inc(result="ok")
+        if online:
+            CAMERA_STATUS_CHANGES.inc(len(online), status="Online")
+            logger.info(f"Câmeras de volta ao status Online: {', '.join(online)}")
+        return online
+
+    def start(self, on_online: Optional[Callable[[List[str]], Awaitable[Any]]] = None):
+        # Cada worker grava o próprio buffer, independentemente da liderança
+        self._on_online = on_online
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self._flush_and_notify()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._flush_and_notify()
+
+    async def _flush_and_notify(self):
+        try:
+            online = await self.flush()
+            if online and self._on_online is not None:
+                await self._on_online(online)
+        except Exception as e:
+            logger.error(f"Erro ao gravar os sinais de vida das câmeras: {str(e)}")
+
+
+async def mark_silent_cameras_offline(offline_after: int = CAMERA_OFFLINE_AFTER) -> List[str]:
+    # Câmeras que nunca enviaram sinal (last_seen nulo) não são afetadas
+    cutoff = (datetime.now() - timedelta(seconds=offline_after)).isoformat()
+    offline = await database.mark_cameras_offline(cutoff)
+    if offline:
+        CAMERA_STATUS_CHANGES.inc(len(offline), status="Offline")
+        logger.warning(f"Câmeras sem sinal há mais de {offline_after}s marcadas como Offline: {', '.join(offline)}")
+    return offline
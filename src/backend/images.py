@@ -0,0 +1,345 @@
+import os
+import re
+import time
+import shutil
+import asyncio
+import hashlib
+import logging
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, NamedTuple, Optional
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse
+
+# OpenCV e NumPy (~0,1 s de importação) são carregados no primeiro uso, e não na
+# inicialização do worker; sem eles as detecções ficam apenas com a imagem original
+HAS_OPENCV = all(importlib.util.find_spec(name) is not None for name in ("cv2", "numpy"))
+
+import database
+import metrics
+
+logger = logging.getLogger('images')
+
+# Largura máxima e qualidade JPEG de cada derivada; a original é mantida como enviada
+DERIVATIVES = {
+    "thumbnail": (160, 70),
+    "medium": (640, 80),
+}
+
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", 2))
+
+# Política de retenção das imagens de detecções concluídas
+IMAGE_RETENTION_DAYS = int(os.getenv("IMAGE_RETENTION_DAYS", 30))
+IMAGE_RETENTION_MODE = os.getenv("IMAGE_RETENTION_MODE", "recompress")  # "recompress" ou "archive"
+IMAGE_COMPACTION_INTERVAL = int(os.getenv("IMAGE_COMPACTION_INTERVAL", 6 * 3600))  # segundos, 0 desativa
+
+# Recompressão: largura máxima e qualidade JPEG
+RECOMPRESS_MAX_WIDTH = 1280
+RECOMPRESS_QUALITY = 60
+
+# Arquivos sem registro no banco só são removidos depois desse tempo, para não
+# concorrer com uploads cujo INSERT ainda não terminou
+ORPHAN_GRACE_SECONDS = 3600
+
+_EXTENSION_PATTERN = re.compile(r"^\.[a-z0-9]{1,5}$")
+_ORIGINAL_PATTERN = re.compile(r"^([0-9a-f]{64})\.[a-z0-9]{1,5}$")
+
+IMAGE_DEDUP_HITS = metrics.registry.counter(
+    "image_dedup_hits_total", "Uploads cujo conteúdo já existia no repositório de imagens"
+)
+IMAGE_BYTES_RECLAIMED = metrics.registry.counter(
+    "image_bytes_reclaimed_total", "Bytes liberados em static/images pela compactação", ("reason",)
+)
+
+
+class StoredImage(NamedTuple):
+    hash: str
+    location: str
+    size_bytes: int
+    path: Path
+    url: str
+    created: bool
+
+    def as_record(self) -> Dict[str, Any]:
+        return {"hash": self.hash, "location": self.location, "size_bytes": self.size_bytes}
+
+
+# As URLs são derivadas do hash do conteúdo, então nunca mudam de conteúdo
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class ImmutableStaticFiles(StaticFiles):
+    # StaticFiles com cache de longa duração, para diretórios endereçados por conteúdo.
+    # O nome do arquivo (sha256 da original, mais a variante) já identifica o
+    # conteúdo e serve como ETag forte, estável entre réplicas e cópias do diretório;
+    # If-None-Match, Range e If-Range são tratados pelo FileResponse.
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        headers = {"ETag": f'"{Path(full_path).stem}"', "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers)
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+class ImageStore:
+    # Repositório de imagens endereçado por conteúdo. As originais ficam em
+    # <base_dir>/<2 primeiros caracteres do sha256>/<sha256><extensão> e as
+    # derivadas (miniatura e tamanho médio), geradas em um pool de threads fora
+    # do caminho da requisição, em <base_dir>/<prefixo>/<sha256>_<variante>.jpg
+
+    def __init__(self, base_dir: Path, url_prefix: str, workers: int = IMAGE_WORKERS):
+        self.base_dir = Path(base_dir)
+        self.url_prefix = url_prefix.rstrip("/")
+        self.workers = workers
+        self._executor = None
+        os.makedirs(self.base_dir, exist_ok=True)
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="images")
+        return self._executor
+
+    def _relative_path(self, digest: str, variant: str) -> str:
+        return f"{digest[:2]}/{digest}_{variant}.jpg"
+
+    def url_for(self, location: str) -> str:
+        return f"{self.url_prefix}/{location}"
+
+    def path_for(self, location: str) -> Path:
+        return self.base_dir / location
+
+    def _write(self, path: Path, data: bytes):
+        # Gravar em arquivo temporário e renomear para nunca servir um arquivo parcial;
+        # o nome inclui a thread, pois o mesmo conteúdo pode chegar em dois envios simultâneos
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        temp_path.write_bytes(data)
+        os.replace(temp_path, path)
+
+    def store_original(self, data: bytes, extension: str = ".jpg") -> StoredImage:
+        # Conteúdo repetido (o detector reenvia os mesmos quadros) não é gravado de novo
+        extension = (extension or ".jpg").lower()
+        if not _EXTENSION_PATTERN.match(extension):
+            extension = ".jpg"
+
+        digest = hashlib.sha256(data).hexdigest()
+        location = f"{digest[:2]}/{digest}{extension}"
+        path = self.path_for(location)
+
+        created = not path.exists()
+        if created:
+            self._write(path, data)
+        else:
+            IMAGE_DEDUP_HITS.inc()
+
+        return StoredImage(digest, location, len(data), path, self.url_for(location), created)
+
+    def _recompress(self, path: Path) -> Optional[StoredImage]:
+        import cv2
+        import numpy as np
+
+        data = path.read_bytes()
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            return None
+
+        height, width = image.shape[:2]
+        if width > RECOMPRESS_MAX_WIDTH:
+            image = cv2.resize(
+                image, (RECOMPRESS_MAX_WIDTH, max(1, round(height * RECOMPRESS_MAX_WIDTH / width))),
+                interpolation=cv2.INTER_AREA
+            )
+        ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, RECOMPRESS_QUALITY])
+        if not ok or len(encoded) >= len(data):
+            return None
+        return self.store_original(encoded.tobytes(), ".jpg")
+
+    def _generate(self, image_path: str, digest: Optional[str] = None) -> Dict[str, str]:
+        import cv2
+        import numpy as np
+
+        data = Path(image_path).read_bytes()
+        digest = digest or hashlib.sha256(data).hexdigest()
+
+        image = None
+        urls = {}
+        for variant, (max_width, quality) in DERIVATIVES.items():
+            relative = self._relative_path(digest, variant)
+            path = self.base_dir / relative
+
+            # Imagens idênticas já processadas reaproveitam as derivadas existentes
+            if not path.exists():
+                if image is None:
+                    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+                    if image is None:
+                        raise ValueError(f"Imagem inválida: {image_path}")
+
+                height, width = image.shape[:2]
+                resized = image
+                if width > max_width:
+                    resized = cv2.resize(
+                        image, (max_width, max(1, round(height * max_width / width))),
+                        interpolation=cv2.INTER_AREA
+                    )
+                ok, encoded = cv2.imencode(".jpg", resized, [cv2.IMWRITE_JPEG_QUALITY, quality])
+                if not ok:
+                    raise ValueError(f"Falha ao codificar a derivada {variant} de {image_path}")
+
+                self._write(path, encoded.tobytes())
+
+            urls[f"{variant}_url"] = self.url_for(relative)
+
+        return urls
+
+    async def create_derivatives(self, image_path: str, digest: Optional[str] = None) -> Dict[str, str]:
+        if not HAS_OPENCV:
+            return {}
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._generate, str(image_path), digest)
+
+    async def run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+def _remove(path: Path) -> int:
+    try:
+        size = path.stat().st_size
+        path.unlink()
+        return size
+    except FileNotFoundError:
+        return 0
+
+
+def _remove_image_files(store: ImageStore, digest: str, location: str) -> int:
+    # Original e derivadas
+    removed = _remove(store.path_for(location))
+    for variant in DERIVATIVES:
+        removed += _remove(store.base_dir / store._relative_path(digest, variant))
+    return removed
+
+
+def _archive(store: ImageStore, archive_dir: Path, location: str) -> int:
+    source = store.path_for(location)
+    target = archive_dir / location
+    target.parent.mkdir(parents=True, exist_ok=True)
+    size = source.stat().st_size
+    shutil.move(str(source), str(target))
+    return size
+
+
+def _find_orphan_files(store: ImageStore, known_hashes: set) -> list:
+    # Originais gravadas no disco sem registro correspondente na tabela images
+    cutoff = time.time() - ORPHAN_GRACE_SECONDS
+    orphans = []
+    for path in store.base_dir.glob("*/*"):
+        match = _ORIGINAL_PATTERN.match(path.name)
+        if match and match.group(1) not in known_hashes and path.stat().st_mtime < cutoff:
+            orphans.append((match.group(1), path))
+    return orphans
+
+
+async def compact_images(
+    store: ImageStore,
+    archive_dir: Path,
+    legacy_dir: Path,
+    retention_days: int = IMAGE_RETENTION_DAYS,
+    mode: str = IMAGE_RETENTION_MODE,
+    batch_size: int = 100
+) -> Dict[str, Any]:
+    # Manutenção do repositório de imagens:
+    #   1. migra imagens antigas ({detection_id}.jpg em legacy_dir) para o repositório por conteúdo
+    #   2. recalcula as referências e remove imagens sem referência e arquivos órfãos
+    #   3. recomprime ou arquiva imagens de detecções concluídas há mais de retention_days dias
+    started = time.perf_counter()
+    report = {"migrated": 0, "deduplicated": 0, "deleted": 0, "recompressed": 0, "archived": 0,
+              "bytes_reclaimed": {"dedup": 0, "unreferenced": 0, "recompress": 0, "archive": 0}}
+    reclaimed = report["bytes_reclaimed"]
+
+    while True:
+        legacy = await database.get_legacy_detection_images(batch_size)
+        if not legacy:
+            break
+        for row in legacy:
+            legacy_path = legacy_dir / Path(row["image_url"]).name
+            if not legacy_path.exists():
+                # Sem arquivo não há o que migrar; marca para não voltar a ser selecionada
+                await database.adopt_detection_image(row["id"], None, row["image_url"])
+                continue
+            data = await store.run(legacy_path.read_bytes)
+            stored = await store.run(store.store_original, data, legacy_path.suffix)
+            await database.adopt_detection_image(row["id"], stored.as_record(), stored.url)
+            await store.run(legacy_path.unlink)
+            report["migrated"] += 1
+            if not stored.created:
+                report["deduplicated"] += 1
+                reclaimed["dedup"] += stored.size_bytes
+
+    await database.recount_image_references()
+
+    for image in await database.get_unreferenced_images():
+        if image["tier"] != "archived" and image["location"]:
+            reclaimed["unreferenced"] += await store.run(
+                _remove_image_files, store, image["hash"], image["location"]
+            )
+        await database.delete_image(image["hash"])
+        report["deleted"] += 1
+
+    known_hashes = await database.get_image_hashes()
+    for digest, path in await store.run(_find_orphan_files, store, known_hashes):
+        reclaimed["unreferenced"] += await store.run(_remove_image_files, store, digest, path.relative_to(store.base_dir).as_posix())
+        report["deleted"] += 1
+
+    cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat()
+    # Sem OpenCV só é possível arquivar
+    retention_enabled = mode == "archive" or HAS_OPENCV
+    while retention_enabled:
+        candidates = await database.get_images_for_retention(cutoff, batch_size)
+        if not candidates:
+            break
+        for image in candidates:
+            try:
+                if mode == "archive":
+                    reclaimed["archive"] += await store.run(_archive, store, archive_dir, image["location"])
+                    await database.archive_image(image["hash"], image["location"])
+                    report["archived"] += 1
+                else:
+                    stored = await store.run(store._recompress, store.path_for(image["location"]))
+                    if stored is None:
+                        # Recomprimir não reduziria o arquivo; não volta a ser selecionada
+                        await database.set_image_tier(image["hash"], "recompressed")
+                        continue
+                    await database.replace_image(image["hash"], stored.as_record(), stored.url, "recompressed")
+                    # As derivadas da imagem anterior continuam em uso (thumbnail_url, medium_url)
+                    await store.run(_remove, store.path_for(image["location"]))
+                    reclaimed["recompress"] += image["size_bytes"] - stored.size_bytes
+                    report["recompressed"] += 1
+            except FileNotFoundError:
+                logger.warning(f"Imagem {image['hash']} não encontrada durante a retenção")
+                await database.set_image_tier(image["hash"], "missing")
+
+    for reason, value in reclaimed.items():
+        if value:
+            IMAGE_BYTES_RECLAIMED.inc(value, reason=reason)
+
+    report["total_bytes_reclaimed"] = sum(reclaimed.values())
+    report["duration_s"] = time.perf_counter() - started
+    logger.info(
+        f"Compactação de imagens: {report['total_bytes_reclaimed']} bytes liberados "
+        f"({report['migrated']} migradas, {report['deleted']} removidas, "
+        f"{report['recompressed']} recomprimidas, {report['archived']} arquivadas)"
+    )
+    return report
@@ -1,20 +1,36 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
+
 import os
 import uuid
+import asyncio
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 from typing import List, Optional
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, BackgroundTasks, Query
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, BackgroundTasks, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 import json
 
 import database
-from models import WasteDetection, WasteDetectionCreate, WasteDetectionUpdate, Camera, NotificationRequest
+import metrics
+import images
+import export
+import audit
+import heartbeats
+from images import ImageStore, ImmutableStaticFiles
+from compression import CompressionMiddleware, PrecompressedStaticFiles
+from coordination import Coordinator, job
+from heartbeats import HeartbeatBuffer
+from dedup import DetectionDeduplicator, image_dhash, DEDUP_MERGED
+from responses import FastJSONResponse, parse_fields, loads
+from models import WasteDetection, WasteDetectionCreate, WasteDetectionUpdate, WasteDetectionBulkUpdate, Camera, CameraHeartbeat, NotificationRequest
 from notifications import NotificationService
-from blockchain_client import BlockchainClient
+from blockchain_client import BlockchainClient, BLOCK_FIELDS
 
+# Único ponto de configuração do logging no processo do backend (cada worker
+# importa main); os demais módulos apenas obtêm o próprio logger
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -24,8 +40,11 @@ logger = logging.getLogger('backend')
 STATIC_DIR = Path(__file__).parent.parent / "data" / "static"
 UPLOADS_DIR = STATIC_DIR / "uploads"
 DETECTIONS_DIR = STATIC_DIR / "detections"
+IMAGES_DIR = STATIC_DIR / "images"
+# Imagens arquivadas pela política de retenção (não são servidas)
+ARCHIVE_DIR = STATIC_DIR.parent / "archive" / "images"
 
-for dir_path in [STATIC_DIR, UPLOADS_DIR, DETECTIONS_DIR]:
+for dir_path in [STATIC_DIR, UPLOADS_DIR, DETECTIONS_DIR, IMAGES_DIR]:
     os.makedirs(dir_path, exist_ok=True)
 
 app = FastAPI(
@@ -42,16 +61,155 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
+# gzip/brotli negociado nas respostas de texto acima de COMPRESSION_MIN_SIZE
+app.add_middleware(CompressionMiddleware)
+
+# As derivadas são endereçadas por conteúdo e podem ser cacheadas indefinidamente;
+# precisam ser montadas antes de /static para terem precedência
+app.mount("/static/images", ImmutableStaticFiles(directory=str(IMAGES_DIR)), name="images")
+app.mount("/static", PrecompressedStaticFiles(directory=str(STATIC_DIR)), name="static")
+
+_upload_size_cache = {"value": 0, "expires": 0.0}
+
+def directory_size_bytes() -> int:
+    # Percorrer o diretório tem custo; o valor é reaproveitado por 30 s
+    now = time.monotonic()
+    if now < _upload_size_cache["expires"]:
+        return _upload_size_cache["value"]
+    total = 0
+    for root, _, files in os.walk(STATIC_DIR):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    _upload_size_cache.update(value=total, expires=now + 30)
+    return total
+
+metrics.registry.gauge(
+    "upload_directory_bytes", "Tamanho total do diretório de imagens", callback=directory_size_bytes
+)
+
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Usar o template da rota (ex.: /api/waste-detections/{detection_id}) para limitar a cardinalidade
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", None) or "unmatched"
+        metrics.HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=route_path,
+            status=str(status)
+        )
+
+def track_background(func):
+    # Envolve uma tarefa em segundo plano para expor a fila em background_tasks_pending
+    task_name = func.__name__
+    metrics.BACKGROUND_TASKS.inc(task=task_name)
+
+    async def wrapper(*args, **kwargs):
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            metrics.BACKGROUND_TASKS.dec(task=task_name)
+
+    return wrapper
 
 notification_service = NotificationService()
 blockchain_client = BlockchainClient()
+image_store = ImageStore(IMAGES_DIR, "/static/images")
+deduplicator = DetectionDeduplicator()
+# Elege um único worker para a fila de jobs e as tarefas periódicas e propaga as
+# invalidações dos caches em memória entre os workers
+coordinator = Coordinator()
+# Heartbeats e detecções atualizam last_seen/last_detection das câmeras em lote
+heartbeat_buffer = HeartbeatBuffer()
+DETECTION_ARCHIVE_INTERVAL = int(os.getenv("DETECTION_ARCHIVE_INTERVAL", 24 * 3600))  # segundos, 0 desativa
+_maintenance_tasks = []
+
+async def compact_images():
+    return await images.compact_images(image_store, ARCHIVE_DIR, DETECTIONS_DIR)
+
+async def archive_detections():
+    moved = await database.archive_detections()
+    if moved:
+        logger.info(f"Detecções arquivadas: {moved}")
+    return moved
+
+async def audit_integrity():
+    return await audit.audit_detections(blockchain_client, image_store, ARCHIVE_DIR)
+
+async def publish_camera_status(camera_ids):
+    for camera_id in camera_ids:
+        await coordinator.publish("camera_status", camera_id)
+
+async def sweep_cameras():
+    offline = await heartbeats.mark_silent_cameras_offline()
+    await publish_camera_status(offline)
+    return offline
+
+async def maintenance_loop(task, interval):
+    # Executa uma tarefa de manutenção periodicamente enquanto o servidor estiver
+    # ativo; com vários workers, apenas no líder
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await coordinator.run_if_leader(task)
+        except Exception as e:
+            logger.error(f"Erro na tarefa de manutenção {task.__name__}: {str(e)}")
+
+STARTUP_SECONDS = metrics.registry.gauge(
+    "backend_startup_seconds", "Tempo de inicialização do worker por etapa", ("stage",)
+)
 
 @app.on_event("startup")
 async def startup_event():
+    started = time.perf_counter()
     logger.info("Inicializando o backend...")
     await database.init_db()
     logger.info("Banco de dados inicializado.")
+    
+    coordinator.handler("register_in_blockchain", register_in_blockchain)
+    coordinator.handler("register_batch_in_blockchain", register_batch_in_blockchain)
+    coordinator.handler(
+        "send_notification", lambda payload: send_notification(payload["detection"], payload.get("image_path"))
+    )
+    coordinator.subscribe("detection_closed", deduplicator.forget)
+    coordinator.subscribe("camera_status", invalidate_cameras_cache)
+    await coordinator.start()
+    heartbeat_buffer.start(publish_camera_status)
+    
+    for task, interval in (
+        (compact_images, images.IMAGE_COMPACTION_INTERVAL),
+        (archive_detections, DETECTION_ARCHIVE_INTERVAL),
+        (audit_integrity, audit.INTEGRITY_AUDIT_INTERVAL),
+        (sweep_cameras, heartbeats.CAMERA_SWEEP_INTERVAL if heartbeats.CAMERA_OFFLINE_AFTER > 0 else 0),
+    ):
+        if interval > 0:
+            _maintenance_tasks.append(asyncio.create_task(maintenance_loop(task, interval)))
+    
+    startup_seconds = time.perf_counter() - started
+    STARTUP_SECONDS.set(_IMPORT_SECONDS, stage="import")
+    STARTUP_SECONDS.set(startup_seconds, stage="startup")
+    logger.info(
+        f"Backend pronto: importação {_IMPORT_SECONDS * 1000:.0f} ms, "
+        f"inicialização {startup_seconds * 1000:.0f} ms"
+    )
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    for task in _maintenance_tasks:
+        task.cancel()
+    await heartbeat_buffer.stop()
+    await coordinator.stop()
+    image_store.shutdown()
 
 @app.get("/")
 async def root():
@@ -59,17 +217,57 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "ok", "timestamp": datetime.now().isoformat()}
+    return {"status": "ok", "timestamp": datetime.now().isoformat(), "leader": coordinator.is_leader}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(
+        metrics.registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+# Lista de câmeras consultada pelo painel; mudanças de status (manuais ou
+# automáticas) invalidam o cache em todos os workers, e last_seen é gravado a
+# cada HEARTBEAT_FLUSH_INTERVAL, que serve também de validade do cache
+_cameras_cache = {"value": None, "expires": 0.0}
+
+def invalidate_cameras_cache(camera_id=None):
+    _cameras_cache.update(value=None, expires=0.0)
 
 @app.get("/api/cameras", response_model=List[Camera])
 async def get_cameras():
-    cameras = await database.get_all_cameras()
-    return cameras
+    now = time.monotonic()
+    if _cameras_cache["value"] is None or now >= _cameras_cache["expires"]:
+        cameras = await database.get_all_cameras()
+        _cameras_cache.update(value=cameras, expires=now + heartbeats.HEARTBEAT_FLUSH_INTERVAL)
+    return _cameras_cache["value"]
+
+@app.post("/api/cameras/heartbeat", status_code=202)
+async def post_cameras_heartbeat(heartbeat: CameraHeartbeat):
+    # Apenas registrado em memória; gravado no próximo ciclo do buffer
+    received_at = datetime.now()
+    for camera_id in dict.fromkeys(heartbeat.camera_ids):
+        heartbeat_buffer.beat(camera_id, received_at)
+    return {"accepted": len(set(heartbeat.camera_ids))}
 
-@app.get("/api/cameras/{camera_id}/detections")
-async def get_camera_detections(camera_id: str):
-    detections = await database.get_camera_detections(camera_id)
-    return detections
+@app.post("/api/cameras/{camera_id}/heartbeat", status_code=202)
+async def post_camera_heartbeat(camera_id: str):
+    heartbeat_buffer.beat(camera_id)
+    return {"accepted": 1}
+
+@app.get("/api/cameras/{camera_id}/detections", response_class=FastJSONResponse)
+async def get_camera_detections(
+    camera_id: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    history: bool = False,
+    fields: Optional[str] = None
+):
+    detections = await database.list_detections(
+        camera_id, include_history=history, start=start, end=end,
+        fields=parse_fields(fields, database.DETECTION_FIELDS)
+    )
+    return FastJSONResponse(detections)
 
 @app.put("/api/cameras/{camera_id}/status")
 async def update_camera_status(camera_id: str, status: str):
@@ -81,25 +279,52 @@ async def update_camera_status(camera_id: str, status: str):
     if not success:
         raise HTTPException(status_code=404, detail="Câmera não encontrada")
         
+    await coordinator.publish("camera_status", camera_id)
     return {"message": f"Status da câmera {camera_id} atualizado para {status}"}
 
-@app.get("/api/waste-detections")
+@app.get("/api/waste-detections", response_class=FastJSONResponse)
 async def get_waste_detections(
     camera_id: Optional[str] = None,
     status: Optional[str] = None,
-    limit: int = Query(50, ge=1, le=100)
+    limit: int = Query(50, ge=1, le=100),
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    history: bool = False,
+    fields: Optional[str] = None
 ):
-    if camera_id:
-        detections = await database.get_camera_detections(camera_id)
-    else:
-        detections = await database.get_all_detections()
-        
-    if status:
-        detections = [d for d in detections if d.get("status") == status]
-        
-    detections = detections[:limit]
-    
-    return detections
+    # Por padrão apenas as detecções ativas; o histórico arquivado entra com history=true
+    # ou quando start é anterior ao horizonte de arquivamento.
+    # fields=id,timestamp,status limita os campos retornados.
+    detections = await database.list_detections(
+        camera_id, status, history, start, end, limit,
+        fields=parse_fields(fields, database.DETECTION_FIELDS)
+    )
+    return FastJSONResponse(detections)
+
+@app.get("/api/waste-detections/export")
+async def export_waste_detections(
+    format: str = Query("ndjson", pattern="^(ndjson|csv|parquet)$"),
+    camera_id: Optional[str] = None,
+    status: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    history: bool = False,
+    fields: Optional[str] = None
+):
+    # Exportação completa, sem limite de linhas: os blocos lidos do banco são
+    # convertidos e enviados um a um
+    if format not in export.available_formats():
+        raise HTTPException(status_code=400, detail="Exportação em parquet requer o pacote pyarrow")
+
+    selected = parse_fields(fields, database.DETECTION_FIELDS) or list(database.DETECTION_FIELDS)
+    chunks = database.iter_detections(camera_id, status, history, start, end, selected)
+    media_type, extension = export.EXPORT_FORMATS[format]
+    filename = f"deteccoes-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{extension}"
+    return StreamingResponse(
+        export.export_stream(format, chunks, selected),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 @app.get("/api/waste-detections/{detection_id}")
 async def get_waste_detection(detection_id: str):
@@ -129,6 +354,9 @@ async def create_waste_detection(
             parsed_timestamp = datetime.fromisoformat(timestamp)
         except ValueError:
             parsed_timestamp = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
+        # Gravado no horário local sem fuso, como resolved_at e os cortes de
+        # arquivamento e retenção: o SQLite compara esses horários como texto
+        parsed_timestamp = database.local_datetime(parsed_timestamp)
             
         detection_data = {
             "id": detection_id,
@@ -143,33 +371,74 @@ async def create_waste_detection(
             "status": "Aberto"
         }
         
-        image_url = None
-        if image:
-            file_extension = os.path.splitext(image.filename)[1] if image.filename else ".jpg"
-            image_filename = f"{detection_id}{file_extension}"
-            image_path = DETECTIONS_DIR / image_filename
+        contents = await image.read() if image else None
+        dhash = await image_store.run(image_dhash, contents) if contents else None
+        received_at = datetime.now()
+        
+        async with deduplicator.lock(camera_id):
+            # O detector costuma reenviar o mesmo descarte: incorporar à detecção aberta existente
+            duplicate = deduplicator.find(camera_id, received_at, latitude, longitude, detection_area, dhash)
+            if duplicate:
+                occurrences = await database.record_occurrence(
+                    duplicate["id"], parsed_timestamp.isoformat(), detection_area
+                )
+                if occurrences:
+                    deduplicator.touch(duplicate, received_at, detection_area, dhash)
+                    heartbeat_buffer.beat(camera_id, received_at)
+                    DEDUP_MERGED.inc(camera_id=camera_id)
+                    return {
+                        "message": "Ocorrência registrada em detecção existente",
+                        "id": duplicate["id"],
+                        "duplicate": True,
+                        "occurrences": occurrences
+                    }
+                # A detecção não está mais aberta (ex.: atualizada por outro worker)
+                deduplicator.forget(duplicate["id"])
             
-            with open(image_path, "wb") as f:
-                contents = await image.read()
-                f.write(contents)
+            image_url = None
+            stored_image = None
+            if image:
+                file_extension = os.path.splitext(image.filename)[1] if image.filename else ".jpg"
                 
-            image_url = f"/static/detections/{image_filename}"
-            detection_data["image_url"] = image_url
-            
-        await database.add_detection(detection_data, image_url)
-        
-        background_tasks.add_task(register_in_blockchain, detection_data)
+                # Endereçada pelo conteúdo: quadros reenviados reaproveitam o mesmo arquivo
+                stored_image = await image_store.run(image_store.store_original, contents, file_extension)
+                image_path = stored_image.path
+                image_url = stored_image.url
+                detection_data["image_url"] = image_url
+                
+            # Registro na blockchain e notificação são executados pelo líder a partir
+            # da fila, gravada na mesma transação da detecção
+            await database.add_detection(
+                detection_data,
+                image_url,
+                stored_image.as_record() if stored_image else None,
+                jobs=[
+                    job("register_in_blockchain", detection_data),
+                    # Sem novas tentativas: um envio parcial não pode ser repetido
+                    job("send_notification", {
+                        "detection": detection_data,
+                        "image_path": str(image_path) if image else None
+                    }, max_attempts=1),
+                ]
+            )
+            coordinator.notify()
+            heartbeat_buffer.beat(camera_id, received_at, detection_data["timestamp"])
+            deduplicator.remember(camera_id, detection_id, received_at, latitude, longitude, detection_area, dhash)
         
-        background_tasks.add_task(
-            send_notification, 
-            detection_data,
-            str(image_path) if image else None
-        )
+        if image:
+            background_tasks.add_task(
+                track_background(create_image_derivatives),
+                detection_id,
+                str(image_path),
+                stored_image.hash
+            )
         
         return {
             "message": "Detecção registrada com sucesso",
             "id": detection_id,
-            "image_url": image_url
+            "image_url": image_url,
+            "duplicate": False,
+            "occurrences": 1
         }
         
     except Exception as e:
@@ -179,24 +448,129 @@ async def create_waste_detection(
 @app.put("/api/waste-detections/{detection_id}")
 async def update_waste_detection(
     detection_id: str, 
-    update_data: WasteDetectionUpdate,
-    background_tasks: BackgroundTasks
+    update_data: WasteDetectionUpdate
 ):
-    detection = await database.get_detection(detection_id)
-    if not detection:
+    update_dict = update_data.dict(exclude_unset=True)
+    expected_version = update_dict.pop("version", None)
+    outcome, detection = await database.update_detection(detection_id, update_dict, expected_version)
+    
+    if outcome == "not_found":
         raise HTTPException(status_code=404, detail="Detecção não encontrada")
+    if outcome == "conflict":
+        raise HTTPException(
+            status_code=409,
+            detail=f"Detecção alterada por outra requisição (versão atual: {detection['version']})"
+        )
         
-    update_dict = update_data.dict(exclude_unset=True)
-    success = await database.update_detection(detection_id, update_dict)
+    if outcome == "updated" and update_data.status and update_data.status != "Aberto":
+        await coordinator.publish("detection_closed", detection_id)
+        
+    if outcome == "updated" and update_data.status == "Em Atendimento":
+        await coordinator.enqueue("register_in_blockchain", detection)
+        
+    return {"message": "Detecção atualizada com sucesso", "version": detection["version"]}
+
+@app.patch("/api/waste-detections")
+async def update_waste_detections(bulk_update: WasteDetectionBulkUpdate):
+    # Atualização em lote: uma transação para todos os itens e um único bloco na
+    # blockchain para as detecções que passaram a "Em Atendimento". Itens com
+    # versão divergente ou inexistentes não interrompem o lote e são reportados
+    # individualmente.
+    updates = [item.dict(exclude_unset=True) for item in bulk_update.updates]
+    results = await database.update_detections(updates)
     
-    if not success:
-        raise HTTPException(status_code=500, detail="Erro ao atualizar detecção")
+    response, to_register = [], []
+    for update, (outcome, detection) in zip(updates, results):
+        response.append({
+            "id": update["id"],
+            "result": outcome,
+            "version": detection["version"] if detection else None,
+        })
+        # Itens em conflito não foram alterados (outra requisição pode tê-los
+        # reaberto): nada a invalidar nem a registrar
+        if outcome != "updated":
+            continue
+        if update.get("status") and update["status"] != "Aberto":
+            await coordinator.publish("detection_closed", update["id"])
+        if update.get("status") == "Em Atendimento":
+            to_register.append(detection)
+            
+    if to_register:
+        await coordinator.enqueue("register_batch_in_blockchain", to_register)
         
-    if update_data.status == "Em Atendimento":
-        updated_detection = await database.get_detection(detection_id)
-        background_tasks.add_task(register_in_blockchain, updated_detection)
+    return {
+        "updated": sum(1 for item in response if item["result"] == "updated"),
+        "results": response,
+    }
+
+def stats_period(start: Optional[str], end: Optional[str], default_days: int = 30):
+    # Período padrão: últimos default_days dias
+    end = end or datetime.now().isoformat()
+    start = start or (datetime.fromisoformat(end[:10]) - timedelta(days=default_days)).isoformat()
+    return start, end
+
+@app.get("/api/stats/counts")
+async def get_detection_counts(
+    granularity: str = Query("day", pattern="^(hour|day|total)$"),
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    group_by: List[str] = Query(["bucket"]),
+    camera_id: Optional[str] = None,
+    status: Optional[str] = None,
+    waste_type: Optional[str] = None
+):
+    invalid = [field for field in group_by if field not in database.ROLLUP_GROUP_FIELDS]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Agrupamento inválido: {', '.join(invalid)}")
         
-    return {"message": "Detecção atualizada com sucesso"}
+    return await database.get_detection_counts(
+        granularity, start, end, group_by, camera_id, status, waste_type
+    )
+
+@app.get("/api/stats/heatmap")
+async def get_detection_heatmap(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    cell: float = Query(0.01, ge=database.GRID_CELL_DEGREES, le=1.0),
+    status: Optional[str] = None
+):
+    start, end = stats_period(start, end)
+    cells = await database.get_detection_heatmap(start, end, cell, status)
+    return {"start": start, "end": end, "cell_degrees": cell, "cells": cells}
+
+@app.get("/api/detections/clusters", response_class=FastJSONResponse)
+async def get_detection_clusters(
+    bbox: str,
+    zoom: int = Query(..., ge=0, le=22),
+    status: Optional[str] = None
+):
+    # bbox=oeste,sul,leste,norte (graus), como em map.getBounds().toBBoxString() no Leaflet.
+    # Agrupa todo o histórico (inclusive o arquivado) em células do tamanho do zoom.
+    try:
+        west, south, east, north = (float(value) for value in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox inválido: use oeste,sul,leste,norte")
+    if west > east or south > north:
+        raise HTTPException(status_code=400, detail="bbox inválido: use oeste,sul,leste,norte")
+
+    clusters = await database.get_detection_clusters(west, south, east, north, zoom, status)
+    return FastJSONResponse({
+        "zoom": database.cluster_zoom(zoom),
+        "cell_degrees": database.cluster_cell_degrees(zoom),
+        "clusters": clusters,
+    })
+
+@app.get("/api/stats/resolution-time")
+async def get_resolution_time(
+    granularity: str = Query("day", pattern="^(day|total)$"),
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    camera_id: Optional[str] = None,
+    by_camera: bool = False
+):
+    # Tempo médio entre a detecção e a passagem para "Concluído", por dia de conclusão
+    start, end = stats_period(start, end)
+    return await database.get_resolution_stats(start, end, granularity, camera_id, by_camera)
 
 @app.post("/api/notifications")
 async def send_notification_request(request: NotificationRequest):
@@ -221,10 +595,44 @@ async def send_notification_request(request: NotificationRequest):
         "results": results
     }
 
-@app.get("/api/blockchain/chain")
-async def get_blockchain():
-    chain = await blockchain_client.get_chain()
-    return chain
+@app.post("/api/maintenance/compact-images")
+async def compact_images_request():
+    report = await compact_images()
+    return report
+
+@app.post("/api/maintenance/archive-detections")
+async def archive_detections_request():
+    moved = await archive_detections()
+    return {"archived": sum(moved.values()), "partitions": moved}
+
+@app.post("/api/maintenance/audit")
+async def audit_integrity_request(rows: int = Query(audit.AUDIT_ROWS_PER_RUN, ge=1, le=100000)):
+    return await audit.audit_detections(blockchain_client, image_store, ARCHIVE_DIR, max_rows=rows)
+
+@app.get("/api/audit")
+async def get_audit_report(
+    kind: Optional[str] = Query(None),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    if kind is not None and kind not in audit.FINDING_KINDS:
+        raise HTTPException(status_code=400, detail=f"Tipo inválido: {kind}")
+    return {
+        "state": await database.get_audit_state(audit.AUDIT_NAME),
+        "totals": await database.count_audit_findings(),
+        "findings": await database.get_audit_findings(kind, limit),
+    }
+
+@app.get("/api/blockchain/chain", response_class=FastJSONResponse)
+async def get_blockchain(fields: Optional[str] = None):
+    selected = parse_fields(fields, BLOCK_FIELDS)
+    raw = await blockchain_client.get_chain_raw()
+    if raw is None:
+        return FastJSONResponse([])
+    if selected is None:
+        # Sem projeção, o corpo do nó é repassado sem decodificar e recodificar
+        return Response(raw, media_type="application/json")
+    chain = loads(raw)
+    return FastJSONResponse([{field: block.get(field) for field in selected} for block in chain])
 
 @app.get("/api/blockchain/validate")
 async def validate_blockchain():
@@ -241,22 +649,42 @@ async def get_blockchain_detection(detection_id: str):
     return block
 
 async def register_in_blockchain(detection_data):
-    try:
-        logger.info(f"Registrando detecção {detection_data.get('id')} na blockchain...")
+    # Executado pelo líder a partir da fila; uma falha gera nova tentativa
+    logger.info(f"Registrando detecção {detection_data.get('id')} na blockchain...")
+    
+    block_hash = await blockchain_client.register_detection(detection_data)
+    
+    if not block_hash:
+        raise RuntimeError(f"Falha ao registrar na blockchain: {detection_data.get('id')}")
+        
+    await database.update_detection(
+        detection_data.get("id"),
+        {"blockchain_hash": block_hash}
+    )
+    logger.info(f"Detecção registrada na blockchain: {block_hash}")
+
+async def register_batch_in_blockchain(detections):
+    logger.info(f"Registrando lote de {len(detections)} detecções na blockchain...")
+    
+    block_hash = await blockchain_client.register_detections(detections)
+    
+    if not block_hash:
+        raise RuntimeError(f"Falha ao registrar lote na blockchain: {[d['id'] for d in detections]}")
         
-        block_hash = await blockchain_client.register_detection(detection_data)
+    await database.update_detections([
+        {"id": detection["id"], "blockchain_hash": block_hash} for detection in detections
+    ])
+    logger.info(f"Lote registrado na blockchain: {block_hash}")
+
+async def create_image_derivatives(detection_id, image_path, image_hash=None):
+    try:
+        image_urls = await image_store.create_derivatives(image_path, image_hash)
         
-        if block_hash:
-            await database.update_detection(
-                detection_data.get("id"),
-                {"blockchain_hash": block_hash}
-            )
-            logger.info(f"Detecção registrada na blockchain: {block_hash}")
-        else:
-            logger.error(f"Falha ao registrar na blockchain: {detection_data.get('id')}")
+        if image_urls:
+            await database.update_detection_images(detection_id, image_urls)
             
     except Exception as e:
-        logger.error(f"Erro ao registrar na blockchain: {str(e)}")
+        logger.error(f"Erro ao gerar miniaturas da detecção {detection_id}: {str(e)}")
 
 async def send_notification(detection_data, image_path=None):
     try:
@@ -275,9 +703,12 @@ async def send_notification(detection_data, image_path=None):
     except Exception as e:
         logger.error(f"Erro ao enviar notificação: {str(e)}")
 
+# Importação deste módulo (FastAPI, rotas e dependências), exposta em backend_startup_seconds
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+
 if __name__ == "__main__":
     import uvicorn
     
     port = int(os.getenv("PORT", 8000))
     
-    uvicorn.run("main:app", host="0.0.0.0", port=port, reload=True) 
\ No newline at end of file
+    uvicorn.run("main:app", host="0.0.0.0", port=port, reload=True) 
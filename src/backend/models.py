@@ -15,8 +15,13 @@ class WasteDetection(BaseModel):
     detection_area: float
     waste_type: str = "Desconhecido"
     image_url: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    medium_url: Optional[str] = None
     status: str = "Aberto"  # "Aberto", "Em Atendimento", "Concluído"
     blockchain_hash: Optional[str] = None
+    occurrences: int = 1  # reenvios incorporados enquanto a detecção estava aberta
+    last_seen: Optional[datetime] = None
+    version: int = 1  # incrementada a cada alteração de status ou tipo (controle de concorrência)
     
     class Config:
         schema_extra = {
@@ -31,6 +36,8 @@ class WasteDetection(BaseModel):
                 "detection_area": 1500.0,
                 "waste_type": "Desconhecido",
                 "image_url": "/static/detections/123e4567.jpg",
+                "thumbnail_url": "/static/images/9f/9f86d081..._thumbnail.jpg",
+                "medium_url": "/static/images/9f/9f86d081..._medium.jpg",
                 "status": "Aberto",
                 "blockchain_hash": "0x1a2b3c4d5e6f..."
             }
@@ -47,6 +54,16 @@ class WasteDetectionUpdate(BaseModel):
     status: Optional[str] = None
     waste_type: Optional[str] = None
     blockchain_hash: Optional[str] = None
+    version: Optional[int] = None  # versão esperada; divergente -> 409
+
+class WasteDetectionPatch(BaseModel):
+    id: str
+    status: Optional[str] = None
+    waste_type: Optional[str] = None
+    version: Optional[int] = None  # versão esperada; divergente -> item em conflito
+
+class WasteDetectionBulkUpdate(BaseModel):
+    updates: List[WasteDetectionPatch] = Field(..., min_length=1, max_length=500)
 
 class Camera(BaseModel):
     id: str
@@ -55,6 +72,11 @@ class Camera(BaseModel):
     coordinates: Coordinates
     status: str = "Online"  # "Online", "Offline", "Manutenção"
     last_detection: Optional[datetime] = None
+    last_seen: Optional[datetime] = None  # último sinal de vida (heartbeat ou detecção)
+
+class CameraHeartbeat(BaseModel):
+    # Um detector envia em uma única requisição o sinal de todas as câmeras que atende
+    camera_ids: List[str] = Field(..., min_length=1, max_length=500)
 
 class NotificationRequest(BaseModel):
     detection_id: str
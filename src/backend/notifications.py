@@ -5,11 +5,8 @@ import logging
 import os
 from typing import Dict, Any, List, Optional
 from pathlib import Path
+from metrics import timed, NOTIFICATION_SECONDS, NOTIFICATION_ERRORS
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger('notifications')
 
 WAHA_URL = os.getenv("WAHA_URL", "http://localhost:3000")
@@ -36,6 +33,7 @@ class NotificationService:
         
         logger.info("Serviço de notificações inicializado.")
         
+    @timed(NOTIFICATION_SECONDS, channel="whatsapp_text")
     async def send_whatsapp_text(self, phone: str, message: str) -> bool:
         try:
             url = f"{self.waha_url}/api/sendText"
@@ -56,13 +54,16 @@ class NotificationService:
                     logger.info(f"Mensagem WhatsApp enviada para {phone}")
                     return True
                 else:
+                    NOTIFICATION_ERRORS.inc(channel="whatsapp_text")
                     logger.error(f"Erro ao enviar mensagem WhatsApp: {response.status_code} - {response.text}")
                     return False
                     
         except Exception as e:
+            NOTIFICATION_ERRORS.inc(channel="whatsapp_text")
             logger.error(f"Erro ao enviar mensagem WhatsApp: {str(e)}")
             return False
             
+    @timed(NOTIFICATION_SECONDS, channel="whatsapp_image")
     async def send_whatsapp_image(self, 
                                   phone: str, 
                                   image_path: str, 
@@ -71,6 +72,7 @@ class NotificationService:
             url = f"{self.waha_url}/api/sendImage"
             
             if not Path(image_path).exists():
+                NOTIFICATION_ERRORS.inc(channel="whatsapp_image")
                 logger.error(f"Imagem não encontrada: {image_path}")
                 return False
                 
@@ -96,10 +98,12 @@ class NotificationService:
                         logger.info(f"Imagem WhatsApp enviada para {phone}")
                         return True
                     else:
+                        NOTIFICATION_ERRORS.inc(channel="whatsapp_image")
                         logger.error(f"Erro ao enviar imagem WhatsApp: {response.status_code} - {response.text}")
                         return False
                     
         except Exception as e:
+            NOTIFICATION_ERRORS.inc(channel="whatsapp_image")
             logger.error(f"Erro ao enviar imagem WhatsApp: {str(e)}")
             return False
             
@@ -154,6 +158,11 @@ class NotificationService:
 if __name__ == "__main__":
     import asyncio
     
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    
     async def test_notifications():
         service = NotificationService()
         
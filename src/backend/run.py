@@ -1,7 +1,6 @@
 import os
 import logging
 import argparse
-import uvicorn
 
 logging.basicConfig(
     level=logging.INFO,
@@ -26,6 +25,9 @@ def main():
     
     args = parser.parse_args()
     
+    # Importado só depois dos argumentos: --help não carrega o servidor
+    import uvicorn
+    
     os.environ.setdefault('PYTHONPATH', os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     
     logger.info(f"Iniciando o servidor backend em {args.host}:{args.port}")
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+
+# Benchmark de inicialização a frio dos pontos de entrada.
+#
+# Cada medição é um processo novo, como em um reinício pelo orquestrador:
+#   main.py          -> importação de main, startup_event (init_db, coordenador)
+#                       e primeira requisição (GET /api/cameras), com banco novo
+#                       e com banco já inicializado
+#   run.py           -> do início do processo até o primeiro GET /health com
+#                       sucesso e a latência da primeira requisição seguinte
+#   run_detector.py  -> --help e, contra um backend simulado, o tempo até a
+#                       primeira requisição (GET /api/cameras) e o primeiro heartbeat
+# Os resultados (mediana e mínimo de --repeat execuções) são gravados em JSON
+# para comparação entre versões (--compare).
+
+import os
+import sys
+import json
+import time
+import socket
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import threading
+import statistics
+import subprocess
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+
+logger = logging.getLogger('startup_benchmark')
+
+BACKEND_DIR = Path(__file__).resolve().parent
+DETECTOR_DIR = BACKEND_DIR.parent / "computer_vision"
+READY_TIMEOUT = 60.0
+
+# Executado em um processo novo: tempos de importação, inicialização e primeira
+# requisição do app, em segundos, impressos como JSON na última linha
+MAIN_PROBE = """
+import time
+started = time.perf_counter()
+import json
+import asyncio
+import logging
+import main
+imported = time.perf_counter()
+logging.disable(logging.CRITICAL)
+import httpx
+
+async def probe():
+    startup_started = time.perf_counter()
+    await main.startup_event()
+    startup_done = time.perf_counter()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+        response = await client.get("/api/cameras")
+        response.raise_for_status()
+    first_request = time.perf_counter()
+    await main.shutdown_event()
+    return startup_done - startup_started, first_request - startup_done
+
+startup, first_request = asyncio.run(probe())
+print(json.dumps({"import_s": imported - started, "startup_s": startup, "first_request_s": first_request}))
+"""
+
+
+class _BackendStub(BaseHTTPRequestHandler):
+    # Responde como o backend ao detector e registra a chegada da primeira
+    # requisição de cada rota
+    arrivals = {}
+    lock = threading.Lock()
+
+    def _record(self):
+        with self.lock:
+            self.arrivals.setdefault(self.path.split("?")[0], time.perf_counter())
+
+    def do_GET(self):
+        self._record()
+        self._send(200, [])
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        self._record()
+        self._send(202, {"accepted": 1})
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def summarize(values):
+    values = [value * 1000 for value in values if value is not None]
+    if not values:
+        return None
+    return {"median_ms": statistics.median(values), "min_ms": min(values), "runs": len(values)}
+
+
+def run_process(args, cwd, env=None):
+    started = time.perf_counter()
+    completed = subprocess.run(args, cwd=cwd, env=env, capture_output=True, text=True, timeout=READY_TIMEOUT)
+    elapsed = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} terminou com código {completed.returncode}: {completed.stderr[-2000:]}")
+    return elapsed, completed.stdout
+
+
+def stop_process(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def bench_interpreter(repeat):
+    # Referência: custo de iniciar o interpretador sem importar nada
+    return {"process_s": summarize([run_process([sys.executable, "-c", "pass"], BACKEND_DIR)[0] for _ in range(repeat)])}
+
+
+def bench_main(repeat, work_dir):
+    # A primeira execução de cada rodada cria o banco (esquema e câmeras de
+    # exemplo); as seguintes encontram o esquema na versão atual
+    runs = {"fresh_db": [], "existing_db": []}
+    for index in range(repeat):
+        database_path = work_dir / f"main_{index}.db"
+        env = dict(os.environ, DATABASE_PATH=str(database_path))
+        for kind in ("fresh_db", "existing_db"):
+            elapsed, output = run_process([sys.executable, "-c", MAIN_PROBE], BACKEND_DIR, env)
+            result = json.loads(output.strip().splitlines()[-1])
+            result["process_s"] = elapsed
+            runs[kind].append(result)
+
+    return {
+        kind: {
+            key: summarize([result[key] for result in results])
+            for key in ("process_s", "import_s", "startup_s", "first_request_s")
+        }
+        for kind, results in runs.items()
+    }
+
+
+def bench_run(repeat, work_dir):
+    ready, first_request = [], []
+    for index in range(repeat):
+        port = free_port()
+        env = dict(os.environ, DATABASE_PATH=str(work_dir / f"run_{index}.db"))
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "run.py", "--host", "127.0.0.1", "--port", str(port)],
+            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=5) as client:
+                while True:
+                    if process.poll() is not None:
+                        raise RuntimeError(f"run.py terminou com código {process.returncode}")
+                    if time.perf_counter() - started > READY_TIMEOUT:
+                        raise RuntimeError("run.py não respondeu a tempo")
+                    try:
+                        if client.get("/health").status_code == 200:
+                            break
+                    except httpx.TransportError:
+                        pass
+                    time.sleep(0.01)
+                ready.append(time.perf_counter() - started)
+                request_started = time.perf_counter()
+                client.get("/api/cameras").raise_for_status()
+                first_request.append(time.perf_counter() - request_started)
+        finally:
+            stop_process(process)
+
+    return {"ready_s": summarize(ready), "first_request_s": summarize(first_request)}
+
+
+def make_camera_folder(folder):
+    # Duas imagens iguais: fundo e um quadro sem descarte (sem envio de detecção)
+    import cv2
+    import numpy as np
+
+    camera = folder / "camera_01"
+    camera.mkdir(parents=True, exist_ok=True)
+    frame = np.full((360, 640, 3), 120, np.uint8)
+    for name in ("frame_000.jpg", "frame_001.jpg"):
+        cv2.imwrite(str(camera / name), frame)
+    return folder
+
+
+def bench_detector(repeat, work_dir):
+    help_runs = [
+        run_process([sys.executable, "run_detector.py", "--help"], DETECTOR_DIR)[0]
+        for _ in range(repeat)
+    ]
+
+    cameras_folder = make_camera_folder(work_dir / "cameras")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _BackendStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    backend_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    first_request, first_heartbeat = [], []
+    try:
+        for _ in range(repeat):
+            _BackendStub.arrivals = {}
+            started = time.perf_counter()
+            process = subprocess.Popen(
+                [
+                    sys.executable, "run_detector.py",
+                    "--backend-url", backend_url,
+                    "--cameras-folder", str(cameras_folder),
+                    "--interval", "3600",
+                ],
+                cwd=DETECTOR_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            try:
+                while "/api/cameras/heartbeat" not in _BackendStub.arrivals:
+                    if process.poll() is not None:
+                        raise RuntimeError(f"run_detector.py terminou com código {process.returncode}")
+                    if time.perf_counter() - started > READY_TIMEOUT:
+                        raise RuntimeError("run_detector.py não enviou heartbeat a tempo")
+                    time.sleep(0.01)
+            finally:
+                stop_process(process)
+            arrivals = dict(_BackendStub.arrivals)
+            first_request.append(arrivals["/api/cameras"] - started if "/api/cameras" in arrivals else None)
+            first_heartbeat.append(arrivals["/api/cameras/heartbeat"] - started)
+    finally:
+        server.shutdown()
+
+    return {
+        "help_s": summarize(help_runs),
+        "first_request_s": summarize(first_request),
+        "first_heartbeat_s": summarize(first_heartbeat),
+    }
+
+
+def flatten(report):
+    # {"main.py": {"fresh_db": {"import_s": {...}}}} -> {"main.py fresh_db import_s": mediana}
+    values = {}
+
+    def walk(prefix, node):
+        if isinstance(node, dict) and "median_ms" in node:
+            values[prefix] = node["median_ms"]
+        elif isinstance(node, dict):
+            for key, value in node.items():
+                walk(f"{prefix} {key}".strip(), value)
+
+    walk("", report["results"])
+    return values
+
+
+def compare_reports(report, baseline):
+    previous = flatten(baseline)
+    lines = []
+    for key, value in flatten(report).items():
+        old = previous.get(key)
+        if old:
+            lines.append(f"{key:<45} {old:8.1f} ms -> {value:8.1f} ms ({(value / old - 1) * 100:+.1f}%)")
+    return lines
+
+
+def print_report(report):
+    for key, value in flatten(report).items():
+        print(f"{key:<45} {value:8.1f} ms")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Benchmark de inicialização a frio do backend e do detector')
+
+    parser.add_argument('--targets', nargs='+', default=["main.py", "run.py", "run_detector.py"],
+                        choices=["main.py", "run.py", "run_detector.py"],
+                        help='Pontos de entrada a medir')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Execuções de cada medição (processos novos)')
+    parser.add_argument('--work-dir', type=str, default=None,
+                        help='Pasta para os bancos e imagens do benchmark (padrão: temporária)')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Arquivo JSON de saída com os resultados')
+    parser.add_argument('--compare', type=str, default=None,
+                        help='Arquivo JSON de uma execução anterior para comparação')
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    work_dir = Path(args.work_dir) if args.work_dir else Path(tempfile.mkdtemp(prefix="startup_bench_"))
+    work_dir.mkdir(parents=True, exist_ok=True)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    benchmarks = {
+        "main.py": bench_main,
+        "run.py": bench_run,
+        "run_detector.py": bench_detector,
+    }
+    results = {"python": bench_interpreter(args.repeat)}
+    try:
+        for target in args.targets:
+            logger.info(f"Medindo {target} ({args.repeat} execuções)")
+            results[target] = benchmarks[target](args.repeat, work_dir)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "parameters": {"repeat": args.repeat},
+        "results": results,
+    }
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Resultados salvos em {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print("\nComparação com", args.compare)
+        for line in compare_reports(report, baseline):
+            print(line)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    main()
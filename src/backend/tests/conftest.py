@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+from pathlib import Path
+
+import pytest
+
+# Os módulos do backend são importados pelo nome, como em run.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import database  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    # Banco novo por teste
+    path = tmp_path / "waste_detection.db"
+    monkeypatch.setattr(database, "DB_PATH", path)
+    asyncio.run(database.init_db())
+    return path
+
+
+@pytest.fixture
+def local_tz():
+    # Fuso fixo (UTC-3, sem horário de verão) para os testes de conversão
+    previous = os.environ.get("TZ")
+    os.environ["TZ"] = "America/Recife"
+    time.tzset()
+    yield
+    if previous is None:
+        os.environ.pop("TZ", None)
+    else:
+        os.environ["TZ"] = previous
+    time.tzset()
+
+
+@pytest.fixture
+def client(db_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    import main
+
+    # A janela de deduplicação é global ao processo
+    monkeypatch.setattr(main.deduplicator, "_recent", {})
+    logging.disable(logging.CRITICAL)
+    try:
+        with TestClient(main.app) as test_client:
+            yield test_client
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+@pytest.fixture
+def create_detection(client):
+    # Envia uma detecção sem imagem e retorna a resposta JSON
+    def create(timestamp="2026-10-18T10:00:00", latitude=-8.1, longitude=-34.9,
+               detection_area=5000, camera_id="camera_01"):
+        response = client.post("/api/waste-detection", data={
+            "camera_id": camera_id,
+            "timestamp": timestamp,
+            "latitude": latitude,
+            "longitude": longitude,
+            "detection_area": detection_area,
+        })
+        assert response.status_code == 200, response.text
+        return response.json()
+    return create
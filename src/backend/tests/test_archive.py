@@ -0,0 +1,95 @@
+import sqlite3
+import asyncio
+from datetime import datetime, timedelta
+
+import database
+
+
+def resolve(client, db_path, detection_id, resolved_at):
+    client.put(f"/api/waste-detections/{detection_id}", json={"status": "Concluído"})
+    with sqlite3.connect(db_path) as db:
+        db.execute("UPDATE detections SET resolved_at = ? WHERE id = ?;", (resolved_at, detection_id))
+
+
+def active_ids(db_path):
+    with sqlite3.connect(db_path) as db:
+        return {row[0] for row in db.execute("SELECT id FROM detections;")}
+
+
+def test_archive_cutoff_uses_resolution_date(client, create_detection, db_path):
+    old = (datetime.now() - timedelta(days=200)).isoformat()
+    archived = create_detection(timestamp="2026-01-10T10:00:00", latitude=-8.1)
+    recent = create_detection(timestamp="2026-01-11T10:00:00", latitude=-8.5)
+    still_open = create_detection(timestamp="2026-01-12T10:00:00", latitude=-9.0)
+    resolve(client, db_path, archived["id"], old)
+    # Detectada há muito tempo, mas concluída agora
+    client.put(f"/api/waste-detections/{recent['id']}", json={"status": "Concluído"})
+
+    moved = asyncio.run(database.archive_detections(days=90))
+
+    assert moved == {"detections_archive_2026_01": 1}
+    assert active_ids(db_path) == {recent["id"], still_open["id"]}
+    # Continua visível pelo histórico
+    response = client.get(f"/api/waste-detections/{archived['id']}")
+    assert response.status_code == 200
+
+
+def test_reopen_restores_archived_detection(client, create_detection, db_path):
+    detection = create_detection(timestamp="2026-01-10T10:00:00")
+    resolve(client, db_path, detection["id"], (datetime.now() - timedelta(days=200)).isoformat())
+    asyncio.run(database.archive_detections(days=90))
+
+    response = client.put(f"/api/waste-detections/{detection['id']}", json={"status": "Aberto"})
+
+    assert response.status_code == 200
+    assert detection["id"] in active_ids(db_path)
+
+
+def test_partition_columns_get_defaults(client, create_detection, db_path):
+    # Partição migrada antes das colunas terem valor padrão: colunas sem NOT NULL
+    # DEFAULT e linhas com NULL
+    detection = create_detection(timestamp="2026-01-10T10:00:00")
+    resolve(client, db_path, detection["id"], (datetime.now() - timedelta(days=200)).isoformat())
+    asyncio.run(database.archive_detections(days=90))
+    with sqlite3.connect(db_path) as db:
+        db.execute("DROP VIEW detections_all;")
+        db.execute("ALTER TABLE detections_archive_2026_01 DROP COLUMN version;")
+        db.execute("ALTER TABLE detections_archive_2026_01 DROP COLUMN occurrences;")
+        db.execute("ALTER TABLE detections_archive_2026_01 ADD COLUMN occurrences INTEGER;")
+        db.execute("PRAGMA user_version = 0;")
+    asyncio.run(database.init_db())
+
+    with sqlite3.connect(db_path) as db:
+        row = db.execute("SELECT occurrences, version FROM detections_archive_2026_01;").fetchone()
+    assert row == (1, 1)
+    response = client.put(f"/api/waste-detections/{detection['id']}", json={"status": "Aberto"})
+    assert response.status_code == 200
+
+
+def test_ingest_stores_local_timestamps(client, create_detection, db_path, local_tz):
+    detection = create_detection(timestamp="2026-10-18T10:00:00+00:00")
+
+    with sqlite3.connect(db_path) as db:
+        (timestamp,) = db.execute("SELECT timestamp FROM detections WHERE id = ?;", (detection["id"],)).fetchone()
+    assert timestamp == "2026-10-18T07:00:00"
+
+
+def test_init_db_normalizes_stored_offsets(client, db_path, local_tz):
+    # Linhas gravadas antes da normalização na ingestão
+    with sqlite3.connect(db_path) as db:
+        db.execute(
+            "INSERT INTO detections (id, camera_id, timestamp, coordinates, detection_area, waste_type, "
+            "status, created_at, last_seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);",
+            ("old", "camera_02", "2026-01-01T01:00:00+00:00", '{"latitude": -8.0, "longitude": -34.0}',
+             10, "Desconhecido", "Aberto", "2026-01-01T00:00:00", "2026-01-01T02:00:00Z")
+        )
+        db.execute("PRAGMA user_version = 0;")
+    asyncio.run(database.init_db())
+
+    with sqlite3.connect(db_path) as db:
+        row = db.execute("SELECT timestamp, last_seen FROM detections WHERE id = 'old';").fetchone()
+        buckets = db.execute(
+            "SELECT bucket FROM detection_rollups WHERE granularity = 'day' AND camera_id = 'camera_02';"
+        ).fetchall()
+    assert row == ("2025-12-31T22:00:00", "2025-12-31T23:00:00")
+    assert buckets == [("2025-12-31",)]
@@ -0,0 +1,76 @@
+import json
+import sqlite3
+
+import main
+
+
+def batch_jobs(db_path):
+    with sqlite3.connect(db_path) as db:
+        rows = db.execute("SELECT payload FROM jobs WHERE kind = 'register_batch_in_blockchain';").fetchall()
+    return [[detection["id"] for detection in json.loads(payload)] for (payload,) in rows]
+
+
+def in_dedup_window(detection_id):
+    return any(entry["id"] == detection_id for recent in main.deduplicator._recent.values() for entry in recent)
+
+
+def test_partial_update_keeps_other_fields(client, create_detection):
+    detection = create_detection()
+    client.put(f"/api/waste-detections/{detection['id']}", json={"waste_type": "Entulho"})
+
+    response = client.patch("/api/waste-detections", json={"updates": [
+        {"id": detection["id"], "status": "Em Atendimento"},
+    ]})
+
+    assert response.json() == {
+        "updated": 1,
+        "results": [{"id": detection["id"], "result": "updated", "version": 3}],
+    }
+    stored = client.get(f"/api/waste-detections/{detection['id']}").json()
+    assert (stored["status"], stored["waste_type"]) == ("Em Atendimento", "Entulho")
+
+
+def test_per_item_outcomes(client, create_detection, db_path):
+    updated = create_detection(latitude=-8.1)
+    conflict = create_detection(latitude=-8.5)
+    unchanged = create_detection(latitude=-9.0)
+
+    response = client.patch("/api/waste-detections", json={"updates": [
+        {"id": updated["id"], "status": "Em Atendimento", "version": 1},
+        {"id": conflict["id"], "status": "Em Atendimento", "version": 7},
+        {"id": unchanged["id"], "status": "Aberto"},
+        {"id": "inexistente", "status": "Concluído"},
+    ]})
+
+    assert response.status_code == 200
+    assert [(item["result"], item["version"]) for item in response.json()["results"]] == [
+        ("updated", 2), ("conflict", 1), ("unchanged", 1), ("not_found", None),
+    ]
+    assert client.get(f"/api/waste-detections/{conflict['id']}").json()["status"] == "Aberto"
+    # Um único bloco, apenas com a detecção alterada
+    assert batch_jobs(db_path) == [[updated["id"]]]
+
+
+def test_conflict_keeps_detection_in_dedup_window(client, create_detection):
+    detection = create_detection()
+
+    client.patch("/api/waste-detections", json={"updates": [
+        {"id": detection["id"], "status": "Concluído", "version": 5},
+    ]})
+    assert in_dedup_window(detection["id"])
+
+    client.patch("/api/waste-detections", json={"updates": [
+        {"id": detection["id"], "status": "Concluído", "version": 1},
+    ]})
+    assert not in_dedup_window(detection["id"])
+
+
+def test_put_with_stale_version_conflicts(client, create_detection):
+    detection = create_detection()
+    url = f"/api/waste-detections/{detection['id']}"
+
+    assert client.put(url, json={"status": "Em Atendimento", "version": 1}).json()["version"] == 2
+    response = client.put(url, json={"status": "Concluído", "version": 1})
+
+    assert response.status_code == 409
+    assert client.get(url).json()["status"] == "Em Atendimento"
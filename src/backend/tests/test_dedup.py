@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+from dedup import DetectionDeduplicator
+
+
+def test_repeated_detection_is_merged(client, create_detection):
+    first = create_detection(detection_area=5000)
+    second = create_detection(detection_area=5500)
+
+    assert second["duplicate"] is True
+    assert second["id"] == first["id"]
+    assert second["occurrences"] == 2
+    detection = client.get(f"/api/waste-detections/{first['id']}").json()
+    assert detection["occurrences"] == 2
+    assert detection["detection_area"] == 5500
+
+
+def test_other_location_or_area_is_a_new_detection(create_detection):
+    first = create_detection(detection_area=5000)
+
+    # ~110 m ao sul
+    elsewhere = create_detection(latitude=-8.101, detection_area=5000)
+    larger = create_detection(detection_area=10000)
+
+    assert elsewhere["duplicate"] is False
+    assert larger["duplicate"] is False
+    assert len({first["id"], elsewhere["id"], larger["id"]}) == 3
+
+
+def test_closed_detection_receives_no_occurrences(client, create_detection):
+    first = create_detection()
+    client.put(f"/api/waste-detections/{first['id']}", json={"status": "Concluído"})
+
+    second = create_detection()
+
+    assert second["duplicate"] is False
+    assert second["id"] != first["id"]
+
+
+def test_window_and_image_hash():
+    deduplicator = DetectionDeduplicator(window_seconds=60, max_hash_distance=4)
+    now = datetime(2026, 10, 18, 10, 0)
+    deduplicator.remember("camera_01", "a", now, -8.1, -34.9, 5000, 0b1111)
+
+    assert deduplicator.find("camera_01", now + timedelta(seconds=30), -8.1, -34.9, 5000, 0b0111)["id"] == "a"
+    # Imagem diferente no mesmo local
+    assert deduplicator.find("camera_01", now + timedelta(seconds=30), -8.1, -34.9, 5000, 0xFFFF00) is None
+    # Fora da janela
+    assert deduplicator.find("camera_01", now + timedelta(seconds=90), -8.1, -34.9, 5000, 0b1111) is None
+    # Outra câmera
+    assert deduplicator.find("camera_02", now, -8.1, -34.9, 5000, 0b1111) is None
+
+    deduplicator.forget("a")
+    assert deduplicator.find("camera_01", now, -8.1, -34.9, 5000, 0b1111) is None
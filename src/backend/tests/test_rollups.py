@@ -0,0 +1,61 @@
+import sqlite3
+import asyncio
+from datetime import datetime
+
+import database
+
+
+def test_counts_follow_status_changes(client, create_detection):
+    detection = create_detection(timestamp="2026-10-18T10:00:00")
+    create_detection(timestamp="2026-10-18T11:00:00", latitude=-8.5)
+
+    counts = client.get("/api/stats/counts", params={
+        "start": "2026-10-18", "end": "2026-10-19", "group_by": ["bucket", "status"],
+    }).json()
+    assert counts == [{"bucket": "2026-10-18", "status": "Aberto", "count": 2}]
+
+    client.put(f"/api/waste-detections/{detection['id']}", json={"status": "Concluído"})
+    counts = client.get("/api/stats/counts", params={
+        "start": "2026-10-18", "end": "2026-10-19", "group_by": ["status"],
+    }).json()
+    assert sorted((row["status"], row["count"]) for row in counts) == [("Aberto", 1), ("Concluído", 1)]
+
+
+def test_resolution_with_utc_offset_timestamp(client, create_detection, db_path, local_tz):
+    # Timestamp com fuso e resolved_at local sem fuso
+    detection = create_detection(timestamp="2026-10-18T10:00:00+00:00")
+
+    response = client.put(f"/api/waste-detections/{detection['id']}", json={"status": "Concluído"})
+    assert response.status_code == 200
+
+    with sqlite3.connect(db_path) as db:
+        (day, resolved), = db.execute("SELECT day, resolved FROM resolution_rollups;").fetchall()
+    assert day == datetime.now().date().isoformat()
+    assert resolved == 1
+
+
+def test_rebuild_rollups_matches_incremental(client, create_detection, db_path):
+    for index, timestamp in enumerate(("2026-10-17T09:00:00", "2026-10-18T10:00:00", "2026-10-18T23:30:00")):
+        detection = create_detection(timestamp=timestamp, latitude=-8.0 - index)
+        client.put(f"/api/waste-detections/{detection['id']}", json={"status": "Concluído"})
+
+    def snapshot():
+        with sqlite3.connect(db_path) as db:
+            return (
+                sorted(db.execute("SELECT * FROM detection_rollups WHERE count != 0;").fetchall()),
+                sorted(db.execute("SELECT day, camera_id, resolved FROM resolution_rollups;").fetchall()),
+            )
+
+    incremental = snapshot()
+    # Versão anterior do esquema: init_db refaz as etapas e recalcula os agregados
+    with sqlite3.connect(db_path) as db:
+        db.execute("DELETE FROM detection_rollups;")
+        db.execute("PRAGMA user_version = 0;")
+    asyncio.run(database.init_db())
+    assert snapshot() == incremental
+
+
+def test_local_datetime_converts_offsets(local_tz):
+    assert database.local_datetime("2026-10-18T10:00:00+00:00") == datetime(2026, 10, 18, 7, 0)
+    assert database.local_datetime("2026-10-18T10:00:00Z") == datetime(2026, 10, 18, 7, 0)
+    assert database.local_datetime("2026-10-18T10:00:00") == datetime(2026, 10, 18, 10, 0)
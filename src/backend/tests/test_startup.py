@@ -0,0 +1,56 @@
+import os
+import sys
+import json
+import sqlite3
+import asyncio
+import subprocess
+from pathlib import Path
+
+import database
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DETECTOR_DIR = BACKEND_DIR.parent / "computer_vision"
+HEAVY_MODULES = ("cv2", "numpy", "pyarrow", "requests")
+
+
+def loaded_modules(code, cwd, env=None):
+    # Módulos pesados carregados por `code` em um processo novo
+    probe = f"{code}\nimport sys, json\nprint(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    completed = subprocess.run(
+        [sys.executable, "-c", probe], cwd=cwd, env=env, capture_output=True, text=True, timeout=60
+    )
+    assert completed.returncode == 0, completed.stderr
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def test_init_db_skips_current_schema(db_path):
+    with sqlite3.connect(db_path) as db:
+        assert db.execute("PRAGMA user_version;").fetchone()[0] == database.SCHEMA_VERSION
+        db.execute("DELETE FROM cameras;")
+
+    asyncio.run(database.init_db())
+    with sqlite3.connect(db_path) as db:
+        assert db.execute("SELECT COUNT(*) FROM cameras;").fetchone()[0] == 0
+        db.execute(f"PRAGMA user_version = {database.SCHEMA_VERSION - 1};")
+
+    # Versão anterior: as etapas são refeitas (inclusive as câmeras de exemplo)
+    asyncio.run(database.init_db())
+    with sqlite3.connect(db_path) as db:
+        assert db.execute("SELECT COUNT(*) FROM cameras;").fetchone()[0] == 3
+        assert db.execute("PRAGMA user_version;").fetchone()[0] == database.SCHEMA_VERSION
+
+
+def test_importing_main_defers_optional_dependencies(tmp_path):
+    env = dict(os.environ, DATABASE_PATH=str(tmp_path / "waste_detection.db"))
+    assert loaded_modules("import main", BACKEND_DIR, env) == []
+
+
+def test_detector_imports_defer_opencv():
+    assert loaded_modules("import detector", DETECTOR_DIR) == []
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "run_detector.py", "--help"],
+        cwd=DETECTOR_DIR, capture_output=True, text=True, timeout=60
+    )
+    assert completed.returncode == 0, completed.stderr
+    imported = {line.split("|")[-1].strip() for line in completed.stderr.splitlines() if "|" in line}
+    assert not imported & set(HEAVY_MODULES)
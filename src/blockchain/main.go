@@ -7,9 +7,10 @@ import (
 	"log"
 	"net/http"
 	"os"
+	"runtime"
 	"strconv"
-	"strings"
 	"sync"
+	"sync/atomic"
 	"time"
 
 	"github.com/gin-contrib/cors"
@@ -28,9 +29,11 @@ type Block struct {
 
 // Blockchain representa a cadeia de blocos
 type Blockchain struct {
-	Chain  []Block    `json:"chain"`
-	mutex  sync.Mutex // para acesso concorrente seguro
-	dbPath string     // caminho para o arquivo da blockchain
+	Chain         []Block    `json:"chain"`
+	mutex         sync.Mutex // para acesso concorrente seguro
+	dbPath        string     // caminho para o arquivo da blockchain
+	difficulty    int        // quantidade de zeros hexadecimais exigida no início do hash
+	miningWorkers int        // goroutines usadas na busca do nonce
 }
 
 // MineRequest representa a solicitação para minerar um novo bloco
@@ -40,21 +43,35 @@ type MineRequest struct {
 
 // MineResponse representa a resposta da mineração de um bloco
 type MineResponse struct {
-	Message string `json:"message"`
-	Index   int    `json:"index"`
-	Hash    string `json:"hash"`
+	Message    string  `json:"message"`
+	Index      int     `json:"index"`
+	Hash       string  `json:"hash"`
+	Nonce      int     `json:"nonce"`
+	Difficulty int     `json:"difficulty"`
+	MiningMs   float64 `json:"mining_ms"` // tempo total de mineração, incluindo novas tentativas
+	Attempts   int     `json:"attempts"`  // mais de 1 quando outro bloco entrou na cadeia durante a mineração
 }
 
+// BlocksRequest representa a solicitação de vários blocos pelo hash
+type BlocksRequest struct {
+	Hashes []string `json:"hashes"`
+}
+
+// Máximo de hashes por solicitação em POST /blocks/batch
+const maxBatchHashes = 1000
+
 // ValidateResponse representa a resposta da validação da blockchain
 type ValidateResponse struct {
 	Valid bool `json:"valid"`
 }
 
 // Novo blockchain com bloco gênesis
-func NewBlockchain(dbPath string) *Blockchain {
+func NewBlockchain(dbPath string, difficulty int, miningWorkers int) *Blockchain {
 	bc := &Blockchain{
-		Chain:  []Block{},
-		dbPath: dbPath,
+		Chain:         []Block{},
+		dbPath:        dbPath,
+		difficulty:    difficulty,
+		miningWorkers: miningWorkers,
 	}
 
 	// Tentar carregar a blockchain existente
@@ -108,36 +125,108 @@ func (bc *Blockchain) calculateHash(block Block) string {
 	return hex.EncodeToString(hashed)
 }
 
-// Adiciona um novo bloco à blockchain com proof of work simples
-func (bc *Blockchain) addBlock(data interface{}) Block {
-	bc.mutex.Lock()
-	defer bc.mutex.Unlock()
+// Resultado da mineração de um bloco
+type MineResult struct {
+	Block    Block
+	Duration time.Duration
+	Attempts int
+}
 
-	lastBlock := bc.Chain[len(bc.Chain)-1]
-	newBlock := Block{
-		Index:        lastBlock.Index + 1,
-		Timestamp:    time.Now().Unix(),
-		Data:         data,
-		PreviousHash: lastBlock.Hash,
-		Nonce:        0,
+// Adiciona um novo bloco à blockchain com proof of work. A mineração acontece
+// fora do mutex, para que as leituras não fiquem bloqueadas; o bloco só é
+// anexado se o último bloco da cadeia ainda for o usado na mineração. Caso
+// outro bloco tenha entrado antes, a mineração recomeça sobre o novo topo.
+func (bc *Blockchain) addBlock(data interface{}) MineResult {
+	started := time.Now()
+	for attempt := 1; ; attempt++ {
+		bc.mutex.Lock()
+		lastBlock := bc.Chain[len(bc.Chain)-1]
+		bc.mutex.Unlock()
+
+		newBlock := Block{
+			Index:        lastBlock.Index + 1,
+			Timestamp:    time.Now().Unix(),
+			Data:         data,
+			PreviousHash: lastBlock.Hash,
+		}
+		newBlock.Nonce, newBlock.Hash = mineNonce(newBlock, bc.difficulty, bc.miningWorkers)
+
+		bc.mutex.Lock()
+		if bc.Chain[len(bc.Chain)-1].Hash == lastBlock.Hash {
+			bc.Chain = append(bc.Chain, newBlock)
+			bc.saveToFile()
+			bc.mutex.Unlock()
+			return MineResult{Block: newBlock, Duration: time.Since(started), Attempts: attempt}
+		}
+		bc.mutex.Unlock()
 	}
+}
 
-	// Proof of Work simples com dificuldade 2 (começa com "00")
-	difficulty := 2
-	target := strings.Repeat("0", difficulty)
+// Busca um nonce cujo hash comece com difficulty zeros hexadecimais. Cada uma
+// das workers goroutines testa um subconjunto disjunto dos nonces (worker,
+// worker+workers, worker+2*workers...); a primeira a encontrar encerra as demais.
+// O texto do bloco sem o nonce é serializado uma única vez, e o resultado é o
+// mesmo de calculateHash.
+func mineNonce(block Block, difficulty int, workers int) (int, string) {
+	if workers < 1 {
+		workers = 1
+	}
+	blockData, _ := json.Marshal(block.Data)
+	prefix := []byte(strconv.Itoa(block.Index) +
+		strconv.FormatInt(block.Timestamp, 10) +
+		string(blockData) +
+		block.PreviousHash)
+
+	var found atomic.Bool
+	var once sync.Once
+	var wg sync.WaitGroup
+	var nonce int
+	var hash [sha256.Size]byte
+
+	for worker := 0; worker < workers; worker++ {
+		wg.Add(1)
+		go func(start int) {
+			defer wg.Done()
+			record := make([]byte, len(prefix), len(prefix)+20)
+			copy(record, prefix)
+			for candidate := start; !found.Load(); candidate += workers {
+				record = strconv.AppendInt(record[:len(prefix)], int64(candidate), 10)
+				sum := sha256.Sum256(record)
+				if hasLeadingZeros(sum, difficulty) {
+					once.Do(func() {
+						nonce, hash = candidate, sum
+						found.Store(true)
+					})
+					return
+				}
+			}
+		}(worker)
+	}
+	wg.Wait()
+
+	return nonce, hex.EncodeToString(hash[:])
+}
 
-	for {
-		newBlock.Hash = bc.calculateHash(newBlock)
-		if newBlock.Hash[:difficulty] == target {
-			break
+// Verifica se o hash, em hexadecimal, começa com difficulty zeros
+func hasLeadingZeros(sum [sha256.Size]byte, difficulty int) bool {
+	for i := 0; i < difficulty; i++ {
+		digit := sum[i/2]
+		if i%2 == 0 {
+			digit >>= 4
+		}
+		if digit&0x0f != 0 {
+			return false
 		}
-		newBlock.Nonce++
 	}
+	return true
+}
 
-	bc.Chain = append(bc.Chain, newBlock)
-	bc.saveToFile()
+// Cópia da cadeia para leitura sem segurar o mutex durante a serialização
+func (bc *Blockchain) getChain() []Block {
+	bc.mutex.Lock()
+	defer bc.mutex.Unlock()
 
-	return newBlock
+	return bc.Chain[:len(bc.Chain):len(bc.Chain)]
 }
 
 // Verifica se a blockchain é válida
@@ -175,6 +264,25 @@ func (bc *Blockchain) getBlockByHash(hash string) (Block, bool) {
 	return Block{}, false
 }
 
+// Busca vários blocos pelo hash percorrendo a cadeia uma única vez
+func (bc *Blockchain) getBlocksByHash(hashes []string) []Block {
+	wanted := make(map[string]bool, len(hashes))
+	for _, hash := range hashes {
+		wanted[hash] = true
+	}
+
+	bc.mutex.Lock()
+	defer bc.mutex.Unlock()
+
+	blocks := []Block{}
+	for _, block := range bc.Chain {
+		if wanted[block.Hash] {
+			blocks = append(blocks, block)
+		}
+	}
+	return blocks
+}
+
 // Busca um bloco pelos dados (para POC simplificado)
 func (bc *Blockchain) searchBlockByDetectionID(detectionID string) (Block, bool) {
 	bc.mutex.Lock()
@@ -197,6 +305,15 @@ func (bc *Blockchain) searchBlockByDetectionID(detectionID string) (Block, bool)
 		if id, exists := blockData["detection_id"]; exists && id == detectionID {
 			return block, true
 		}
+
+		// Blocos de lote guardam as detecções em "detections"
+		if detections, ok := blockData["detections"].([]interface{}); ok {
+			for _, item := range detections {
+				if detection, ok := item.(map[string]interface{}); ok && detection["detection_id"] == detectionID {
+					return block, true
+				}
+			}
+		}
 	}
 	return Block{}, false
 }
@@ -228,8 +345,22 @@ func main() {
 		os.MkdirAll(dataDir, 0755)
 	}
 
+	// Dificuldade do proof of work (zeros hexadecimais no início do hash); cada
+	// zero a mais multiplica por 16 o trabalho médio de mineração
+	difficulty := 2
+	if value, err := strconv.Atoi(os.Getenv("MINING_DIFFICULTY")); err == nil && value >= 0 && value <= 64 {
+		difficulty = value
+	}
+
+	// Goroutines usadas na mineração (padrão: uma por CPU)
+	miningWorkers := runtime.NumCPU()
+	if value, err := strconv.Atoi(os.Getenv("MINING_WORKERS")); err == nil && value > 0 {
+		miningWorkers = value
+	}
+
 	// Inicializar blockchain
-	blockchain := NewBlockchain(dataDir + "/blockchain.json")
+	blockchain := NewBlockchain(dataDir+"/blockchain.json", difficulty, miningWorkers)
+	log.Printf("Mineração com dificuldade %d e %d goroutines", difficulty, miningWorkers)
 
 	// Inicializar servidor Gin
 	router := gin.Default()
@@ -247,14 +378,15 @@ func main() {
 	// Health check
 	router.GET("/health", func(c *gin.Context) {
 		c.JSON(http.StatusOK, gin.H{
-			"status":    "ok",
-			"timestamp": time.Now().Format(time.RFC3339),
+			"status":     "ok",
+			"timestamp":  time.Now().Format(time.RFC3339),
+			"difficulty": blockchain.difficulty,
 		})
 	})
 
 	// Obter toda a blockchain
 	router.GET("/chain", func(c *gin.Context) {
-		c.JSON(http.StatusOK, blockchain.Chain)
+		c.JSON(http.StatusOK, blockchain.getChain())
 	})
 
 	// Minerar um novo bloco
@@ -265,12 +397,16 @@ func main() {
 			return
 		}
 
-		newBlock := blockchain.addBlock(req.Data)
+		result := blockchain.addBlock(req.Data)
 
 		response := MineResponse{
-			Message: "Novo bloco adicionado à blockchain",
-			Index:   newBlock.Index,
-			Hash:    newBlock.Hash,
+			Message:    "Novo bloco adicionado à blockchain",
+			Index:      result.Block.Index,
+			Hash:       result.Block.Hash,
+			Nonce:      result.Block.Nonce,
+			Difficulty: blockchain.difficulty,
+			MiningMs:   float64(result.Duration.Microseconds()) / 1000,
+			Attempts:   result.Attempts,
 		}
 
 		c.JSON(http.StatusOK, response)
@@ -293,6 +429,20 @@ func main() {
 		c.JSON(http.StatusOK, block)
 	})
 
+	// Obter vários blocos pelo hash; os hashes não encontrados são omitidos
+	router.POST("/blocks/batch", func(c *gin.Context) {
+		var req BlocksRequest
+		if err := c.ShouldBindJSON(&req); err != nil {
+			c.JSON(http.StatusBadRequest, gin.H{"error": err.Error()})
+			return
+		}
+		if len(req.Hashes) > maxBatchHashes {
+			c.JSON(http.StatusBadRequest, gin.H{"error": "Máximo de " + strconv.Itoa(maxBatchHashes) + " hashes por solicitação"})
+			return
+		}
+		c.JSON(http.StatusOK, blockchain.getBlocksByHash(req.Hashes))
+	})
+
 	// Buscar bloco por detection_id
 	router.GET("/search", func(c *gin.Context) {
 		detectionID := c.Query("detection_id")
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+
+# Benchmark do WasteDetector com cenas sintéticas.
+#
+# Gera cenas de câmera com NumPy (fundo, "descartes" inseridos, variação de
+# iluminação e ruído), mede detect_waste e process_camera_images em várias
+# resoluções e quantidades de câmeras e grava os resultados em JSON para
+# comparação entre versões (--compare).
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import contextlib
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from detector import WasteDetector
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger('waste_detector_benchmark')
+
+RESOLUTIONS = {
+    "360p": (640, 360),
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+}
+
+
+class OfflineDetector(WasteDetector):
+    # No benchmark nenhuma detecção é enviada ao backend
+
+    def notify_backend(self, camera_id, image_path, detection_data):
+        return True
+
+
+def make_background(width, height, rng):
+    # Gradiente vertical (céu/rua) com textura suave e alguns "prédios"
+    gradient = np.linspace(170, 90, height, dtype=np.float32)[:, None]
+    background = np.repeat(gradient, width, axis=1)
+    texture = cv2.GaussianBlur(rng.normal(0, 12, (height, width)).astype(np.float32), (0, 0), 3)
+    background += texture
+
+    for _ in range(6):
+        x = int(rng.integers(0, width * 0.9))
+        w = int(rng.integers(width // 20, width // 6))
+        h = int(rng.integers(height // 5, height // 2))
+        shade = float(rng.integers(60, 200))
+        background[height - h - height // 4:height - height // 4, x:x + w] = shade
+
+    background = np.clip(background, 0, 255).astype(np.uint8)
+    return cv2.cvtColor(background, cv2.COLOR_GRAY2BGR)
+
+
+def make_frame(background, rng, with_waste, drift, noise_sigma):
+    height, width = background.shape[:2]
+    frame = background.astype(np.float32) + drift
+    frame += rng.normal(0, noise_sigma, frame.shape[:2])[:, :, None]
+
+    if with_waste:
+        # Blobs na parte de baixo da cena (calçada), com 1% a 3% da área do quadro
+        for _ in range(int(rng.integers(1, 4))):
+            area = width * height * float(rng.uniform(0.01, 0.03))
+            axes = (int(np.sqrt(area / np.pi) * 1.3), int(np.sqrt(area / np.pi) / 1.3))
+            center = (int(rng.integers(axes[0], width - axes[0])),
+                      int(rng.integers(height * 3 // 4, height - axes[1])))
+            # Sacos pretos ou entulho claro: sempre com contraste em relação ao fundo
+            base = 25 if rng.random() < 0.5 else 230
+            color = tuple(float(c) for c in np.clip(base + rng.integers(-25, 26, 3), 0, 255))
+            cv2.ellipse(frame, center, axes, float(rng.uniform(0, 180)), 0, 360, color, -1)
+
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def build_scene(folder, width, height, frames, waste_ratio, noise_sigma, seed, static_ratio=0.0):
+    # Grava o fundo como frame_0000.jpg (índice 0, usado por process_camera_images)
+    # e retorna a verdade de campo de cada quadro seguinte. Com static_ratio, parte
+    # dos quadros repete o anterior, como numa rua sem movimento.
+    rng = np.random.default_rng(seed)
+    folder.mkdir(parents=True, exist_ok=True)
+
+    background = make_background(width, height, rng)
+    cv2.imwrite(str(folder / "frame_0000.jpg"), background)
+
+    truth = []
+    for i in range(1, frames + 1):
+        if static_ratio and truth and rng.random() < static_ratio:
+            with_waste = truth[-1][1]
+        else:
+            with_waste = bool(rng.random() < waste_ratio)
+            # Variação lenta de iluminação ao longo do dia
+            drift = 12.0 * np.sin(2 * np.pi * i / max(frames, 1))
+            frame = make_frame(background, rng, with_waste, drift, noise_sigma)
+        path = folder / f"frame_{i:04d}.jpg"
+        cv2.imwrite(str(path), frame)
+        truth.append((str(path), with_waste))
+
+    return truth
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    return float(np.percentile(np.asarray(values), q))
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta em KB, macOS em bytes
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def precision_recall(truth, predictions):
+    tp = sum(1 for t, p in zip(truth, predictions) if t and p)
+    fp = sum(1 for t, p in zip(truth, predictions) if not t and p)
+    fn = sum(1 for t, p in zip(truth, predictions) if t and not p)
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    return precision, recall
+
+
+def bench_detect_waste(detector, scenes):
+    skipped_before = sum(detector.metrics.counter("frames_skipped", camera_id) for camera_id in scenes)
+    latencies = []
+    truth = []
+    predictions = []
+
+    for camera_id, scene_truth in scenes.items():
+        folder = Path(scene_truth[0][0]).parent
+        detector.load_background(camera_id, str(folder / "frame_0000.jpg"))
+
+        for path, with_waste in scene_truth:
+            started = time.perf_counter()
+            has_waste, _, _ = detector.detect_waste(camera_id, path)
+            latencies.append(time.perf_counter() - started)
+            truth.append(with_waste)
+            predictions.append(has_waste)
+
+    total = sum(latencies)
+    precision, recall = precision_recall(truth, predictions)
+    skipped = sum(detector.metrics.counter("frames_skipped", camera_id) for camera_id in scenes) - skipped_before
+    return {
+        "frames": len(latencies),
+        "skipped": skipped,
+        "fps": len(latencies) / total if total else None,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "precision": precision,
+        "recall": recall,
+    }
+
+
+def bench_process_camera_images(detector, scenes):
+    frames = 0
+    started = time.perf_counter()
+    # Os alertas impressos no terminal não entram no resultado
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for camera_id, scene_truth in scenes.items():
+            folder = Path(scene_truth[0][0]).parent
+            detector.process_camera_images(camera_id, str(folder))
+            frames += len(scene_truth)
+    elapsed = time.perf_counter() - started
+
+    # Remover as imagens anotadas para não contaminar a próxima rodada
+    for scene_truth in scenes.values():
+        for annotated in Path(scene_truth[0][0]).parent.glob("detection_*.jpg"):
+            annotated.unlink()
+
+    return {
+        "frames": frames,
+        "cycle_s": elapsed,
+        "fps": frames / elapsed if elapsed else None,
+    }
+
+
+def run_benchmark(args):
+    work_dir = Path(args.work_dir) if args.work_dir else Path(tempfile.mkdtemp(prefix="waste_bench_"))
+    results = []
+
+    try:
+        for resolution in args.resolutions:
+            width, height = RESOLUTIONS[resolution]
+            for cameras in args.cameras:
+                scenes = {}
+                for c in range(cameras):
+                    camera_id = f"camera_{c + 1:02d}"
+                    folder = work_dir / resolution / f"{cameras}cams" / camera_id
+                    scenes[camera_id] = build_scene(
+                        folder, width, height, args.frames,
+                        args.waste_ratio, args.noise, seed=args.seed + c,
+                        static_ratio=args.static_ratio
+                    )
+
+                for process_width in args.process_widths:
+                    detector = OfflineDetector(
+                        threshold=args.threshold,
+                        process_width=process_width or None,
+                        alert_delay=0,
+                        change_threshold=args.change_threshold
+                    )
+                    logger.info(
+                        f"Cenário {resolution}, {cameras} câmeras, "
+                        f"largura de processamento {process_width or 'original'}"
+                    )
+                    result = {
+                        "resolution": resolution,
+                        "cameras": cameras,
+                        "process_width": process_width or None,
+                        "detect_waste": bench_detect_waste(detector, scenes),
+                        "process_camera_images": bench_process_camera_images(detector, scenes),
+                        "peak_rss_mb": peak_rss_mb(),
+                    }
+                    results.append(result)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "created_at": datetime.now().isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "cpu_count": os.cpu_count(),
+        },
+        "parameters": {
+            "frames": args.frames,
+            "waste_ratio": args.waste_ratio,
+            "noise": args.noise,
+            "threshold": args.threshold,
+            "change_threshold": args.change_threshold,
+            "static_ratio": args.static_ratio,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+
+def scenario_key(result):
+    return (result["resolution"], result["cameras"], result["process_width"])
+
+
+def compare_reports(report, baseline):
+    # Variação percentual em relação ao baseline (positivo = mais rápido / menor latência)
+    baseline_results = {scenario_key(r): r for r in baseline.get("results", [])}
+    lines = []
+    for result in report["results"]:
+        previous = baseline_results.get(scenario_key(result))
+        if not previous:
+            continue
+        current, old = result["detect_waste"], previous["detect_waste"]
+        fps_change = (current["fps"] / old["fps"] - 1) * 100 if old.get("fps") else 0
+        p99_change = (1 - current["p99_ms"] / old["p99_ms"]) * 100 if old.get("p99_ms") else 0
+        lines.append(
+            f"{result['resolution']:>6} {result['cameras']:>2} câmeras "
+            f"pw={result['process_width'] or 'orig':>5}: "
+            f"fps {fps_change:+.1f}%  p99 {p99_change:+.1f}%"
+        )
+    return lines
+
+
+def print_report(report):
+    for r in report["results"]:
+        dw, pc = r["detect_waste"], r["process_camera_images"]
+        print(
+            f"{r['resolution']:>6} {r['cameras']:>2} câmeras pw={r['process_width'] or 'orig':>5} | "
+            f"detect_waste {dw['fps']:.1f} fps p50 {dw['p50_ms']:.2f} ms p99 {dw['p99_ms']:.2f} ms "
+            f"P {dw['precision']:.2f} R {dw['recall']:.2f} pulados {dw.get('skipped', 0)} | "
+            f"process_camera_images {pc['fps']:.1f} fps | "
+            f"pico RSS {r['peak_rss_mb'] or 0:.0f} MB"
+        )
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Benchmark do detector de descartes ilegais')
+
+    parser.add_argument('--resolutions', nargs='+', default=list(RESOLUTIONS),
+                        choices=list(RESOLUTIONS), help='Resoluções das cenas sintéticas')
+    parser.add_argument('--cameras', nargs='+', type=int, default=[1, 4],
+                        help='Quantidades de câmeras simuladas')
+    parser.add_argument('--process-widths', nargs='+', type=int, default=[0],
+                        help='Larguras de processamento a comparar (0 = resolução original)')
+    parser.add_argument('--frames', type=int, default=30,
+                        help='Quadros por câmera (além do fundo)')
+    parser.add_argument('--waste-ratio', type=float, default=0.3,
+                        help='Fração dos quadros com descarte inserido')
+    parser.add_argument('--noise', type=float, default=4.0,
+                        help='Desvio padrão do ruído do sensor')
+    parser.add_argument('--threshold', type=int, default=1000,
+                        help='Threshold do detector (área mínima em pixels)')
+    parser.add_argument('--change-threshold', type=int, default=8,
+                        help='Threshold do pré-filtro de quadros inalterados (0 = desativado)')
+    parser.add_argument('--static-ratio', type=float, default=0.0,
+                        help='Fração dos quadros que repetem o anterior (câmera parada, cena sem movimento)')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='Semente para geração das cenas')
+    parser.add_argument('--work-dir', type=str, default=None,
+                        help='Pasta para as cenas geradas (padrão: temporária, removida ao final)')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Arquivo JSON de saída com os resultados')
+    parser.add_argument('--compare', type=str, default=None,
+                        help='Arquivo JSON de uma execução anterior para comparação')
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    logging.getLogger('waste_detector').setLevel(logging.WARNING)
+    report = run_benchmark(args)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Resultados salvos em {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print("\nComparação com", args.compare)
+        for line in compare_reports(report, baseline):
+            print(line)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    main()
@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+
+import requests
+
+logger = logging.getLogger('waste_detector.camera_config')
+
+# Valores usados quando nem o backend nem o arquivo local definem o campo
+DEFAULT_CAMERA_CONFIG = {
+    "latitude": -8.0476,  # Centro de Recife
+    "longitude": -34.8770,
+    "threshold": None,  # None = threshold global do detector
+    "roi": None,
+    "process_width": None,  # None = largura global do detector
+    "change_threshold": None,  # None = valor global do pré-filtro; 0 desativa
+    "schedule": None,  # None = sempre ativa
+    "status": "Online",
+}
+
+INACTIVE_STATUSES = ("Manutenção",)
+
+
+class CameraConfigRegistry:
+    # Configuração por câmera (coordenadas, threshold, ROI, resolução de
+    # processamento e horários de funcionamento), carregada de GET /api/cameras
+    # e/ou de um arquivo JSON local, com recarga automática quando mudam.
+    #
+    # Formato do arquivo:
+    # {
+    #   "defaults": {"process_width": 640},
+    #   "cameras": {
+    #     "camera_01": {
+    #       "threshold": 1500,
+    #       "roi": [[[0, 400], [1920, 400], [1920, 1080], [0, 1080]]],
+    #       "schedule": [{"days": [0, 1, 2, 3, 4], "start": "06:00", "end": "22:00"}]
+    #     }
+    #   }
+    # }
+    #
+    # Os valores do arquivo têm precedência sobre os do backend.
+
+    def __init__(self, backend_url=None, config_file=None, refresh_interval=60):
+        self.backend_url = backend_url
+        self.config_file = config_file
+        self.refresh_interval = refresh_interval
+        self._backend_cameras = {}
+        self._file_defaults = {}
+        self._file_cameras = {}
+        self._file_mtime = None
+        self._last_backend_fetch = None
+        self._configs = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, callback):
+        # callback(camera_id, config) é chamado a cada câmera nova ou alterada
+        self._listeners.append(callback)
+
+    def camera_ids(self):
+        with self._lock:
+            return list(self._configs)
+
+    def get(self, camera_id):
+        with self._lock:
+            config = self._configs.get(camera_id)
+            if config is None:
+                # Câmeras sem configuração própria usam os padrões e passam a ser
+                # acompanhadas nas próximas recargas
+                config = self._merge(camera_id)
+                self._configs[camera_id] = config
+            return dict(config)
+
+    def refresh(self, force=False):
+        changed_sources = False
+
+        if self.config_file:
+            changed_sources |= self._load_file(force)
+
+        if self.backend_url:
+            now = time.monotonic()
+            if force or self._last_backend_fetch is None or now - self._last_backend_fetch >= self.refresh_interval:
+                self._last_backend_fetch = now
+                changed_sources |= self._load_backend()
+
+        if changed_sources or force:
+            self._rebuild()
+
+    def _load_file(self, force):
+        try:
+            mtime = os.path.getmtime(self.config_file)
+        except OSError:
+            if self._file_mtime is not None:
+                logger.warning(f"Arquivo de configuração de câmeras não encontrado: {self.config_file}")
+            return False
+
+        if not force and mtime == self._file_mtime:
+            return False
+
+        try:
+            with open(self.config_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            # Mantém a última configuração válida
+            logger.error(f"Erro ao ler configuração de câmeras: {e}")
+            return False
+
+        self._file_mtime = mtime
+        self._file_defaults = data.get("defaults", {})
+        self._file_cameras = data.get("cameras", {})
+        logger.info(f"Configuração de câmeras carregada de {self.config_file}")
+        return True
+
+    def _load_backend(self):
+        try:
+            response = requests.get(f"{self.backend_url}/api/cameras", timeout=5)
+            if response.status_code != 200:
+                logger.error(f"Erro ao obter câmeras do backend: {response.status_code} - {response.text}")
+                return False
+            cameras = response.json()
+        except Exception as e:
+            # Mantém as últimas câmeras obtidas
+            logger.error(f"Erro ao obter câmeras do backend: {str(e)}")
+            return False
+
+        backend_cameras = {}
+        for camera in cameras:
+            coordinates = camera.get("coordinates") or {}
+            entry = {key: camera[key] for key in DEFAULT_CAMERA_CONFIG if camera.get(key) is not None}
+            if "latitude" in coordinates and "longitude" in coordinates:
+                entry["latitude"] = coordinates["latitude"]
+                entry["longitude"] = coordinates["longitude"]
+            backend_cameras[camera["id"]] = entry
+
+        if backend_cameras == self._backend_cameras:
+            return False
+        self._backend_cameras = backend_cameras
+        return True
+
+    def _merge(self, camera_id):
+        config = dict(DEFAULT_CAMERA_CONFIG)
+        config.update(self._file_defaults)
+        config.update(self._backend_cameras.get(camera_id, {}))
+        config.update(self._file_cameras.get(camera_id, {}))
+        return config
+
+    def _rebuild(self):
+        with self._lock:
+            camera_ids = set(self._backend_cameras) | set(self._file_cameras) | set(self._configs)
+            changed = []
+            for camera_id in camera_ids:
+                config = self._merge(camera_id)
+                if self._configs.get(camera_id) != config:
+                    self._configs[camera_id] = config
+                    changed.append((camera_id, dict(config)))
+
+        for camera_id, config in changed:
+            logger.info(f"Configuração da câmera {camera_id} atualizada")
+            for callback in self._listeners:
+                try:
+                    callback(camera_id, config)
+                except Exception as e:
+                    logger.error(f"Erro ao aplicar configuração da câmera {camera_id}: {e}")
+
+    def is_active(self, camera_id, now=None):
+        config = self.get(camera_id)
+        if config.get("status") in INACTIVE_STATUSES:
+            return False
+
+        schedule = config.get("schedule")
+        if not schedule:
+            return True
+
+        now = now or datetime.now()
+        current = now.strftime("%H:%M")
+        for window in schedule:
+            days = window.get("days")
+            if days is not None and now.weekday() not in days:
+                continue
+            start = window.get("start", "00:00")
+            end = window.get("end", "23:59")
+            # Janelas que atravessam a meia-noite (ex.: 22:00 - 06:00)
+            if start <= end:
+                if start <= current <= end:
+                    return True
+            elif current >= start or current <= end:
+                return True
+        return False
@@ -1,109 +1,551 @@
 # Em andamento
 
-import cv2
-import numpy as np
 import os
 import time
-import requests
 import logging
+# OpenCV, NumPy e requests são importados nos métodos que os usam: importar o
+# módulo (run_detector.py --help, configuração das câmeras) não os carrega
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from metrics import DetectorMetrics
 from datetime import datetime
 from pathlib import Path
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger('waste_detector')
 
+# Largura da miniatura usada no pré-filtro de quadros inalterados. Em 1080p cada
+# pixel da miniatura cobre ~30x30 pixels originais, a ordem de grandeza do
+# threshold padrão, então um descarte novo altera bastante ao menos um deles.
+SIGNATURE_WIDTH = 64
+# Amostras por pixel da miniatura em cada eixo: quadros grandes são subamostrados
+# (a cada N pixels) antes da redução, que custaria mais que a própria detecção
+SIGNATURE_SAMPLES = 6
+
 class WasteDetector:    
-    def __init__(self, backend_url="http://localhost:8000", threshold=1000):
+    def __init__(self, backend_url="http://localhost:8000", threshold=1000, process_width=None, alert_delay=1,
+                 camera_config=None, metrics=None, change_threshold=8, full_check_interval=10,
+                 binary_threshold=30, kernel_size=5, shadow=None):
         self.backend_url = backend_url
         self.threshold = threshold
+        self.alert_delay = alert_delay
+        # Nível de binarização da diferença (0-255) e lado do kernel da morfologia,
+        # em pixels da imagem original
+        self.binary_threshold = binary_threshold
+        self.kernel_size = kernel_size
+        # Configurações avaliadas em modo sombra (ShadowEvaluator), sobre a mesma
+        # diferença calculada para a configuração principal
+        self.shadow = shadow
+        # Pré-filtro: um quadro cuja miniatura difere menos de change_threshold
+        # (maior diferença por pixel, 0-255) da do último quadro analisado sem
+        # descarte é dado como inalterado e não passa pela detecção completa.
+        # A cada full_check_interval quadros pulados, um é analisado de qualquer
+        # forma. None ou 0 desativa o pré-filtro.
+        self.change_threshold = change_threshold
+        self.full_check_interval = full_check_interval
+        self.change_thresholds = {}
+        self.signatures = {}  # Câmera -> (miniatura, área) do último quadro analisado sem descarte
+        self.skipped = {}  # Câmera -> quadros pulados desde a última análise completa
+        # Largura de processamento (None = resolução original). As áreas são
+        # sempre reportadas em pixels da imagem original.
+        self.process_width = process_width
         self.background_images = {}  # Dicionário para armazenar imagens de fundo por câmera
+        self.scales = {}  # Fator de escala (processamento / original) por câmera
+        self.rois = {}  # Polígonos de ROI por câmera, em coordenadas da imagem original
+        self.roi_masks = {}  # Máscaras de ROI na resolução de processamento
+        # Sobrescritas por câmera vindas do CameraConfigRegistry
+        self.thresholds = {}
+        self.process_widths = {}
+        self._configured = set()
+        self.camera_config = camera_config
+        # Tempos por etapa e por câmera (imread, cvtColor, absdiff, morphology, ...)
+        self.metrics = metrics if metrics is not None else DetectorMetrics()
+        if camera_config is not None:
+            camera_config.add_listener(self.apply_camera_config)
         logger.info("Detector de descartes ilegais inicializado")
         
+    def apply_camera_config(self, camera_id, config):
+        self._configured.add(camera_id)
+        if config.get("threshold") is not None:
+            self.thresholds[camera_id] = config["threshold"]
+        else:
+            self.thresholds.pop(camera_id, None)
+        if config.get("change_threshold") is not None:
+            self.change_thresholds[camera_id] = config["change_threshold"]
+        else:
+            self.change_thresholds.pop(camera_id, None)
+        # Com threshold, ROI ou resolução novos, o último resultado deixa de valer
+        self.reset_signature(camera_id)
+            
+        process_width = config.get("process_width")
+        if process_width != self.process_widths.get(camera_id):
+            if process_width is not None:
+                self.process_widths[camera_id] = process_width
+            else:
+                self.process_widths.pop(camera_id, None)
+            # O fundo está armazenado na escala antiga; ele será recarregado
+            if self.background_images.pop(camera_id, None) is not None:
+                logger.info(f"Resolução de processamento alterada para câmera {camera_id}, fundo será recarregado")
+                
+        self.set_roi(camera_id, config.get("roi"))
+        
+    def _threshold(self, camera_id):
+        return self.thresholds.get(camera_id, self.threshold)
+        
+    def _change_threshold(self, camera_id):
+        return self.change_thresholds.get(camera_id, self.change_threshold)
+        
+    def reset_signature(self, camera_id):
+        self.signatures.pop(camera_id, None)
+        self.skipped.pop(camera_id, None)
+        
+    def _signature(self, image):
+        import cv2
+
+        height, width = image.shape[:2]
+        size = (SIGNATURE_WIDTH, max(1, int(round(height * SIGNATURE_WIDTH / float(width)))))
+        step = max(1, width // (SIGNATURE_WIDTH * SIGNATURE_SAMPLES))
+        if step > 1:
+            image = image[::step, ::step]
+        return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        
+    def _unchanged(self, camera_id, signature):
+        import cv2
+
+        # True quando o quadro pode ser pulado: o último quadro analisado não tinha
+        # descarte e nenhuma região da miniatura mudou desde então
+        change_threshold = self._change_threshold(camera_id)
+        reference = self.signatures.get(camera_id)
+        if not change_threshold or reference is None or reference[0].shape != signature.shape:
+            return False
+        if self.skipped.get(camera_id, 0) >= self.full_check_interval:
+            return False
+        _, max_change, _, _ = cv2.minMaxLoc(cv2.absdiff(reference[0], signature))
+        if max_change >= change_threshold:
+            return False
+        self.skipped[camera_id] = self.skipped.get(camera_id, 0) + 1
+        self.metrics.inc("frames_skipped", camera_id=camera_id)
+        return True
+        
+    def _remember(self, camera_id, signature, has_waste, total_area):
+        # Só quadros sem descarte servem de referência: com descarte, o próximo
+        # quadro é sempre analisado para gerar a imagem anotada
+        self.skipped.pop(camera_id, None)
+        if has_waste or signature is None:
+            self.signatures.pop(camera_id, None)
+        else:
+            self.signatures[camera_id] = (signature, total_area)
+        
+    def _processing_scale(self, width, camera_id=None):
+        process_width = self.process_widths.get(camera_id, self.process_width)
+        if not process_width or width <= process_width:
+            return 1.0
+        return process_width / float(width)
+        
+    def _resize(self, image, scale):
+        import cv2
+
+        if scale == 1.0:
+            return image
+        height, width = image.shape[:2]
+        size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+        return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        
+    def _read_gray(self, image_path, scale):
+        import cv2
+
+        # Para escalas pequenas, o decodificador JPEG já entrega a imagem reduzida
+        # em escala de cinza, evitando decodificar e converter a resolução completa
+        for factor, flag in ((8, cv2.IMREAD_REDUCED_GRAYSCALE_8),
+                             (4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+                             (2, cv2.IMREAD_REDUCED_GRAYSCALE_2)):
+            if scale * factor <= 1.0:
+                return cv2.imread(image_path, flag)
+        return cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        
+    def set_roi(self, camera_id, polygons):
+        import numpy as np
+
+        # Cada polígono é uma lista de pontos [x, y] na resolução original.
+        # Apenas a área dentro dos polígonos é analisada (ex.: ignorar ruas e céu).
+        if polygons:
+            self.rois[camera_id] = [np.array(p, dtype=np.float32).reshape(-1, 2) for p in polygons]
+        else:
+            self.rois.pop(camera_id, None)
+        self._build_roi_mask(camera_id)
+        
+    def _build_roi_mask(self, camera_id):
+        import cv2
+        import numpy as np
+
+        background = self.background_images.get(camera_id)
+        polygons = self.rois.get(camera_id)
+        if background is None or not polygons:
+            self.roi_masks.pop(camera_id, None)
+            return
+            
+        scale = self.scales.get(camera_id, 1.0)
+        mask = np.zeros(background.shape[:2], dtype=np.uint8)
+        scaled = [np.round(p * scale).astype(np.int32) for p in polygons]
+        cv2.fillPoly(mask, scaled, 255)
+        self.roi_masks[camera_id] = mask
+        
     def load_background(self, camera_id, image_path):
+        import cv2
+
         try:
             background = cv2.imread(image_path)
             if background is None:
                 logger.error(f"Não foi possível carregar a imagem de fundo: {image_path}")
                 return False
                 
-            # Convertemos para escala de cinza para simplificar a detecção
-            background_gray = cv2.cvtColor(background, cv2.COLOR_BGR2GRAY)
-            self.background_images[camera_id] = background_gray
-            logger.info(f"Imagem de fundo carregada para câmera {camera_id}")
-            return True
+            return self.set_background(camera_id, background)
         except Exception as e:
             logger.error(f"Erro ao carregar imagem de fundo: {str(e)}")
             return False
             
+    def set_background(self, camera_id, background):
+        import cv2
+
+        # Câmeras ainda não vistas recebem a configuração padrão do registro
+        if self.camera_config is not None and camera_id not in self._configured:
+            self.apply_camera_config(camera_id, self.camera_config.get(camera_id))
+            
+        # Convertemos para escala de cinza para simplificar a detecção
+        background_gray = cv2.cvtColor(background, cv2.COLOR_BGR2GRAY)
+        scale = self._processing_scale(background_gray.shape[1], camera_id)
+        self.scales[camera_id] = scale
+        self.background_images[camera_id] = self._resize(background_gray, scale)
+        self._build_roi_mask(camera_id)
+        self.reset_signature(camera_id)
+        logger.info(f"Imagem de fundo carregada para câmera {camera_id}")
+        return True
+            
+    def _difference(self, camera_id, current_gray):
+        import cv2
+
+        background = self.background_images[camera_id]
+        
+        # Ajustar para a resolução de processamento
+        if current_gray.shape != background.shape:
+            current_gray = cv2.resize(
+                current_gray,
+                (background.shape[1], background.shape[0]),
+                interpolation=cv2.INTER_AREA
+            )
+        
+        # Calcular a diferença absoluta entre as imagens
+        return cv2.absdiff(background, current_gray)
+        
+    def _segment(self, camera_id, diff, binary_threshold, kernel_size, timed=True):
+        import cv2
+
+        # Contornos e área alterada a partir da diferença; sem timed, as etapas não
+        # entram nas métricas (modo sombra, medido como um todo)
+        scale = self.scales.get(camera_id, 1.0)
+        stage = (lambda name: self.metrics.time(camera_id, name)) if timed else (lambda name: nullcontext())
+        
+        with stage("threshold"):
+            # Aplicar um threshold para binarizar a imagem de diferença
+            _, thresh = cv2.threshold(diff, binary_threshold, 255, cv2.THRESH_BINARY)
+            
+            # Descartar tudo que estiver fora da ROI da câmera
+            roi_mask = self.roi_masks.get(camera_id)
+            if roi_mask is not None:
+                thresh = cv2.bitwise_and(thresh, roi_mask)
+        
+        with stage("morphology"):
+            thresh = self._morphology(thresh, kernel_size, scale)
+        
+        with stage("findContours"):
+            # Encontrar contornos na imagem binarizada
+            contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        
+        # Calcular a área total dos contornos, em pixels da imagem original
+        total_area = sum(cv2.contourArea(c) for c in contours) / (scale * scale)
+        
+        return contours, total_area
+        
+    def _morphology(self, thresh, kernel_size, scale):
+        import cv2
+        import numpy as np
+
+        # Aplicar operações morfológicas para reduzir ruído
+        # (o kernel acompanha a escala para manter o mesmo efeito em pixels originais)
+        scaled_kernel = max(1, int(round(kernel_size * scale)))
+        kernel = np.ones((scaled_kernel, scaled_kernel), np.uint8)
+        thresh = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel)
+        return cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
+        
+    def _find_contours(self, camera_id, current_gray):
+        with self.metrics.time(camera_id, "absdiff"):
+            diff = self._difference(camera_id, current_gray)
+        contours, total_area = self._segment(camera_id, diff, self.binary_threshold, self.kernel_size)
+        return contours, total_area, diff
+        
+    def _evaluate_shadows(self, camera_id, diff, frame_ref, has_waste, total_area):
+        # Só a configuração principal gera alertas; as demais são apenas registradas
+        if self.shadow is None:
+            return
+        # Configurações que só mudam o threshold reaproveitam a área já calculada
+        areas = {(self.binary_threshold, self.kernel_size): total_area}
+        results = {}
+        for config in self.shadow.configs:
+            started = time.perf_counter()
+            key = (config.get("binary_threshold", self.binary_threshold), config.get("kernel_size", self.kernel_size))
+            if key not in areas:
+                areas[key] = self._segment(camera_id, diff, *key, timed=False)[1]
+            area = areas[key]
+            seconds = time.perf_counter() - started
+            self.metrics.observe(camera_id, f"shadow:{config['name']}", seconds)
+            threshold = config.get("threshold", self._threshold(camera_id))
+            results[config["name"]] = (area > threshold, area, seconds)
+        self.shadow.record(camera_id, frame_ref, has_waste, total_area, results)
+        
+    def _annotate(self, camera_id, image, contours):
+        import cv2
+        import numpy as np
+
+        scale = self.scales.get(camera_id, 1.0)
+        if scale != 1.0:
+            contours = [np.round(c / scale).astype(np.int32) for c in contours]
+        cv2.drawContours(image, contours, -1, (0, 0, 255), 2)
+        return image
+            
     def detect_waste(self, camera_id, current_image_path):
+        import cv2
+
         # Verificar se temos uma imagem de fundo para esta câmera
         if camera_id not in self.background_images:
             logger.error(f"Imagem de fundo não encontrada para câmera {camera_id}")
             return False, None, 0
             
         try:
-            # Carregar a imagem atual
-            current_image = cv2.imread(current_image_path)
-            if current_image is None:
+            scale = self.scales.get(camera_id, 1.0)
+            current_gray = None
+            signature = None
+            if self._change_threshold(camera_id):
+                # Decodificação reduzida (1/8) só para a miniatura; se a escala de
+                # processamento for a mesma, a imagem é reaproveitada
+                with self.metrics.time(camera_id, "prefilter"):
+                    preview = cv2.imread(current_image_path, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+                    if preview is not None:
+                        signature = self._signature(preview)
+                        if self._unchanged(camera_id, signature):
+                            return False, None, self.signatures[camera_id][1]
+                        if scale * 8 <= 1.0:
+                            current_gray = preview
+            
+            # Carregar a imagem atual já em escala de cinza
+            if current_gray is None:
+                with self.metrics.time(camera_id, "imread"):
+                    current_gray = self._read_gray(current_image_path, scale)
+            if current_gray is None:
                 logger.error(f"Não foi possível carregar a imagem atual: {current_image_path}")
                 return False, None, 0
                 
-            # Converter para escala de cinza
-            current_gray = cv2.cvtColor(current_image, cv2.COLOR_BGR2GRAY)
+            contours, total_area, diff = self._find_contours(camera_id, current_gray)
             
-            # Calcular a diferença absoluta entre as imagens
-            diff = cv2.absdiff(self.background_images[camera_id], current_gray)
+            # Verificar se a área é maior que o threshold
+            has_waste = total_area > self._threshold(camera_id)
+            self.metrics.inc("frames_analyzed", camera_id=camera_id)
+            self._remember(camera_id, signature, has_waste, total_area)
+            self._evaluate_shadows(camera_id, diff, os.path.basename(current_image_path), has_waste, total_area)
             
-            # Aplicar um threshold para binarizar a imagem de diferença
-            _, thresh = cv2.threshold(diff, 30, 255, cv2.THRESH_BINARY)
+            if not has_waste:
+                return False, None, total_area
+            
+            # Carregar a imagem colorida e desenhar os contornos apenas quando há detecção
+            with self.metrics.time(camera_id, "imread"):
+                current_image = cv2.imread(current_image_path)
+            if current_image is None:
+                logger.error(f"Não foi possível carregar a imagem atual: {current_image_path}")
+                return False, None, 0
+            image_with_detection = self._annotate(camera_id, current_image, contours)
             
-            # Aplicar operações morfológicas para reduzir ruído
-            kernel = np.ones((5, 5), np.uint8)
-            thresh = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel)
-            thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
+            logger.info(f"Possível descarte detectado na câmera {camera_id}. Área total: {total_area}")
             
-            # Encontrar contornos na imagem binarizada
-            contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            return has_waste, image_with_detection, total_area
+        except Exception as e:
+            logger.error(f"Erro na detecção: {str(e)}")
+            return False, None, 0
             
-            # Calcular a área total dos contornos
-            total_area = sum(cv2.contourArea(c) for c in contours)
+    def detect_waste_frame(self, camera_id, frame, frame_ref=None):
+        import cv2
+
+        # Mesma detecção de detect_waste, para quadros já decodificados (vídeo/RTSP);
+        # frame_ref identifica o quadro no registro do modo sombra
+        if camera_id not in self.background_images:
+            logger.error(f"Imagem de fundo não encontrada para câmera {camera_id}")
+            return False, None, 0
             
-            # Verificar se a área é maior que o threshold
-            has_waste = total_area > self.threshold
+        try:
+            signature = None
+            if self._change_threshold(camera_id):
+                with self.metrics.time(camera_id, "prefilter"):
+                    signature = cv2.cvtColor(self._signature(frame), cv2.COLOR_BGR2GRAY)
+                    if self._unchanged(camera_id, signature):
+                        return False, None, self.signatures[camera_id][1]
             
-            # Se houver detecção, desenhar os contornos na imagem original
-            image_with_detection = current_image.copy()
-            cv2.drawContours(image_with_detection, contours, -1, (0, 0, 255), 2)
+            scale = self.scales.get(camera_id, 1.0)
+            with self.metrics.time(camera_id, "cvtColor"):
+                current_gray = cv2.cvtColor(self._resize(frame, scale), cv2.COLOR_BGR2GRAY)
             
-            if has_waste:
-                logger.info(f"Possível descarte detectado na câmera {camera_id}. Área total: {total_area}")
+            contours, total_area, diff = self._find_contours(camera_id, current_gray)
+            
+            has_waste = total_area > self._threshold(camera_id)
+            self.metrics.inc("frames_analyzed", camera_id=camera_id)
+            self._remember(camera_id, signature, has_waste, total_area)
+            self._evaluate_shadows(camera_id, diff, frame_ref, has_waste, total_area)
+            
+            if not has_waste:
+                return False, None, total_area
+            
+            image_with_detection = self._annotate(camera_id, frame.copy(), contours)
+            
+            logger.info(f"Possível descarte detectado na câmera {camera_id}. Área total: {total_area}")
             
             return has_waste, image_with_detection, total_area
         except Exception as e:
             logger.error(f"Erro na detecção: {str(e)}")
             return False, None, 0
             
+    def _read_batch_frame(self, image_path, scale, out):
+        import cv2
+
+        # Decodifica a imagem diretamente na posição correspondente do lote
+        gray = self._read_gray(image_path, scale)
+        if gray is None:
+            return False
+        if gray.shape != out.shape:
+            cv2.resize(gray, (out.shape[1], out.shape[0]), dst=out, interpolation=cv2.INTER_AREA)
+        else:
+            out[:] = gray
+        return True
+        
+    def detect_waste_batch(self, camera_id, image_paths, max_workers=4, chunk_size=32):
+        import cv2
+        import numpy as np
+
+        # Detecção em lote para reprocessamento e recuperação após quedas.
+        # As imagens são decodificadas em paralelo e empilhadas em um array NumPy;
+        # a diferença e a binarização em relação ao fundo são calculadas para o lote
+        # inteiro de uma vez, e a morfologia é aplicada a cada quadro (recortes do
+        # mesmo array, sem cópia). Os contornos só são extraídos dos quadros cuja
+        # máscara pode ultrapassar o threshold: a área dos contornos externos nunca
+        # excede a do retângulo que envolve os pixels alterados, então o resultado
+        # (has_waste) é o mesmo de detect_waste. Para os demais, a área retornada é
+        # a dos pixels alterados após a morfologia, e contam como frames_skipped.
+        # Retorna uma lista de (caminho, has_waste, imagem_anotada, área), na ordem
+        # de entrada. O lote não passa pelo modo sombra nem atualiza a miniatura
+        # de referência do pré-filtro de quadros inalterados.
+        paths = [str(p) for p in image_paths]
+        
+        if camera_id not in self.background_images:
+            logger.error(f"Imagem de fundo não encontrada para câmera {camera_id}")
+            return [(path, False, None, 0) for path in paths]
+        if not paths:
+            return []
+            
+        background = self.background_images[camera_id]
+        height, width = background.shape
+        scale = self.scales.get(camera_id, 1.0)
+        roi_mask = self.roi_masks.get(camera_id)
+        area_factor = 1.0 / (scale * scale)
+        threshold = self._threshold(camera_id)
+        
+        # O lote é tratado como uma única imagem (N*H, W), comparada ao fundo repetido N vezes
+        batch_size = min(chunk_size, len(paths))
+        stack = np.empty((batch_size, height, width), dtype=np.uint8)
+        tiled_background = np.tile(background, (batch_size, 1))
+        tiled_mask = np.tile(roi_mask, (batch_size, 1)) if roi_mask is not None else None
+        
+        results = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for start in range(0, len(paths), batch_size):
+                chunk = paths[start:start + batch_size]
+                count = len(chunk)
+                with self.metrics.time(camera_id, "imread"):
+                    loaded = list(executor.map(
+                        lambda j: self._read_batch_frame(chunk[j], scale, stack[j]),
+                        range(count)
+                    ))
+                
+                rows = count * height
+                with self.metrics.time(camera_id, "absdiff"):
+                    diff = cv2.absdiff(stack[:count].reshape(rows, width), tiled_background[:rows])
+                with self.metrics.time(camera_id, "threshold"):
+                    _, changed = cv2.threshold(diff, self.binary_threshold, 255, cv2.THRESH_BINARY)
+                    if tiled_mask is not None:
+                        changed = cv2.bitwise_and(changed, tiled_mask[:rows])
+                
+                for j, path in enumerate(chunk):
+                    if not loaded[j]:
+                        logger.error(f"Não foi possível carregar a imagem atual: {path}")
+                        results.append((path, False, None, 0))
+                        continue
+                    
+                    # Por quadro: no lote, o kernel alcançaria as linhas do quadro vizinho
+                    with self.metrics.time(camera_id, "morphology"):
+                        mask = self._morphology(changed[j * height:(j + 1) * height], self.kernel_size, scale)
+                    
+                    _, _, box_width, box_height = cv2.boundingRect(mask)
+                    if box_width * box_height * area_factor <= threshold:
+                        self.metrics.inc("frames_skipped", camera_id=camera_id)
+                        results.append((path, False, None, cv2.countNonZero(mask) * area_factor))
+                        continue
+                    
+                    self.metrics.inc("frames_analyzed", camera_id=camera_id)
+                    results.append((path,) + self._detect_candidate(camera_id, path, mask))
+                
+        return results
+        
+    def _detect_candidate(self, camera_id, image_path, mask):
+        import cv2
+
+        try:
+            with self.metrics.time(camera_id, "findContours"):
+                contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            scale = self.scales.get(camera_id, 1.0)
+            total_area = sum(cv2.contourArea(c) for c in contours) / (scale * scale)
+            if total_area <= self._threshold(camera_id):
+                return False, None, total_area
+                
+            with self.metrics.time(camera_id, "imread"):
+                current_image = cv2.imread(image_path)
+            if current_image is None:
+                logger.error(f"Não foi possível carregar a imagem atual: {image_path}")
+                return False, None, 0
+            image_with_detection = self._annotate(camera_id, current_image, contours)
+            
+            logger.info(f"Possível descarte detectado na câmera {camera_id}. Área total: {total_area}")
+            
+            return True, image_with_detection, total_area
+        except Exception as e:
+            logger.error(f"Erro na detecção: {str(e)}")
+            return False, None, 0
+            
     def notify_backend(self, camera_id, image_path, detection_data):
+        import requests
+
         try:
             # Preparar metadados para envio
             timestamp = datetime.now().isoformat()
             
-            # Estes dados seriam obtidos de uma configuração real,
-            # mas para a POC usamos valores fixos
-            latitude = -8.0476  # Coordenadas de exemplo para Recife
-            longitude = -34.8770
+            # Coordenadas da câmera, vindas da configuração por câmera quando disponível
+            if self.camera_config is not None:
+                camera = self.camera_config.get(camera_id)
+                latitude = camera["latitude"]
+                longitude = camera["longitude"]
+            else:
+                latitude = -8.0476  # Coordenadas de exemplo para Recife
+                longitude = -34.8770
             
             # Criar payload para o backend
             payload = {
                 "camera_id": camera_id,
                 "timestamp": timestamp,
-                "coordinates": {
-                    "latitude": latitude,
-                    "longitude": longitude
-                },
+                "latitude": latitude,
+                "longitude": longitude,
                 "detection_area": detection_data,
                 "waste_type": "Desconhecido"  # Em uma versão avançada, usaríamos classificação
             }
@@ -132,7 +574,27 @@ class WasteDetector:
             logger.error(f"Erro ao notificar backend: {str(e)}")
             return False
             
+    def send_heartbeat(self, camera_ids):
+        import requests
+
+        # Sinal de vida das câmeras que estão entregando quadros, em uma única
+        # requisição; o backend marca como Offline as que ficam em silêncio
+        try:
+            response = requests.post(
+                f"{self.backend_url}/api/cameras/heartbeat",
+                json={"camera_ids": list(camera_ids)},
+                timeout=5
+            )
+            if response.status_code in (200, 202):
+                return True
+            logger.warning(f"Erro ao enviar heartbeat: {response.status_code} - {response.text}")
+        except Exception as e:
+            logger.warning(f"Erro ao enviar heartbeat: {str(e)}")
+        return False
+            
     def process_camera_images(self, camera_id, images_folder, background_index=0):
+        import cv2
+
         folder_path = Path(images_folder)
         image_files = sorted([f for f in folder_path.glob("*.jpg") or folder_path.glob("*.png")])
         
@@ -159,11 +621,15 @@ class WasteDetector:
             if has_waste:
                 # Salvar a imagem com os contornos para referência
                 detection_path = folder_path / f"detection_{i}.jpg"
-                cv2.imwrite(str(detection_path), image_with_detection)
+                with self.metrics.time(camera_id, "encode"):
+                    cv2.imwrite(str(detection_path), image_with_detection)
                 
                 # Notificar o backend
-                if self.notify_backend(camera_id, str(detection_path), area):
+                with self.metrics.time(camera_id, "upload"):
+                    notified = self.notify_backend(camera_id, str(detection_path), area)
+                if notified:
                     detections_count += 1
+                    self.metrics.inc("detections_reported", camera_id=camera_id)
                     
                 # Simular um alerta local para o POC
                 print(f"\nALERTA: Possível descarte ilegal detectado na câmera {camera_id}!")
@@ -171,13 +637,18 @@ class WasteDetector:
                 print(f"Área de detecção: {area} pixels\n")
                 
                 # Um pequeno delay para visualização do alerta no terminal
-                time.sleep(1)
+                if self.alert_delay:
+                    time.sleep(self.alert_delay)
                 
         return detections_count
 
 
 # Exemplo de uso (para teste)
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
     detector = WasteDetector()
     
     # Neste exemplo, processaríamos imagens de uma pasta de amostra
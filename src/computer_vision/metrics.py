@@ -0,0 +1,208 @@
+import io
+import json
+import time
+import pstats
+import logging
+import cProfile
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger('waste_detector.metrics')
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(q / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class DetectorMetrics:
+    # Tempos por etapa e por câmera, mantidos em janelas deslizantes
+    # (últimas `window` medições), além de contadores gerais do detector.
+
+    def __init__(self, window=1024):
+        self.window = window
+        self.started_at = time.time()
+        self._samples = {}  # (camera_id, etapa) -> deque de durações em segundos
+        self._totals = {}  # (camera_id, etapa) -> [contagem, soma]
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, camera_id, stage, seconds):
+        key = (camera_id, stage)
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = deque(maxlen=self.window)
+                self._samples[key] = samples
+                self._totals[key] = [0, 0.0]
+            samples.append(seconds)
+            totals = self._totals[key]
+            totals[0] += 1
+            totals[1] += seconds
+
+    @contextmanager
+    def time(self, camera_id, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(camera_id, stage, time.perf_counter() - started)
+
+    def inc(self, name, amount=1, camera_id=None):
+        key = (name, camera_id)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def counter(self, name, camera_id=None):
+        return self._counters.get((name, camera_id), 0)
+
+    def snapshot(self):
+        with self._lock:
+            samples = {key: sorted(values) for key, values in self._samples.items()}
+            totals = {key: list(values) for key, values in self._totals.items()}
+            counters = dict(self._counters)
+
+        cameras = {}
+        for (camera_id, stage), values in samples.items():
+            count, total = totals[(camera_id, stage)]
+            camera = cameras.setdefault(camera_id, {"total_s": 0.0, "stages": {}})
+            camera["total_s"] += total
+            camera["stages"][stage] = {
+                "count": count,
+                "total_s": total,
+                "window": len(values),
+                "mean_ms": sum(values) / len(values) * 1000 if values else None,
+                "p50_ms": _percentile(values, 50) * 1000,
+                "p95_ms": _percentile(values, 95) * 1000,
+                "p99_ms": _percentile(values, 99) * 1000,
+                "max_ms": values[-1] * 1000,
+            }
+
+        for camera_id, camera in cameras.items():
+            # Fração dos quadros descartados pelo pré-filtro de quadros inalterados
+            if "prefilter" in camera["stages"]:
+                skipped = counters.get(("frames_skipped", camera_id), 0)
+                analyzed = counters.get(("frames_analyzed", camera_id), 0)
+                camera["skip_rate"] = skipped / (skipped + analyzed) if skipped + analyzed else 0.0
+
+        return {
+            "uptime_s": time.time() - self.started_at,
+            "cameras": cameras,
+            "counters": [
+                {"name": name, "camera_id": camera_id, "value": value}
+                for (name, camera_id), value in sorted(counters.items(), key=lambda i: (i[0][0], str(i[0][1])))
+            ],
+        }
+
+
+class CycleProfiler:
+    # Perfilador por amostragem de ciclos: quando ativado, executa cProfile
+    # durante os próximos N ciclos e grava um .pstats e um resumo em texto.
+
+    def __init__(self, output_dir="profiles", top=40):
+        self.output_dir = Path(output_dir)
+        self.top = top
+        self._remaining = 0
+        self._profile = None
+        self._lock = threading.Lock()
+        self.last_report = None
+
+    def request(self, cycles):
+        with self._lock:
+            self._remaining = max(0, int(cycles))
+        logger.info(f"Perfilamento solicitado para {cycles} ciclos")
+
+    @property
+    def active(self):
+        return self._profile is not None or self._remaining > 0
+
+    def start_cycle(self):
+        with self._lock:
+            if self._remaining <= 0:
+                return
+            if self._profile is None:
+                self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def end_cycle(self):
+        if self._profile is None:
+            return
+        self._profile.disable()
+        with self._lock:
+            self._remaining -= 1
+            finished = self._remaining <= 0
+        if finished:
+            self._dump()
+
+    def _dump(self):
+        profile, self._profile = self._profile, None
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        stats_path = self.output_dir / f"detector_{stamp}.pstats"
+        profile.dump_stats(str(stats_path))
+
+        summary = io.StringIO()
+        pstats.Stats(profile, stream=summary).sort_stats("cumulative").print_stats(self.top)
+        text_path = stats_path.with_suffix(".txt")
+        text_path.write_text(summary.getvalue(), encoding="utf-8")
+
+        self.last_report = str(stats_path)
+        logger.info(f"Perfil gravado em {stats_path}")
+
+
+class MetricsServer:
+    # Servidor HTTP local (thread própria) com:
+    #   GET /metrics            -> JSON com tempos por câmera/etapa e contadores
+    #   GET /profile?cycles=N   -> ativa o perfilador para os próximos N ciclos
+
+    def __init__(self, metrics, profiler=None, host="127.0.0.1", port=9100):
+        self.metrics = metrics
+        self.profiler = profiler
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        metrics = self.metrics
+        profiler = self.profiler
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/metrics":
+                    self._send(200, metrics.snapshot())
+                elif url.path == "/profile" and profiler is not None:
+                    cycles = int(parse_qs(url.query).get("cycles", ["1"])[0])
+                    profiler.request(cycles)
+                    self._send(200, {"profiling_cycles": cycles, "last_report": profiler.last_report})
+                else:
+                    self._send(404, {"error": "não encontrado"})
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+        logger.info(f"Métricas do detector disponíveis em http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
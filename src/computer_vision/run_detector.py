@@ -6,8 +6,10 @@ import os
 import time
 import argparse
 import logging
+from datetime import datetime
 from pathlib import Path
-from detector import WasteDetector
+# Os módulos do detector (e com eles OpenCV, NumPy e requests) são importados
+# depois da leitura dos argumentos: --help e erros de argumento respondem sem eles
 
 # Configurxação de logging
 logging.basicConfig(
@@ -40,6 +42,72 @@ def parse_arguments():
         help='Threshold para detecção (área mínima em pixels)'
     )
     
+    parser.add_argument(
+        '--process-width',
+        type=int,
+        default=None,
+        help='Largura (em pixels) usada no processamento; as imagens maiores são reduzidas'
+    )
+    
+    parser.add_argument(
+        '--change-threshold',
+        type=int,
+        default=8,
+        help='Diferença mínima (0-255) na miniatura do quadro para que ele seja analisado; '
+             'quadros sem mudança em relação ao último analisado são pulados (0 = analisar todos)'
+    )
+    
+    parser.add_argument(
+        '--full-check-interval',
+        type=int,
+        default=10,
+        help='Após N quadros pulados pelo pré-filtro, o próximo é analisado de qualquer forma'
+    )
+    
+    parser.add_argument(
+        '--shadow-config',
+        type=str,
+        default=None,
+        help='Arquivo JSON com configurações avaliadas em modo sombra (threshold, binary_threshold, '
+             'kernel_size) sobre os mesmos quadros; só a configuração principal envia ao backend'
+    )
+    
+    parser.add_argument(
+        '--shadow-output',
+        type=str,
+        default='../data/shadow',
+        help='Pasta onde o modo sombra grava summary.json e frames.jsonl'
+    )
+    
+    parser.add_argument(
+        '--camera-config',
+        type=str,
+        default=None,
+        help='Arquivo JSON com a configuração por câmera (coordenadas, threshold, ROI, '
+             'process_width, schedule); recarregado automaticamente quando alterado'
+    )
+    
+    parser.add_argument(
+        '--config-refresh',
+        type=int,
+        default=60,
+        help='Intervalo (em segundos) para recarregar as câmeras do backend (GET /api/cameras)'
+    )
+    
+    parser.add_argument(
+        '--no-backend-config',
+        action='store_true',
+        help='Não buscar a configuração das câmeras no backend'
+    )
+    
+    parser.add_argument(
+        '--heartbeat-interval',
+        type=float,
+        default=30,
+        help='Intervalo (em segundos) entre os heartbeats das câmeras que estão entregando quadros '
+             '(0 desativa); deve ser menor que CAMERA_OFFLINE_AFTER no backend'
+    )
+    
     parser.add_argument(
         '--interval',
         type=int,
@@ -47,19 +115,227 @@ def parse_arguments():
         help='Intervalo (em segundos) entre cada ciclo de detecção'
     )
     
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Modo contínuo: analisa sempre o quadro mais recente de cada câmera'
+    )
+    
+    parser.add_argument(
+        '--source',
+        action='append',
+        default=[],
+        metavar='CAMERA_ID=URI',
+        help='Fonte de uma câmera (pasta, arquivo de vídeo ou URL RTSP/HTTP). Pode ser repetido'
+    )
+    
+    parser.add_argument(
+        '--sample-fps',
+        type=float,
+        default=1.0,
+        help='Quadros analisados por segundo em cada câmera no modo contínuo'
+    )
+    
+    parser.add_argument(
+        '--loop',
+        action='store_true',
+        help='Reiniciar arquivos de vídeo ao chegar ao fim (para testes offline)'
+    )
+    
+    parser.add_argument(
+        '--output-folder',
+        type=str,
+        default='../data/stream_detections',
+        help='Pasta onde são salvas as imagens anotadas do modo contínuo'
+    )
+    
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        default=None,
+        help='Porta do endpoint HTTP local de métricas (/metrics) e perfilamento (/profile?cycles=N)'
+    )
+    
+    parser.add_argument(
+        '--metrics-host',
+        type=str,
+        default='127.0.0.1',
+        help='Endereço do endpoint de métricas (padrão: 127.0.0.1)'
+    )
+    
+    parser.add_argument(
+        '--profile-cycles',
+        type=int,
+        default=0,
+        help='Executar cProfile nos primeiros N ciclos e gravar o resultado em --profile-dir'
+    )
+    
+    parser.add_argument(
+        '--profile-dir',
+        type=str,
+        default='profiles',
+        help='Pasta onde são gravados os arquivos .pstats do perfilamento'
+    )
+    
     return parser.parse_args()
 
+def build_sources(args, cameras_folder):
+    from sources import open_source
+    
+    sources = {}
+    
+    if cameras_folder.exists():
+        for camera_folder in cameras_folder.iterdir():
+            if camera_folder.is_dir():
+                sources[camera_folder.name] = str(camera_folder)
+    
+    for entry in args.source:
+        camera_id, sep, uri = entry.partition("=")
+        if not sep or not camera_id or not uri:
+            logger.error(f"Fonte inválida (use CAMERA_ID=URI): {entry}")
+            continue
+        sources[camera_id] = uri
+    
+    sample_interval = 1.0 / args.sample_fps if args.sample_fps > 0 else 0
+    return {
+        camera_id: open_source(camera_id, uri, sample_interval=sample_interval, loop=args.loop)
+        for camera_id, uri in sources.items()
+    }
+
+def run_streams(detector, args, cameras_folder, profiler):
+    import cv2
+    
+    sources = build_sources(args, cameras_folder)
+    if not sources:
+        logger.error("Nenhuma fonte de câmera configurada")
+        return
+        
+    output_folder = Path(args.output_folder)
+    output_folder.mkdir(parents=True, exist_ok=True)
+    
+    for source in sources.values():
+        source.start()
+    logger.info(f"Modo contínuo iniciado com {len(sources)} câmeras")
+    
+    camera_config = detector.camera_config
+    period = 1.0 / args.sample_fps if args.sample_fps > 0 else 0
+    frames_reported = {}  # camera_id -> frames_read no último heartbeat
+    next_heartbeat = time.monotonic()
+    try:
+        while any(source.is_alive() for source in sources.values()):
+            cycle_start = time.monotonic()
+            profiler.start_cycle()
+            camera_config.refresh()
+            
+            # Heartbeat apenas das câmeras que leram quadros desde o anterior
+            if args.heartbeat_interval > 0 and cycle_start >= next_heartbeat:
+                next_heartbeat = cycle_start + args.heartbeat_interval
+                alive = [
+                    camera_id for camera_id, source in sources.items()
+                    if source.frames_read > frames_reported.get(camera_id, 0)
+                ]
+                frames_reported = {camera_id: source.frames_read for camera_id, source in sources.items()}
+                if alive:
+                    detector.send_heartbeat(alive)
+            
+            for camera_id, source in sources.items():
+                seq, frame = source.latest()
+                if frame is None or not camera_config.is_active(camera_id):
+                    continue
+                    
+                # O primeiro quadro de cada câmera é usado como imagem de fundo
+                if camera_id not in detector.background_images:
+                    detector.set_background(camera_id, frame)
+                    continue
+                    
+                has_waste, image_with_detection, area = detector.detect_waste_frame(camera_id, frame, seq)
+                if not has_waste:
+                    continue
+                    
+                detection_path = output_folder / f"{camera_id}_{seq}.jpg"
+                with detector.metrics.time(camera_id, "encode"):
+                    cv2.imwrite(str(detection_path), image_with_detection)
+                with detector.metrics.time(camera_id, "upload"):
+                    if detector.notify_backend(camera_id, str(detection_path), area):
+                        detector.metrics.inc("detections_reported", camera_id=camera_id)
+                print(f"\nALERTA: Possível descarte ilegal detectado na câmera {camera_id}!")
+                print(f"Timestamp: {datetime.now().isoformat()}")
+                print(f"Área de detecção: {area} pixels\n")
+            
+            profiler.end_cycle()
+            
+            # Como cada fonte guarda só o último quadro, a análise nunca acumula atraso
+            elapsed = time.monotonic() - cycle_start
+            if period and elapsed > period:
+                detector.metrics.inc("cycle_overruns")
+            if elapsed < period:
+                time.sleep(period - elapsed)
+    finally:
+        for camera_id, source in sources.items():
+            source.stop()
+            logger.info(
+                f"Câmera {camera_id}: {source.frames_read} quadros lidos, "
+                f"{source.frames_dropped} descartados, {source.frames_skipped} pulados, "
+                f"{detector.metrics.counter('frames_skipped', camera_id)} inalterados"
+            )
+
 def main():
     args = parse_arguments()
     
+    from detector import WasteDetector
+    from camera_config import CameraConfigRegistry
+    from shadow import ShadowEvaluator, load_shadow_configs
+    from metrics import DetectorMetrics, CycleProfiler, MetricsServer
+    
+    # Configuração por câmera (backend e/ou arquivo local)
+    camera_config = CameraConfigRegistry(
+        backend_url=None if args.no_backend_config else args.backend_url,
+        config_file=args.camera_config,
+        refresh_interval=args.config_refresh
+    )
+    
+    # Métricas por etapa/câmera e perfilamento opcional
+    detector_metrics = DetectorMetrics()
+    profiler = CycleProfiler(output_dir=args.profile_dir)
+    if args.profile_cycles:
+        profiler.request(args.profile_cycles)
+    
+    metrics_server = None
+    if args.metrics_port:
+        metrics_server = MetricsServer(detector_metrics, profiler, host=args.metrics_host, port=args.metrics_port)
+        metrics_server.start()
+    
+    # Configurações avaliadas em modo sombra, sobre a mesma decodificação
+    shadow = None
+    if args.shadow_config:
+        shadow = ShadowEvaluator(load_shadow_configs(args.shadow_config), args.shadow_output)
+    
     # Criar o detector
     detector = WasteDetector(
         backend_url=args.backend_url,
-        threshold=args.threshold
+        threshold=args.threshold,
+        process_width=args.process_width,
+        camera_config=camera_config,
+        metrics=detector_metrics,
+        change_threshold=args.change_threshold,
+        full_check_interval=args.full_check_interval,
+        shadow=shadow
     )
+    camera_config.refresh(force=True)
     
-    # Verificar se a pasta de câmeras existe
     cameras_folder = Path(args.cameras_folder)
+    
+    if args.stream or args.source:
+        try:
+            run_streams(detector, args, cameras_folder, profiler)
+        except KeyboardInterrupt:
+            logger.info("Detector interrompido pelo usuário")
+        finally:
+            if shadow is not None:
+                shadow.close()
+        return
+    
+    # Verificar se a pasta de câmeras existe
     if not cameras_folder.exists():
         logger.error(f"Pasta de câmeras não encontrada: {cameras_folder}")
         logger.info("Criando pasta de câmeras...")
@@ -81,26 +357,52 @@ def main():
     
     logger.info(f"Encontradas {len(camera_folders)} câmeras")
     
+    heartbeat_pending = set()  # câmeras processadas desde o último heartbeat
+    next_heartbeat = time.monotonic()
     try:
         while True:
             logger.info("Iniciando ciclo de detecção...")
+            cycle_start = time.monotonic()
+            profiler.start_cycle()
             
             total_detections = 0
+            processed = []
+            camera_config.refresh()
             
             # Processar cada câmera
             for camera_folder in camera_folders:
                 camera_id = camera_folder.name
+                if not camera_config.is_active(camera_id):
+                    logger.info(f"Câmera {camera_id} fora do horário de funcionamento ou em manutenção")
+                    continue
+                    
                 logger.info(f"Processando câmera: {camera_id}")
                 
                 # Detectar descartes na pasta da câmera
                 detections = detector.process_camera_images(camera_id, str(camera_folder))
                 total_detections += detections
+                processed.append(camera_id)
                 
                 if detections > 0:
                     logger.info(f"Detectados {detections} possíveis descartes na câmera {camera_id}")
                 else:
                     logger.info(f"Nenhum descarte detectado na câmera {camera_id}")
             
+            # Mesmo intervalo do modo contínuo, com as câmeras processadas desde o anterior
+            heartbeat_pending.update(processed)
+            if args.heartbeat_interval > 0 and heartbeat_pending and cycle_start >= next_heartbeat:
+                next_heartbeat = cycle_start + args.heartbeat_interval
+                detector.send_heartbeat(sorted(heartbeat_pending))
+                heartbeat_pending.clear()
+            
+            profiler.end_cycle()
+            cycle_duration = time.monotonic() - cycle_start
+            if cycle_duration > args.interval:
+                detector_metrics.inc("cycle_overruns")
+                logger.warning(
+                    f"Ciclo levou {cycle_duration:.1f} s, acima do intervalo de {args.interval} s"
+                )
+            
             logger.info(f"Ciclo de detecção concluído. Total de descartes: {total_detections}")
             logger.info(f"Aguardando {args.interval} segundos para o próximo ciclo...")
             time.sleep(args.interval)
@@ -109,6 +411,9 @@ def main():
         logger.info("Detector interrompido pelo usuário")
     except Exception as e:
         logger.error(f"Erro no detector: {e}")
+    finally:
+        if shadow is not None:
+            shadow.close()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
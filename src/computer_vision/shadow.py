@@ -0,0 +1,142 @@
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger('waste_detector.shadow')
+
+# Parâmetros que uma configuração em modo sombra pode alterar; os omitidos usam
+# os valores da configuração principal (inclusive o threshold por câmera)
+SHADOW_PARAMETERS = ("threshold", "binary_threshold", "kernel_size")
+
+
+def load_shadow_configs(path):
+    # Arquivo JSON com a lista de configurações, ex.:
+    # [
+    #   {"name": "threshold_1500", "threshold": 1500},
+    #   {"name": "kernel_3", "kernel_size": 3, "binary_threshold": 25}
+    # ]
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("configs", [])
+
+    configs = []
+    names = set()
+    for item in data:
+        name = item.get("name")
+        if not name or name in names:
+            raise ValueError(f"Configuração sombra sem nome ou com nome repetido: {item}")
+        unknown = set(item) - set(SHADOW_PARAMETERS) - {"name"}
+        if unknown:
+            raise ValueError(f"Parâmetros desconhecidos na configuração {name}: {', '.join(sorted(unknown))}")
+        names.add(name)
+        configs.append(dict(item))
+    return configs
+
+
+class ShadowEvaluator:
+    # Resultados das configurações em modo sombra, comparados aos da configuração
+    # principal quadro a quadro. Grava em output_dir:
+    #   frames.jsonl  -> uma linha por quadro analisado, com a área e o resultado de cada configuração
+    #   summary.json  -> por configuração e câmera: taxa de detecção, concordância
+    #                    com a principal e tempo médio (reescrito a cada summary_interval segundos)
+
+    def __init__(self, configs, output_dir, summary_interval=30, log_frames=True):
+        self.configs = configs
+        self.output_dir = Path(output_dir)
+        self.summary_interval = summary_interval
+        self.started_at = datetime.now().isoformat()
+        self._stats = {}  # (configuração, camera_id) -> contadores
+        self._lock = threading.Lock()
+        self._next_summary = time.monotonic() + summary_interval
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._frames_file = open(self.output_dir / "frames.jsonl", "a", encoding="utf-8") if log_frames else None
+        logger.info(f"Modo sombra com {len(configs)} configurações, resultados em {self.output_dir}")
+
+    def _entry(self, name, camera_id):
+        key = (name, camera_id)
+        entry = self._stats.get(key)
+        if entry is None:
+            entry = {"frames": 0, "hits": 0, "both": 0, "only_primary": 0, "only_shadow": 0, "total_s": 0.0}
+            self._stats[key] = entry
+        return entry
+
+    def record(self, camera_id, frame_ref, has_waste, area, results):
+        # results: nome -> (has_waste, área, segundos)
+        with self._lock:
+            primary = self._entry("primary", camera_id)
+            primary["frames"] += 1
+            primary["hits"] += int(has_waste)
+            for name, (shadow_hit, _, seconds) in results.items():
+                entry = self._entry(name, camera_id)
+                entry["frames"] += 1
+                entry["hits"] += int(shadow_hit)
+                entry["total_s"] += seconds
+                if has_waste and shadow_hit:
+                    entry["both"] += 1
+                elif has_waste:
+                    entry["only_primary"] += 1
+                elif shadow_hit:
+                    entry["only_shadow"] += 1
+
+            if self._frames_file is not None:
+                self._frames_file.write(json.dumps({
+                    "time": datetime.now().isoformat(),
+                    "camera_id": camera_id,
+                    "frame": frame_ref,
+                    "primary": {"has_waste": has_waste, "area": area},
+                    "shadows": {
+                        name: {"has_waste": shadow_hit, "area": shadow_area, "ms": seconds * 1000}
+                        for name, (shadow_hit, shadow_area, seconds) in results.items()
+                    },
+                }) + "\n")
+
+        if time.monotonic() >= self._next_summary:
+            self.write_summary()
+
+    def summary(self):
+        with self._lock:
+            stats = {key: dict(value) for key, value in self._stats.items()}
+
+        configs = {}
+        for (name, camera_id), entry in sorted(stats.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+            frames = entry["frames"]
+            result = {
+                "frames": frames,
+                "hits": entry["hits"],
+                "hit_rate": entry["hits"] / frames if frames else None,
+            }
+            if name != "primary":
+                result.update(
+                    agreement=(frames - entry["only_primary"] - entry["only_shadow"]) / frames if frames else None,
+                    only_primary=entry["only_primary"],
+                    only_shadow=entry["only_shadow"],
+                    mean_ms=entry["total_s"] / frames * 1000 if frames else None,
+                )
+            configs.setdefault(name, {})[camera_id] = result
+
+        return {
+            "started_at": self.started_at,
+            "updated_at": datetime.now().isoformat(),
+            "configs": {config["name"]: config for config in self.configs},
+            "results": configs,
+        }
+
+    def write_summary(self):
+        self._next_summary = time.monotonic() + self.summary_interval
+        summary = self.summary()
+        path = self.output_dir / "summary.json"
+        temporary = path.with_suffix(".json.tmp")
+        temporary.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+        temporary.replace(path)
+        if self._frames_file is not None:
+            self._frames_file.flush()
+
+    def close(self):
+        self.write_summary()
+        if self._frames_file is not None:
+            self._frames_file.close()
+            self._frames_file = None
@@ -0,0 +1,195 @@
+import cv2
+import os
+import time
+import logging
+import threading
+from pathlib import Path
+
+logger = logging.getLogger('waste_detector.sources')
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+class FrameSource:
+    # Interface comum das fontes de quadros. Cada fonte mantém apenas o
+    # quadro mais recente; quadros não consumidos são descartados.
+
+    def __init__(self, camera_id, uri):
+        self.camera_id = camera_id
+        self.uri = uri
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self.frames_skipped = 0
+        self._frame = None
+        self._frame_seq = 0
+        self._consumed_seq = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def is_alive(self):
+        return True
+
+    def _publish(self, frame):
+        with self._lock:
+            # Se o quadro anterior não foi consumido, ele é descartado
+            if self._frame_seq > self._consumed_seq:
+                self.frames_dropped += 1
+            self._frame = frame
+            self._frame_seq += 1
+            self.frames_read += 1
+
+    def latest(self):
+        # Retorna (seq, quadro) do quadro mais recente ainda não consumido, ou (None, None)
+        with self._lock:
+            if self._frame is None or self._frame_seq == self._consumed_seq:
+                return None, None
+            self._consumed_seq = self._frame_seq
+            return self._frame_seq, self._frame
+
+
+class FolderSource(FrameSource):
+    # Observa uma pasta e publica a imagem mais nova que ainda não foi vista
+
+    def __init__(self, camera_id, uri):
+        super().__init__(camera_id, uri)
+        self.folder = Path(uri)
+        self._seen = set()
+
+    def poll(self):
+        try:
+            image_files = sorted(
+                (f for f in self.folder.iterdir()
+                 if f.suffix.lower() in IMAGE_EXTENSIONS
+                 and not f.name.startswith("detection_")
+                 and f not in self._seen),
+                key=lambda f: f.stat().st_mtime
+            )
+        except OSError as e:
+            logger.error(f"Erro ao listar a pasta {self.folder}: {e}")
+            return
+
+        if not image_files:
+            return
+
+        self._seen.update(image_files)
+        # Apenas a imagem mais recente é decodificada; as demais contam como descartadas
+        with self._lock:
+            self.frames_dropped += len(image_files) - 1
+        frame = cv2.imread(str(image_files[-1]))
+        if frame is not None:
+            self._publish(frame)
+
+    def latest(self):
+        self.poll()
+        return super().latest()
+
+
+class VideoSource(FrameSource):
+    # Lê arquivos de vídeo ou streams RTSP/HTTP com cv2.VideoCapture em uma
+    # thread dedicada. A thread só decodifica (retrieve) os quadros que serão
+    # usados, conforme o intervalo de amostragem; os demais apenas passam por grab().
+
+    def __init__(self, camera_id, uri, sample_interval=1.0, realtime=None,
+                 reconnect_delay=5.0, loop=False):
+        super().__init__(camera_id, uri)
+        self.sample_interval = sample_interval
+        self.is_file = os.path.isfile(uri)
+        # Arquivos locais são lidos no ritmo do FPS original para simular uma câmera
+        self.realtime = self.is_file if realtime is None else realtime
+        self.reconnect_delay = reconnect_delay
+        self.loop = loop
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._finished = False
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"grabber-{self.camera_id}",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def is_alive(self):
+        return not self._finished
+
+    def _open(self):
+        capture = cv2.VideoCapture(self.uri)
+        if not capture.isOpened():
+            capture.release()
+            return None
+        return capture
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            capture = self._open()
+            if capture is None:
+                logger.error(f"Não foi possível abrir a fonte da câmera {self.camera_id}: {self.uri}")
+                if self.is_file:
+                    break
+                self._stop_event.wait(self.reconnect_delay)
+                continue
+
+            logger.info(f"Fonte de vídeo aberta para câmera {self.camera_id}: {self.uri}")
+            try:
+                ended = self._grab_loop(capture)
+            finally:
+                capture.release()
+
+            if ended and self.is_file and not self.loop:
+                break
+            if not self.is_file:
+                logger.warning(f"Stream da câmera {self.camera_id} interrompido, reconectando...")
+                self._stop_event.wait(self.reconnect_delay)
+
+        self._finished = True
+
+    def _grab_loop(self, capture):
+        fps = capture.get(cv2.CAP_PROP_FPS) or 0
+        frame_period = 1.0 / fps if fps > 0 else 0
+        started = time.monotonic()
+        grabbed = 0
+        last_sample = None
+
+        while not self._stop_event.is_set():
+            if not capture.grab():
+                return True
+            grabbed += 1
+
+            if self.realtime and frame_period:
+                # Respeitar o tempo real do vídeo
+                delay = started + grabbed * frame_period - time.monotonic()
+                if delay > 0:
+                    self._stop_event.wait(delay)
+
+            now = time.monotonic()
+            if last_sample is not None and now - last_sample < self.sample_interval:
+                # Quadro pulado sem decodificar
+                self.frames_skipped += 1
+                continue
+
+            ok, frame = capture.retrieve()
+            if ok:
+                last_sample = now
+                self._publish(frame)
+
+        return False
+
+
+def open_source(camera_id, uri, sample_interval=1.0, loop=False):
+    if os.path.isdir(uri):
+        return FolderSource(camera_id, uri)
+    return VideoSource(camera_id, uri, sample_interval=sample_interval, loop=loop)
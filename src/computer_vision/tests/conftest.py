@@ -0,0 +1,13 @@
+import sys
+from pathlib import Path
+
+# Os módulos do detector são importados pelo nome, como em run_detector.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# O backend também tem um módulo metrics: com as duas suítes no mesmo processo
+# (pytest na raiz do repositório), o detector é importado com o seu e o do
+# backend volta a ser o registrado
+_backend_metrics = sys.modules.pop("metrics", None)
+import detector  # noqa: E402,F401
+if _backend_metrics is not None:
+    sys.modules["metrics"] = _backend_metrics
@@ -0,0 +1,72 @@
+import logging
+
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from detector import WasteDetector  # noqa: E402
+
+
+@pytest.fixture
+def frames(tmp_path):
+    # Fundo com ruído e quadros com discos, anéis (contorno externo maior que os
+    # pixels alterados) e retalhos de ruído, em tamanhos variados
+    rng = np.random.default_rng(7)
+    background = rng.integers(100, 140, (480, 640, 3), dtype=np.uint8)
+    cv2.imwrite(str(tmp_path / "background.png"), background)
+    paths = []
+    for index in range(30):
+        frame = background.copy()
+        for _ in range(int(rng.integers(0, 4))):
+            x, y, radius = int(rng.integers(0, 600)), int(rng.integers(0, 440)), int(rng.integers(2, 40))
+            kind = rng.random()
+            if kind < 0.4:
+                cv2.circle(frame, (x, y), radius, (255, 255, 255), -1)
+            elif kind < 0.7:
+                cv2.circle(frame, (x, y), radius, (255, 255, 255), int(rng.integers(1, 4)))
+            else:
+                patch = frame[y:y + radius, x:x + radius]
+                patch[:] = rng.integers(0, 255, patch.shape, dtype=np.uint8)
+        path = tmp_path / f"frame_{index:03d}.png"
+        cv2.imwrite(str(path), frame)
+        paths.append(str(path))
+    return tmp_path / "background.png", paths
+
+
+@pytest.mark.parametrize("process_width, roi", [
+    (None, None),
+    (320, [[[0, 0], [500, 0], [500, 400], [0, 400]]]),
+])
+def test_batch_matches_single_frame_detection(frames, process_width, roi):
+    logging.disable(logging.CRITICAL)
+    background, paths = frames
+    detector = WasteDetector(threshold=1500, change_threshold=0, process_width=process_width)
+    detector.load_background("camera_01", str(background))
+    if roi:
+        detector.set_roi("camera_01", roi)
+
+    single = [detector.detect_waste("camera_01", path) for path in paths]
+    batch = detector.detect_waste_batch("camera_01", paths, chunk_size=7)
+    logging.disable(logging.NOTSET)
+
+    assert [result[0] for result in batch] == paths
+    assert [result[1] for result in batch] == [result[0] for result in single]
+    assert any(result[0] for result in single) and not all(result[0] for result in single)
+    for (has_waste, _, area), (_, _, _, batch_area) in zip(single, batch):
+        if has_waste:
+            assert batch_area == pytest.approx(area)
+
+
+def test_batch_counts_gated_frames_as_skipped(frames):
+    background, paths = frames
+    detector = WasteDetector(threshold=1500, change_threshold=0)
+    detector.load_background("camera_01", str(background))
+
+    results = detector.detect_waste_batch("camera_01", [str(background)] * 3 + paths[:5])
+
+    assert results[0][1:] == (False, None, 0)
+    skipped = detector.metrics.counter("frames_skipped", "camera_01")
+    analyzed = detector.metrics.counter("frames_analyzed", "camera_01")
+    assert skipped >= 3
+    assert skipped + analyzed == 8
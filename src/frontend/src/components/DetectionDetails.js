@@ -22,6 +22,7 @@ import {
   ModalFooter,
   ModalBody,
   ModalCloseButton,
+  Link,
   useDisclosure
 } from '@chakra-ui/react';
 import { FaCalendar, FaMapMarkerAlt, FaCamera, FaExclamationTriangle, FaCheck, FaLink, FaLock } from 'react-icons/fa';
@@ -69,8 +70,10 @@ function DetectionDetails({ detection, onStatusChange }) {
     
     setLoading(true);
     try {
-      await axios.put(`${API_URL}/waste-detections/${detection.id}`, {
-        status: newStatus
+      // version: recusada com 409 se a detecção foi alterada por outra pessoa
+      const { data } = await axios.put(`${API_URL}/waste-detections/${detection.id}`, {
+        status: newStatus,
+        version: detection.version
       });
       
       toast({
@@ -82,7 +85,7 @@ function DetectionDetails({ detection, onStatusChange }) {
       });
       
       // Atualizar localmente
-      const updatedDetection = { ...detection, status: newStatus };
+      const updatedDetection = { ...detection, status: newStatus, version: data.version };
       
       // Notificar o componente pai
       if (onStatusChange) {
@@ -98,7 +101,9 @@ function DetectionDetails({ detection, onStatusChange }) {
       console.error('Erro ao atualizar status:', error);
       toast({
         title: 'Erro',
-        description: 'Não foi possível atualizar o status.',
+        description: error.response?.status === 409
+          ? 'A detecção foi alterada por outra pessoa. Recarregue e tente novamente.'
+          : 'Não foi possível atualizar o status.',
         status: 'error',
         duration: 5000,
         isClosable: true,
@@ -218,13 +223,16 @@ function DetectionDetails({ detection, onStatusChange }) {
         
         <Box>
           {detection.image_url ? (
-            <Image 
-              src={`${API_URL.replace('/api', '')}${detection.image_url}`}
-              alt="Imagem da detecção"
-              borderRadius="md"
-              maxH="200px"
-              mx="auto"
-            />
+            // Tamanho médio na visualização; a original só é baixada ao abrir o link
+            <Link href={`${API_URL.replace('/api', '')}${detection.image_url}`} isExternal>
+              <Image 
+                src={`${API_URL.replace('/api', '')}${detection.medium_url || detection.image_url}`}
+                alt="Imagem da detecção"
+                borderRadius="md"
+                maxH="200px"
+                mx="auto"
+              />
+            </Link>
           ) : (
             <Alert status="info">
               <AlertIcon />
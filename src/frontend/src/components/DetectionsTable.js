@@ -16,6 +16,7 @@ import {
   InputGroup,
   InputLeftElement,
   Spinner,
+  Image,
   useToast
 } from '@chakra-ui/react';
 import { FaSearch, FaFilter, FaEye } from 'react-icons/fa';
@@ -23,6 +24,7 @@ import axios from 'axios';
 
 // API URL
 const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000/api';
+const STATIC_URL = API_URL.replace('/api', '');
 
 function DetectionsTable({ onSelectDetection }) {
   const [detections, setDetections] = useState([]);
@@ -174,6 +176,7 @@ function DetectionsTable({ onSelectDetection }) {
             <Table variant="simple">
               <Thead>
                 <Tr>
+                  <Th>Imagem</Th>
                   <Th>Data/Hora</Th>
                   <Th>Câmera</Th>
                   <Th>Tipo de Resíduo</Th>
@@ -186,6 +189,19 @@ function DetectionsTable({ onSelectDetection }) {
                 {filteredDetections.length > 0 ? (
                   filteredDetections.map(detection => (
                     <Tr key={detection.id}>
+                      <Td>
+                        {/* Miniatura gerada pelo backend; enquanto não existe, nada é baixado */}
+                        {detection.thumbnail_url && (
+                          <Image
+                            src={`${STATIC_URL}${detection.thumbnail_url}`}
+                            alt="Miniatura da detecção"
+                            boxSize="48px"
+                            objectFit="cover"
+                            borderRadius="sm"
+                            loading="lazy"
+                          />
+                        )}
+                      </Td>
                       <Td>{formatDate(detection.timestamp)}</Td>
                       <Td>{detection.camera_id}</Td>
                       <Td>{detection.waste_type || "Desconhecido"}</Td>
@@ -221,7 +237,7 @@ function DetectionsTable({ onSelectDetection }) {
                   ))
                 ) : (
                   <Tr>
-                    <Td colSpan={6} textAlign="center" py={4}>
+                    <Td colSpan={7} textAlign="center" py={4}>
                       Nenhuma detecção encontrada com os filtros atuais.
                     </Td>
                   </Tr>
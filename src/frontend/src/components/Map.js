@@ -9,6 +9,7 @@ import {
   Box,
   Text,
   Badge,
+  Image,
   Heading,
   Button,
   useToast,
@@ -21,7 +22,7 @@ import {
   ModalFooter,
   useDisclosure,
 } from '@chakra-ui/react';
-import { MapContainer, TileLayer, Marker, Popup, useMap } from 'react-leaflet';
+import { MapContainer, TileLayer, Marker, Popup, CircleMarker, Tooltip, useMap, useMapEvents } from 'react-leaflet';
 import { FaCamera } from 'react-icons/fa';
 import L from 'leaflet';
 import 'leaflet/dist/leaflet.css';
@@ -33,6 +34,7 @@ import iconShadow from 'leaflet/dist/images/marker-shadow.png';
 
 // Configurações
 const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000/api';
+const STATIC_URL = API_URL.replace('/api', '');
 const RECIFE_CENTER = [-8.0476, -34.8770];
 const BOTTLE_THRESHOLD = 5; // quantidade para disparar alerta
 
@@ -49,6 +51,39 @@ function SetViewOnClick({ coords }) {
   return null;
 }
 
+// Agrupamentos de todo o histórico de detecções na área visível, calculados no backend
+function DetectionClusters() {
+  const [clusters, setClusters] = useState([]);
+  const map = useMap();
+
+  const loadClusters = async () => {
+    try {
+      const { data } = await axios.get(`${API_URL}/detections/clusters`, {
+        params: { bbox: map.getBounds().toBBoxString(), zoom: map.getZoom() },
+      });
+      setClusters(data.clusters);
+    } catch {}
+  };
+
+  useMapEvents({ moveend: loadClusters });
+
+  useEffect(() => {
+    loadClusters(); const cid = setInterval(loadClusters, 30000);
+    return () => clearInterval(cid);
+  }, [map]); // eslint-disable-line react-hooks/exhaustive-deps
+
+  return clusters.map(cluster => (
+    <CircleMarker
+      key={`${cluster.latitude},${cluster.longitude}`}
+      center={[cluster.latitude, cluster.longitude]}
+      radius={Math.min(8 + 4 * Math.log2(cluster.count), 30)}
+      pathOptions={{ color: '#c53030', fillColor: '#e53e3e', fillOpacity: 0.4, weight: 1 }}
+    >
+      <Tooltip>{cluster.count} {cluster.count === 1 ? 'detecção' : 'detecções'}</Tooltip>
+    </CircleMarker>
+  ));
+}
+
 export default function WasteMonitoringMap({ onSelectDetection }) {
   const [cameras, setCameras] = useState([]);
   const [detections, setDetections] = useState([]);
@@ -157,8 +192,11 @@ export default function WasteMonitoringMap({ onSelectDetection }) {
     <Box h="600px" w="100%" pos="relative">
       <MapContainer center={center} zoom={13} style={{ height: '100%', width: '100%' }}>
         <TileLayer attribution='&copy; OpenStreetMap contributors' url="https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png" />
+        <DetectionClusters />
         {cameras.map(cam => {
-          const hasAlert = detections.some(d => d.camera_id === cam.id && d.status === 'Aberto');
+          // Detecções vêm ordenadas da mais recente para a mais antiga
+          const lastAlert = detections.find(d => d.camera_id === cam.id && d.status === 'Aberto');
+          const hasAlert = Boolean(lastAlert);
           return (
             <Marker
               key={cam.id}
@@ -171,6 +209,16 @@ export default function WasteMonitoringMap({ onSelectDetection }) {
                   <Heading size="sm">{cam.name}</Heading>
                   <Text fontSize="sm">Local: {cam.location}</Text>
                   <Badge colorScheme={cam.status === 'Online' ? 'green' : 'red'}>{cam.status}</Badge>
+                  {lastAlert?.thumbnail_url && (
+                    <Image
+                      mt={2}
+                      src={`${STATIC_URL}${lastAlert.thumbnail_url}`}
+                      alt="Última detecção em aberto"
+                      borderRadius="sm"
+                      cursor={onSelectDetection ? 'pointer' : undefined}
+                      onClick={() => onSelectDetection?.(lastAlert)}
+                    />
+                  )}
                   <Button mt={2} size="sm" leftIcon={<FaCamera />} onClick={() => handleCameraClick(cam)}>
                     Ver Câmera Ao Vivo
                   </Button>